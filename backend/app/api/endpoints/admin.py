@@ -94,10 +94,27 @@ async def run_migrations():
             "status": "error",
             "error": str(e)
         }
-        
+
+    # Seeds may have changed abilities / phases
+    from app.services.master_data import master_data
+    master_data.invalidate()
+
+    # Seeded reports bypass the report endpoints: rebuild the rollup
+    try:
+        from app.services.student_stats import rebuild_all_student_stats
+        results["student_stats"] = {
+            "status": "success",
+            **(await rebuild_all_student_stats()),
+        }
+    except Exception as e:
+        results["student_stats"] = {
+            "status": "error",
+            "error": str(e)
+        }
+
     return results
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, get_current_admin
 from app.db.session import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
@@ -176,3 +193,29 @@ async def run_dummy_seed(background_tasks: BackgroundTasks):
     background_tasks.add_task(seed_dummy_interactive)
     
     return {"status": "accepted", "message": "Dummy seed started in background"}
+
+
+@router.post("/rebuild-student-stats")
+async def rebuild_student_stats(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_admin),
+):
+    """Recompute the student_stats rollup in the background (same as python -m app.db.rebuild_student_stats)."""
+    from app.services.student_stats import rebuild_all_student_stats
+
+    background_tasks.add_task(rebuild_all_student_stats)
+    return {"status": "accepted", "message": "student_stats rebuild started in background"}
+
+
+@router.get("/ai-stats")
+async def get_ai_stats(current_user: User = Depends(get_current_admin)):
+    """AI analysis cache, background worker pool and Gemini gateway (calls, latency, circuit) stats."""
+    from app.services.analysis_cache import analysis_cache
+    from app.services.background import analysis_pool
+    from app.services.gemini_gateway import gemini
+
+    return {
+        "analysis_cache": analysis_cache.stats(),
+        "analysis_pool": analysis_pool.stats(),
+        "gemini": gemini.stats(),
+    }
@@ -1,19 +1,26 @@
 from uuid import UUID
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from app.db.session import get_db
 from app.core.config import settings
 from app.core.security import get_current_user, get_current_student, get_current_teacher_or_admin
+from app.core.sse import sse_response
 from app.models import (
-    User, Student, Teacher, StudentTeacher, Report, ReportAbility,
-    Ability, ResearchTheme, StreakRecord
+    User, Student, Teacher, StudentTeacher, ResearchTheme, StreakRecord, TeacherAdvice
 )
 from app.schemas.ai import ChatRequest, ChatResponse, TeacherAdviceResponse
-from app.services.ai import generate_chat_response, generate_teacher_advice
+from app.services.ai import (
+    generate_chat_response, stream_chat_response, generate_teacher_advice,
+    is_advice_fallback, teacher_advice_fingerprint,
+)
+from app.services.master_data import get_master_data
+from app.services.rag import StreamInterrupted
+from app.services.student_stats import get_student_stats
 
 router = APIRouter(prefix="/ai", tags=["AI Features"])
 
@@ -31,13 +38,44 @@ async def ai_chat(
     return ChatResponse(response=response)
 
 
+@router.post("/chat/stream")
+async def ai_chat_stream(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_student),
+):
+    """
+    Streaming chat with AI principal (Server-Sent Events).
+    Emits "delta" events ({"text": ...}) and a final "done" event ({"response": ...}).
+    If generation fails midway, an "error" event replaces "done" (the text so far is incomplete).
+    """
+
+    async def _events():
+        chunks = []
+        try:
+            async for chunk in stream_chat_response(request.message):
+                chunks.append(chunk)
+                yield "delta", {"text": chunk}
+        except StreamInterrupted:
+            yield "error", {"detail": "AIの応答が途中で途切れました。もう一度送信してください。"}
+            return
+        yield "done", ChatResponse(response="".join(chunks).strip()).model_dump()
+
+    return sse_response(_events())
+
+
 @router.get("/advice/{student_id}", response_model=TeacherAdviceResponse)
 async def get_teacher_advice(
     student_id: UUID,
+    refresh: bool = Query(False, description="Regenerate even if the inputs have not changed"),
     current_user: User = Depends(get_current_teacher_or_admin),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get AI-generated advice for a specific student (teacher only)."""
+    """Get AI-generated advice for a specific student (teacher only).
+
+    The advice is stored per student and fiscal year with a fingerprint of its
+    inputs (theme, report count, ability counts, streak). While the fingerprint
+    matches, the stored advice is returned without calling Gemini.
+    """
     # Get teacher profile
     result = await db.execute(
         select(Teacher).where(Teacher.user_id == current_user.id)
@@ -89,21 +127,15 @@ async def get_teacher_advice(
     )
     theme = result.scalar_one_or_none()
 
-    # Get report count
-    result = await db.execute(
-        select(func.count(Report.id)).where(Report.student_id == student.id)
-    )
-    report_count = result.scalar()
-
-    # Get ability counts
-    result = await db.execute(
-        select(Ability.name, func.count(ReportAbility.id))
-        .join(ReportAbility, ReportAbility.ability_id == Ability.id)
-        .join(Report, Report.id == ReportAbility.report_id)
-        .where(Report.student_id == student.id)
-        .group_by(Ability.name)
-    )
-    ability_counts = dict(result.all())
+    # Get report count and ability counts (rollup, all years)
+    stats = await get_student_stats(db, student.id)
+    masters = await get_master_data(db)
+    report_count = stats.report_count
+    ability_counts = {
+        masters.ability_by_id[ability_id].name: count
+        for ability_id, count in stats.ability_counts.items()
+        if ability_id in masters.ability_by_id and count > 0
+    }
 
     # Get streak record
     result = await db.execute(
@@ -113,8 +145,7 @@ async def get_teacher_advice(
     current_streak = streak.current_streak if streak else 0
     max_streak = streak.max_streak if streak else 0
 
-    # Generate advice
-    advice = await generate_teacher_advice(
+    inputs = dict(
         student_name=user.name,
         theme=theme.title if theme else "未設定",
         report_count=report_count,
@@ -122,6 +153,24 @@ async def get_teacher_advice(
         current_streak=current_streak,
         max_streak=max_streak,
     )
+    fingerprint = teacher_advice_fingerprint(**inputs)
+    result = await db.execute(
+        select(TeacherAdvice).where(
+            TeacherAdvice.student_id == student.id,
+            TeacherAdvice.fiscal_year == fiscal_year,
+        )
+    )
+    stored = result.scalar_one_or_none()
+
+    if stored is not None and stored.fingerprint == fingerprint and not refresh:
+        advice, cached = stored.advice, True
+    else:
+        advice, cached = await generate_teacher_advice(**inputs), False
+        if not is_advice_fallback(advice):
+            await _store_advice(db, stored, student.id, fiscal_year, fingerprint, advice)
+        elif stored is not None:
+            # Gemini failed: older advice beats an error message
+            advice, cached = stored.advice, True
 
     return TeacherAdviceResponse(
         advice=advice,
@@ -130,4 +179,30 @@ async def get_teacher_advice(
         report_count=report_count,
         current_streak=current_streak,
         max_streak=max_streak,
+        cached=cached,
     )
+
+
+async def _store_advice(
+    db: AsyncSession,
+    stored: Optional[TeacherAdvice],
+    student_id: str,
+    fiscal_year: int,
+    fingerprint: str,
+    advice: str,
+) -> None:
+    if stored is None:
+        db.add(TeacherAdvice(
+            student_id=student_id,
+            fiscal_year=fiscal_year,
+            fingerprint=fingerprint,
+            advice=advice,
+        ))
+    else:
+        stored.fingerprint = fingerprint
+        stored.advice = advice
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request stored advice for this student first
+        await db.rollback()
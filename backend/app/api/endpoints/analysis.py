@@ -1,20 +1,21 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from datetime import date, datetime, timedelta
 from calendar import monthrange
 import sqlalchemy
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, extract
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.config import settings
+from app.core.etag import conditional, make_etag
 from app.core.security import get_current_user, get_current_student
+from app.core.sse import sse_response
 from app.models import (
-    User, Student, Report, ReportAbility, ResearchTheme,
-    ResearchPhase, Ability, StreakRecord
+    User, Student, Report, ReportAbility, ResearchTheme, StreakRecord
 )
 from app.schemas.analysis import (
     ReportAnalyzeRequest,
@@ -26,7 +27,10 @@ from app.schemas.analysis import (
     CapabilitySummary,
     BadgeInfo,
 )
-from app.services.analysis import analyze_report_content, calculate_badges
+from app.services.analysis import analyze_report_content, stream_report_analysis, calculate_badges
+from app.services.data_version import student_version
+from app.services.master_data import get_master_data
+from app.services.student_stats import get_student_stats
 
 router = APIRouter(prefix="/reports", tags=["Report Analysis"])
 
@@ -42,45 +46,32 @@ async def get_student_from_user(db: AsyncSession, user: User) -> Student:
     return student
 
 
-@router.post("/analyze", response_model=ReportAnalyzeResponse)
-async def analyze_report(
-    request: ReportAnalyzeRequest,
-    current_user: User = Depends(get_current_student),
-    db: AsyncSession = Depends(get_db),
-):
-    """
-    報告内容をAIで分析し、フェーズと能力を提案する。
-    ※報告の保存前に呼び出し、プレビュー表示用。
-    """
-    # テーマ情報を取得（あれば）
-    theme_title = None
-    if request.theme_id:
-        result = await db.execute(
-            select(ResearchTheme).where(ResearchTheme.id == request.theme_id)
-        )
-        theme = result.scalar_one_or_none()
-        if theme:
-            theme_title = theme.title
-
-    # AI分析実行
-    suggested_phase, abilities_list, ai_comment = await analyze_report_content(
-        content=request.content,
-        theme_title=theme_title,
+async def _get_theme_title(db: AsyncSession, theme_id: Optional[UUID]) -> Optional[str]:
+    """テーマ情報を取得（あれば）."""
+    if not theme_id:
+        return None
+    result = await db.execute(
+        select(ResearchTheme).where(ResearchTheme.id == theme_id)
     )
+    theme = result.scalar_one_or_none()
+    return theme.title if theme else None
 
-    # フェーズIDを取得
-    suggested_phase_id = None
-    if suggested_phase:
-        result = await db.execute(
-            select(ResearchPhase).where(ResearchPhase.name == suggested_phase)
-        )
-        phase = result.scalar_one_or_none()
-        if phase:
-            suggested_phase_id = phase.id
 
-    # 能力情報をDBから取得してマッピング
-    result = await db.execute(select(Ability).where(Ability.is_active == True))
-    all_abilities = {a.name: a for a in result.scalars().all()}
+async def _load_analysis_masters(db: AsyncSession) -> Tuple[dict, dict]:
+    """能力・フェーズのマスタを名前で引けるように取得（プロセス内キャッシュ）."""
+    masters = await get_master_data(db)
+    return masters.ability_by_name, masters.phase_by_name
+
+
+def _build_analyze_response(
+    suggested_phase: Optional[str],
+    abilities_list: List[dict],
+    ai_comment: str,
+    all_abilities: dict,
+    all_phases: dict,
+) -> ReportAnalyzeResponse:
+    """分析結果（名前ベース）をID付きのレスポンスに変換."""
+    phase = all_phases.get(suggested_phase) if suggested_phase else None
 
     suggested_abilities = []
     for ab in abilities_list:
@@ -96,16 +87,84 @@ async def analyze_report(
 
     return ReportAnalyzeResponse(
         suggested_phase=suggested_phase,
-        suggested_phase_id=suggested_phase_id,
+        suggested_phase_id=phase.id if phase else None,
         suggested_abilities=suggested_abilities,
         ai_comment=ai_comment,
     )
 
 
+@router.post("/analyze", response_model=ReportAnalyzeResponse)
+async def analyze_report(
+    request: ReportAnalyzeRequest,
+    current_user: User = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    報告内容をAIで分析し、フェーズと能力を提案する。
+    ※報告の保存前に呼び出し、プレビュー表示用。
+    """
+    theme_title = await _get_theme_title(db, request.theme_id)
+
+    # AI分析実行
+    # 生徒名も渡す（POST /reports と同じキャッシュキーになり、保存時の再分析を省ける）
+    suggested_phase, abilities_list, ai_comment = await analyze_report_content(
+        content=request.content,
+        theme_title=theme_title,
+        student_name=current_user.name,
+    )
+
+    # フェーズID・能力情報をDBから取得してマッピング
+    all_abilities, all_phases = await _load_analysis_masters(db)
+    return _build_analyze_response(suggested_phase, abilities_list, ai_comment, all_abilities, all_phases)
+
+
+@router.post("/analyze/stream")
+async def analyze_report_stream(
+    request: ReportAnalyzeRequest,
+    current_user: User = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    /reports/analyze のストリーミング版（Server-Sent Events）。
+
+    イベント:
+    - heuristic: キーワード判定による暫定のフェーズ・能力（即時）
+    - analysis: AIによるフェーズ・能力の判定結果
+    - comment_delta: 励ましコメントの断片 {"text": "..."}
+    - error: コメント生成が途中で失敗（表示中の断片を破棄し、done の ai_comment に置き換える）
+    - done: 最終結果（ReportAnalyzeResponse と同じ形式）
+    """
+    # DBアクセスはストリーム開始前に済ませる（セッションはレスポンス送信中に閉じられるため）
+    theme_title = await _get_theme_title(db, request.theme_id)
+    all_abilities, all_phases = await _load_analysis_masters(db)
+
+    async def _events():
+        async for event, data in stream_report_analysis(
+            content=request.content,
+            theme_title=theme_title,
+            student_name=current_user.name,
+        ):
+            if event in ("heuristic", "analysis", "done"):
+                payload = _build_analyze_response(
+                    data.get("phase"),
+                    data.get("abilities") or [],
+                    data.get("comment") or "",
+                    all_abilities,
+                    all_phases,
+                ).model_dump(mode="json")
+                if event != "done":
+                    payload.pop("ai_comment", None)
+                yield event, payload
+            else:  # comment_delta / error
+                yield event, data
+
+    return sse_response(_events())
+
+
 @router.get("/calendar", response_model=CalendarResponse)
 async def get_report_calendar(
     current_user: User = Depends(get_current_student),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     year: Optional[int] = None,
     month: Optional[int] = None,
 ):
@@ -159,21 +218,32 @@ async def get_report_calendar(
 
 @router.get("/summary", response_model=ReportSummaryResponse)
 async def get_report_summary(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_student),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     fiscal_year: Optional[int] = None,
 ):
     """
     振り返りサマリーデータを取得（レーダーチャート用）。
+    fiscal_year を指定した場合はその年度の報告のみ集計する（継続記録は全期間）。
+    If-None-Match が ETag と一致すれば（データに変更がなければ）304 を返す。
     """
     student = await get_student_from_user(db, current_user)
-    year = fiscal_year or settings.get_current_fiscal_year()
+    masters = await get_master_data(db)
 
-    # 総報告数
-    result = await db.execute(
-        select(func.count(Report.id)).where(Report.student_id == student.id)
-    )
-    total_reports = result.scalar() or 0
+    if settings.ETAG_ENABLED:
+        etag = make_etag(
+            "report-summary", current_user.id, fiscal_year, masters.digest,
+            *await student_version(db, student.id),
+        )
+        not_modified = conditional(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+
+    # 報告数・能力別カウント・フェーズ別分布（集計テーブル。年度指定なしは全期間）
+    stats = await get_student_stats(db, student.id, fiscal_year)
+    total_reports = stats.report_count
 
     # 継続記録
     result = await db.execute(
@@ -184,15 +254,10 @@ async def get_report_summary(
     max_streak = streak.max_streak if streak else 0
 
     # 能力別カウント
-    result = await db.execute(
-        select(Ability.id, Ability.name, func.count(ReportAbility.id))
-        .outerjoin(ReportAbility, ReportAbility.ability_id == Ability.id)
-        .outerjoin(Report, Report.id == ReportAbility.report_id)
-        .where(Ability.is_active == True)
-        .group_by(Ability.id, Ability.name)
-        .order_by(Ability.display_order)
-    )
-    ability_rows = result.all()
+    ability_rows = [
+        (a.id, a.name, stats.ability_counts.get(a.id, 0))
+        for a in masters.abilities
+    ]
 
     # 合計カウント
     total_ability_count = sum(row[2] or 0 for row in ability_rows)
@@ -211,15 +276,7 @@ async def get_report_summary(
         ))
 
     # フェーズ別分布
-    result = await db.execute(
-        select(ResearchPhase.name, func.count(Report.id))
-        .outerjoin(Report, Report.phase_id == ResearchPhase.id)
-        .where(ResearchPhase.is_active == True)
-        .group_by(ResearchPhase.name, ResearchPhase.display_order)
-        .order_by(ResearchPhase.display_order)
-    )
-    phase_rows = result.all()
-    phase_distribution = {name: count or 0 for name, count in phase_rows}
+    phase_distribution = {p.name: stats.phase_counts.get(p.id, 0) for p in masters.phases}
 
     # バッジ計算
     badges_data = calculate_badges(
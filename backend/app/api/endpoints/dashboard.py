@@ -1,20 +1,25 @@
 import logging
 from typing import List, Optional
 from uuid import UUID
-from collections import defaultdict
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, case, and_
+from sqlalchemy import func, select
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.config import settings
+from app.core.etag import conditional, make_etag
+from app.core.pagination import apply_keyset, page_result
 from app.core.security import get_current_teacher_or_admin
 from app.models import (
     User, Student, Teacher, StudentTeacher, Report, ReportAbility,
-    Ability, ResearchTheme, ResearchPhase, StreakRecord, SeminarLab
+    ResearchTheme, StreakRecord, SeminarLab, StudentStats
 )
+from app.services.dashboard_summary import fetch_students_summary_rows, top_ability_names
+from app.services.data_version import teacher_scope_version
+from app.services.master_data import MasterDataSnapshot, get_master_data
+from app.services.student_stats import StudentStatsView, get_student_stats, load_student_stats
 from app.schemas.dashboard import (
     StudentSummary,
     StudentDetail,
@@ -43,15 +48,34 @@ async def get_teacher_profile(db: AsyncSession, user: User) -> Teacher:
     return teacher
 
 
+def _top_ability_names(stats: StudentStatsView, masters: MasterDataSnapshot, limit: int = 3) -> List[str]:
+    """Most frequently selected abilities (ties broken by display order)."""
+    ranked = sorted(
+        (
+            (count, masters.ability_by_id[ability_id])
+            for ability_id, count in stats.ability_counts.items()
+            if ability_id in masters.ability_by_id and count > 0
+        ),
+        key=lambda x: (-x[0], x[1].display_order),
+    )
+    return [ability.name for _, ability in ranked[:limit]]
+
+
 @router.get("/students", response_model=List[StudentSummary])
 async def get_students_summary(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_teacher_or_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     fiscal_year: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="省略時は全件"),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor"),
 ):
     """Get summary of all assigned students. If no assignments exist, return all students.
 
     Optimized to use batch queries instead of N+1 pattern.
+    With `limit`, students are paged by (created_at, id); the next page cursor is in X-Next-Cursor.
+    Returns 304 when If-None-Match matches the ETag (nothing in scope changed).
     """
     try:
         logger.info(f"get_students_summary called by user {current_user.id}")
@@ -59,6 +83,19 @@ async def get_students_summary(
         year = fiscal_year or settings.get_current_fiscal_year()
         logger.info(f"Teacher ID: {teacher.id}, Fiscal year: {year}")
 
+        if settings.ETAG_ENABLED:
+            masters = await get_master_data(db)
+            etag = make_etag(
+                "dashboard-students", current_user.id, year, limit, cursor, masters.digest,
+                *await teacher_scope_version(db, teacher.id, year),
+            )
+            not_modified = conditional(request, response, etag)
+            if not_modified is not None:
+                return not_modified
+
+        if settings.DASHBOARD_SUMMARY_QUERY == "single":
+            return await _students_summary_single(db, teacher.id, year, cursor, limit, response)
+
         # Get all student relations
         result = await db.execute(
             select(StudentTeacher)
@@ -73,27 +110,25 @@ async def get_students_summary(
         logger.info(f"Found {len(relations)} student-teacher relations")
 
         # BATCH 1: Get all students with user and seminar_lab in one query
+        scope = []
         if not relations:
             logger.info("No student-teacher relations found, returning all students")
-            students_result = await db.execute(
-                select(Student)
-                .options(
-                    selectinload(Student.user),
-                    selectinload(Student.seminar_lab),
-                )
-            )
-            students = students_result.scalars().all()
         else:
-            student_ids = [rel.student_id for rel in relations]
-            students_result = await db.execute(
+            scope.append(Student.id.in_([rel.student_id for rel in relations]))
+
+        keys = (Student.created_at, Student.id)
+        students_result = await db.execute(
+            apply_keyset(
                 select(Student)
                 .options(
                     selectinload(Student.user),
                     selectinload(Student.seminar_lab),
                 )
-                .where(Student.id.in_(student_ids))
+                .where(*scope),
+                keys, cursor, limit, descending=False,
             )
-            students = students_result.scalars().all()
+        )
+        students, _ = page_result(students_result.scalars().all(), keys, limit, response)
 
         if not students:
             return []
@@ -110,13 +145,9 @@ async def get_students_summary(
         )
         themes_map = {t.student_id: t for t in themes_result.scalars().all()}
 
-        # BATCH 3: Get all report counts in one query
-        report_counts_result = await db.execute(
-            select(Report.student_id, func.count(Report.id))
-            .where(Report.student_id.in_(student_ids))
-            .group_by(Report.student_id)
-        )
-        report_counts_map = {row[0]: row[1] for row in report_counts_result.all()}
+        # BATCH 3: Report counts, latest phase and ability counts from the rollup (all years)
+        stats_map = await load_student_stats(db, student_ids)
+        masters = await get_master_data(db)
 
         # BATCH 4: Get all streaks in one query
         streaks_result = await db.execute(
@@ -125,50 +156,6 @@ async def get_students_summary(
         )
         streaks_map = {s.student_id: s for s in streaks_result.scalars().all()}
 
-        # BATCH 5: Get latest report for each student using a subquery
-        latest_report_subq = (
-            select(Report.student_id, func.max(Report.reported_at).label('max_reported_at'))
-            .where(Report.student_id.in_(student_ids))
-            .group_by(Report.student_id)
-            .subquery()
-        )
-        latest_reports_result = await db.execute(
-            select(Report)
-            .options(selectinload(Report.phase))
-            .join(
-                latest_report_subq,
-                and_(
-                    Report.student_id == latest_report_subq.c.student_id,
-                    Report.reported_at == latest_report_subq.c.max_reported_at
-                )
-            )
-        )
-        latest_reports_map = {r.student_id: r for r in latest_reports_result.scalars().all()}
-
-        # BATCH 6: Get top 3 abilities for each student
-        # This is more complex - we need a window function or multiple queries
-        # Using a simpler approach: get all ability counts and process in Python
-        ability_counts_result = await db.execute(
-            select(
-                Report.student_id,
-                Ability.name,
-                func.count(ReportAbility.id).label('cnt')
-            )
-            .join(ReportAbility, ReportAbility.report_id == Report.id)
-            .join(Ability, Ability.id == ReportAbility.ability_id)
-            .where(Report.student_id.in_(student_ids))
-            .group_by(Report.student_id, Ability.id, Ability.name)
-        )
-        # Build top abilities map: student_id -> [ability_name, ...]
-        student_ability_counts = defaultdict(list)
-        for row in ability_counts_result.all():
-            student_ability_counts[row[0]].append((row[1], row[2]))
-
-        top_abilities_map = {}
-        for student_id, ability_list in student_ability_counts.items():
-            sorted_abilities = sorted(ability_list, key=lambda x: -x[1])
-            top_abilities_map[student_id] = [a[0] for a in sorted_abilities[:3]]
-
         # Build response
         students_summary = []
         for student in students:
@@ -180,8 +167,9 @@ async def get_students_summary(
             rel = relations_map.get(student.id)
             theme = themes_map.get(student.id)
             streak = streaks_map.get(student.id)
-            latest_report = latest_reports_map.get(student.id)
-            top_abilities = top_abilities_map.get(student.id, [])
+            stats = stats_map.get(str(student.id), StudentStatsView())
+            latest_phase = masters.phase_by_id.get(stats.latest_phase_id) if stats.latest_phase_id else None
+            top_abilities = _top_ability_names(stats, masters)
 
             students_summary.append(StudentSummary(
                 id=student.id,
@@ -191,8 +179,8 @@ async def get_students_summary(
                 grade=student.grade,
                 class_name=student.class_name,
                 theme_title=theme.title if theme else None,
-                current_phase=latest_report.phase.name if latest_report and latest_report.phase else None,
-                total_reports=report_counts_map.get(student.id, 0),
+                current_phase=latest_phase.name if latest_phase else None,
+                total_reports=stats.report_count,
                 current_streak=streak.current_streak if streak else 0,
                 max_streak=streak.max_streak if streak else 0,
                 last_report_date=streak.last_report_date if streak else None,
@@ -205,9 +193,13 @@ async def get_students_summary(
 
         # Calculate alert levels (lowest 5 report counts)
         if students_summary:
-            sorted_by_reports = sorted(students_summary, key=lambda x: x.total_reports)
-            cutoff_index = min(5, len(sorted_by_reports))
-            bottom_ids = {s.id for s in sorted_by_reports[:cutoff_index]}
+            if limit is None:
+                sorted_by_reports = sorted(students_summary, key=lambda x: x.total_reports)
+                cutoff_index = min(5, len(sorted_by_reports))
+                bottom_ids = {s.id for s in sorted_by_reports[:cutoff_index]}
+            else:
+                # A page only holds part of the class: rank across all students in scope
+                bottom_ids = await _lowest_report_count_ids(db, scope)
 
             for summary in students_summary:
                 if summary.id in bottom_ids:
@@ -222,10 +214,60 @@ async def get_students_summary(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+async def _students_summary_single(
+    db: AsyncSession,
+    teacher_id: str,
+    year: int,
+    cursor: Optional[str],
+    limit: Optional[int],
+    response: Response,
+) -> List[StudentSummary]:
+    """get_students_summary in one statement (app/services/dashboard_summary.py)."""
+    rows, keys = await fetch_students_summary_rows(db, teacher_id, year, cursor, limit)
+    rows, _ = page_result(rows, keys, limit, response)
+    return [
+        StudentSummary(
+            id=row.id,
+            user_id=row.user_id,
+            name=row.name,
+            email=row.email,
+            grade=row.grade,
+            class_name=row.class_name,
+            theme_title=row.theme_title,
+            current_phase=row.current_phase,
+            total_reports=row.report_count,
+            current_streak=row.current_streak or 0,
+            max_streak=row.max_streak or 0,
+            last_report_date=row.last_report_date,
+            is_primary=bool(row.is_primary),
+            seminar_lab_id=row.seminar_lab_id,
+            seminar_lab_name=row.seminar_lab_name,
+            top_abilities=top_ability_names(row),
+            alert_level=1 if row.alert else 0,
+        )
+        for row in rows
+    ]
+
+
+async def _lowest_report_count_ids(db: AsyncSession, scope: list, count: int = 5) -> set:
+    """Ids of the `count` students with the fewest reports (all years, from student_stats)."""
+    result = await db.execute(
+        select(Student.id, func.coalesce(func.sum(StudentStats.report_count), 0))
+        .join(User, User.id == Student.user_id)
+        .outerjoin(StudentStats, StudentStats.student_id == Student.id)
+        .where(*scope)
+        .group_by(Student.id, Student.created_at)
+        .order_by(Student.created_at, Student.id)
+    )
+    ranked = sorted(result.all(), key=lambda row: row[1])
+    return {student_id for student_id, _ in ranked[:count]}
+
+
 @router.get("/students/{student_id}", response_model=StudentDetail)
 async def get_student_detail(
     student_id: str,
     current_user: User = Depends(get_current_teacher_or_admin),
+    # Primary, not the replica: reloaded right after PUT /students/{id}
     db: AsyncSession = Depends(get_db),
 ):
     """Get detailed information about a specific student."""
@@ -281,11 +323,10 @@ async def get_student_detail(
     )
     theme = result.scalar_one_or_none()
 
-    # Get report count
-    result = await db.execute(
-        select(func.count(Report.id)).where(Report.student_id == student.id)
-    )
-    report_count = result.scalar()
+    # Report count, latest phase and ability counts from the rollup (all years)
+    stats = await get_student_stats(db, student.id)
+    masters = await get_master_data(db)
+    latest_phase = masters.phase_by_id.get(stats.latest_phase_id) if stats.latest_phase_id else None
 
     # Get streak
     result = await db.execute(
@@ -293,33 +334,10 @@ async def get_student_detail(
     )
     streak = result.scalar_one_or_none()
 
-    # Get latest report's phase
-    result = await db.execute(
-        select(Report)
-        .options(selectinload(Report.phase))
-        .where(Report.student_id == student.id)
-        .order_by(Report.reported_at.desc())
-        .limit(1)
-    )
-    latest_report = result.scalar_one_or_none()
-
-    # Get ability counts (include all abilities, even with 0 count) - MySQL compatible
-    result = await db.execute(
-        select(
-            Ability.id,
-            Ability.name,
-            Ability.display_order,
-            func.sum(case((Report.student_id == student.id, 1), else_=0))
-        )
-        .outerjoin(ReportAbility, ReportAbility.ability_id == Ability.id)
-        .outerjoin(Report, Report.id == ReportAbility.report_id)
-        .where(Ability.is_active == True)
-        .group_by(Ability.id, Ability.name, Ability.display_order)
-        .order_by(Ability.display_order)
-    )
+    # Ability counts (include all active abilities, even with 0 count)
     ability_counts = [
-        AbilityCount(ability_id=row[0], ability_name=row[1], count=int(row[3] or 0))
-        for row in result.all()
+        AbilityCount(ability_id=a.id, ability_name=a.name, count=stats.ability_counts.get(a.id, 0))
+        for a in masters.abilities
     ]
 
     return StudentDetail(
@@ -330,8 +348,8 @@ async def get_student_detail(
         grade=student.grade,
         class_name=student.class_name,
         theme_title=theme.title if theme else None,
-        current_phase=latest_report.phase.name if latest_report and latest_report.phase else None,
-        total_reports=report_count,
+        current_phase=latest_phase.name if latest_phase else None,
+        total_reports=stats.report_count,
         current_streak=streak.current_streak if streak else 0,
         max_streak=streak.max_streak if streak else 0,
         last_report_date=streak.last_report_date if streak else None,
@@ -439,12 +457,14 @@ async def update_student_info(
 @router.get("/students/{student_id}/reports", response_model=List[ReportSummary])
 async def get_student_reports(
     student_id: str,
+    response: Response,
     current_user: User = Depends(get_current_teacher_or_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor（指定時は skip を無視）"),
 ):
-    """Get reports of a specific student."""
+    """Get reports of a specific student (newest first, next page cursor in X-Next-Cursor)."""
     teacher = await get_teacher_profile(db, current_user)
     fiscal_year = settings.get_current_fiscal_year()
 
@@ -472,18 +492,19 @@ async def get_student_reports(
             raise HTTPException(status_code=403, detail="Access denied to this student")
 
     # Get reports
+    keys = (Report.reported_at, Report.id)
     result = await db.execute(
-        select(Report)
-        .options(
-            selectinload(Report.phase),
-            selectinload(Report.selected_abilities).selectinload(ReportAbility.ability),
+        apply_keyset(
+            select(Report)
+            .options(
+                selectinload(Report.phase),
+                selectinload(Report.selected_abilities).selectinload(ReportAbility.ability),
+            )
+            .where(Report.student_id == student_id),
+            keys, cursor, limit, skip=skip,
         )
-        .where(Report.student_id == student_id)
-        .order_by(Report.reported_at.desc())
-        .offset(skip)
-        .limit(limit)
     )
-    reports = result.scalars().all()
+    reports, _ = page_result(result.scalars().all(), keys, limit, response)
 
     return [
         ReportSummary(
@@ -500,24 +521,33 @@ async def get_student_reports(
 
 @router.get("/scatter-data", response_model=ScatterDataResponse)
 async def get_scatter_data(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_teacher_or_admin),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     fiscal_year: Optional[int] = None,
 ):
     """Get scatter plot data for all assigned students with ability scores.
 
     Optimized to use batch queries instead of N+1 pattern.
+    Returns 304 when If-None-Match matches the ETag (nothing in scope changed).
     """
     teacher = await get_teacher_profile(db, current_user)
     year = fiscal_year or settings.get_current_fiscal_year()
 
     # Get all abilities (7つの能力)
-    result = await db.execute(
-        select(Ability)
-        .where(Ability.is_active == True)
-        .order_by(Ability.display_order)
-    )
-    abilities = result.scalars().all()
+    masters = await get_master_data(db)
+
+    if settings.ETAG_ENABLED:
+        etag = make_etag(
+            "dashboard-scatter", current_user.id, year, masters.digest,
+            *await teacher_scope_version(db, teacher.id, year),
+        )
+        not_modified = conditional(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+
+    abilities = masters.abilities
     ability_info_list = [
         AbilityInfo(
             id=a.id,
@@ -554,26 +584,8 @@ async def get_scatter_data(
 
     student_ids = [s.id for s in students_to_process]
 
-    # BATCH: Get all ability scores and points for all students in one query
-    ability_data_result = await db.execute(
-        select(
-            Report.student_id,
-            ReportAbility.ability_id,
-            func.count(ReportAbility.id).label('count'),
-            func.sum(ReportAbility.points).label('total_points'),
-        )
-        .join(ReportAbility, ReportAbility.report_id == Report.id)
-        .where(Report.student_id.in_(student_ids))
-        .group_by(Report.student_id, ReportAbility.ability_id)
-    )
-
-    # Build nested map: student_id -> ability_id -> {count, points}
-    student_ability_data = defaultdict(lambda: defaultdict(lambda: {'count': 0, 'points': 0}))
-    for row in ability_data_result.all():
-        student_ability_data[row[0]][str(row[1])] = {
-            'count': int(row[2] or 0),
-            'points': int(row[3] or 0),
-        }
+    # BATCH: Ability counts and points for all students from the rollup (all years)
+    stats_map = await load_student_stats(db, student_ids)
 
     # Build response
     data_points = []
@@ -587,10 +599,10 @@ async def get_scatter_data(
         ability_points = {aid: 0 for aid in ability_ids}
 
         # Fill in actual values
-        student_data = student_ability_data.get(student.id, {})
-        for ability_id, data in student_data.items():
-            ability_scores[ability_id] = data['count']
-            ability_points[ability_id] = data['points']
+        stats = stats_map.get(str(student.id))
+        if stats:
+            ability_scores.update(stats.ability_counts)
+            ability_points.update(stats.ability_points)
 
         data_points.append(ScatterDataPoint(
             student_id=student.id,
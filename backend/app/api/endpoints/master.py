@@ -18,6 +18,7 @@ from app.schemas.research import (
     SeminarLabResponse,
     SeminarLabListResponse,
 )
+from app.services.master_data import get_master_data
 from app.schemas.master import (
     BookCreate,
     BookUpdate,
@@ -33,12 +34,8 @@ async def get_abilities(
     db: AsyncSession = Depends(get_db),
 ):
     """Get all active abilities."""
-    result = await db.execute(
-        select(Ability)
-        .where(Ability.is_active == True)
-        .order_by(Ability.display_order)
-    )
-    return result.scalars().all()
+    masters = await get_master_data(db)
+    return masters.abilities
 
 
 @router.get("/abilities/{ability_id}", response_model=AbilityResponse)
@@ -65,12 +62,8 @@ async def get_research_phases(
     db: AsyncSession = Depends(get_db),
 ):
     """Get all active research phases."""
-    result = await db.execute(
-        select(ResearchPhase)
-        .where(ResearchPhase.is_active == True)
-        .order_by(ResearchPhase.display_order)
-    )
-    return result.scalars().all()
+    masters = await get_master_data(db)
+    return masters.phases
 
 
 @router.get("/research-phases/{phase_id}", response_model=ResearchPhaseResponse)
@@ -1,4 +1,5 @@
 from typing import List, Optional
+import asyncio
 import logging
 import os
 import shutil
@@ -6,25 +7,28 @@ import uuid
 from uuid import UUID
 from datetime import datetime, date, timezone, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response
 
 # Japan Standard Time (UTC+9)
 JST = timezone(timedelta(hours=9))
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, func, delete, update
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.db.session import get_db, AsyncSessionLocal
 from app.core.config import settings
-from app.core.security import get_current_user, get_current_student
+from app.core.pagination import apply_keyset, page_result
+from app.core.security import get_current_user, get_current_student, get_current_teacher_or_admin
 from app.models import (
-    User, Student, Report, ReportAbility, ResearchTheme,
-    ResearchPhase, Ability, StreakRecord
+    User, UserRole, Student, Teacher, StudentTeacher, Report, ReportAbility, ResearchTheme,
+    Ability, StreakRecord, AnalysisStatus
 )
 from app.schemas.research import (
     ReportCreate,
     ReportUpdate,
     ReportResponse,
+    ReportAnalysisStatusResponse,
+    BulkImportResponse,
     ReportListResponse,
     ReportAbilityResponse,
     ResearchPhaseResponse,
@@ -32,24 +36,21 @@ from app.schemas.research import (
     DetectedAbility,
 )
 from typing import Union
-from app.services.analysis import analyze_report_content
+from app.services.analysis import analyze_report_content, pick_report_abilities, _heuristic_analysis
+from app.services.background import analysis_pool
+from app.services.bulk_import import BulkImportError, detect_format, import_reports, parse_records
+from app.services.student_stats import refresh_student_stats, report_stats_key
+from app.services.master_data import MasterDataSnapshot, get_master_data
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
 
-def _get_ability_attr(item: Union[dict, DetectedAbility], attr: str, default=None):
-    """Get attribute from dict or DetectedAbility object."""
-    if isinstance(item, dict):
-        return item.get(attr, default)
-    return getattr(item, attr, default)
-
-
 async def _set_report_abilities_to_three(
     db: AsyncSession,
     report: Report,
-    all_abilities_ordered: List[Ability],
+    masters: MasterDataSnapshot,
     detected_abilities: Optional[List[Union[dict, DetectedAbility]]] = None,
     fallback_ability_ids: Optional[List[UUID]] = None,
 ):
@@ -60,78 +61,14 @@ async def _set_report_abilities_to_three(
 
     Uses 'role' field from detected_abilities if available to determine strong vs sub.
     """
-    detected_abilities = detected_abilities or []
-    fallback_ability_ids = fallback_ability_ids or []
-
-    # Build ability lookup by name
-    name_to_ability = {a.name: a for a in all_abilities_ordered}
-    id_to_ability = {str(a.id): a for a in all_abilities_ordered}
-
-    # Separate strong and sub abilities based on 'role' field
-    strong_ability: Optional[Ability] = None
-    sub_abilities: List[Ability] = []
-
-    for item in detected_abilities:
-        name = _get_ability_attr(item, "name")
-        if not name or name not in name_to_ability:
-            continue
-        ability = name_to_ability[name]
-        role = _get_ability_attr(item, "role", "sub")
-
-        # First strong ability found becomes the primary
-        if role == "strong" and strong_ability is None:
-            strong_ability = ability
-        elif ability != strong_ability and ability not in sub_abilities:
-            sub_abilities.append(ability)
-            if len(sub_abilities) >= 2:
-                break
-
-    # If no strong ability found, use the first detected ability
-    if strong_ability is None and detected_abilities:
-        for item in detected_abilities:
-            name = _get_ability_attr(item, "name")
-            if name and name in name_to_ability:
-                strong_ability = name_to_ability[name]
-                break
-
-    # If still no strong, use fallback or first from all abilities
-    if strong_ability is None:
-        for aid in fallback_ability_ids:
-            a = id_to_ability.get(str(aid))
-            if a:
-                strong_ability = a
-                break
-        if strong_ability is None and all_abilities_ordered:
-            strong_ability = all_abilities_ordered[0]
-
-    # Fill sub abilities if needed
-    for aid in fallback_ability_ids:
-        if len(sub_abilities) >= 2:
-            break
-        a = id_to_ability.get(str(aid))
-        if a and a != strong_ability and a not in sub_abilities:
-            sub_abilities.append(a)
-
-    for a in all_abilities_ordered:
-        if len(sub_abilities) >= 2:
-            break
-        if a != strong_ability and a not in sub_abilities:
-            sub_abilities.append(a)
-
-    # Build final list: strong first, then subs
-    picked = []
-    if strong_ability:
-        picked.append(strong_ability)
-    picked.extend(sub_abilities[:2])
+    picked = pick_report_abilities(masters, detected_abilities, fallback_ability_ids)
 
     # Clear existing report abilities
     await db.execute(delete(ReportAbility).where(ReportAbility.report_id == report.id))
     await db.flush()
 
     now = datetime.utcnow()
-    for idx, ability in enumerate(picked):
-        role = "strong" if idx == 0 else "sub"
-        points = STRONG_ABILITY_POINTS if idx == 0 else SUB_ABILITY_POINTS
+    for ability, role, points in picked:
         logger.debug(f"Setting ability '{ability.name}' with role={role}, points={points}")
         db.add(ReportAbility(
             report_id=report.id,
@@ -204,9 +141,195 @@ async def update_streak(db: AsyncSession, student_id: UUID) -> None:
         streak.updated_at = datetime.utcnow()
 
 
-# Ability point constants
-STRONG_ABILITY_POINTS = 2  # Points for the primary/strong ability
-SUB_ABILITY_POINTS = 1     # Points for each sub ability
+def _status_time() -> datetime:
+    # Whole seconds: a MySQL DATETIME stores them exactly, so updated_at can be compared later
+    return datetime.utcnow().replace(microsecond=0)
+
+
+async def _transition_analysis(
+    report_id: UUID,
+    from_status: AnalysisStatus,
+    seen_at: datetime,
+    to_status: AnalysisStatus,
+) -> Optional[datetime]:
+    """Move a report from_status -> to_status if it is unchanged since `seen_at` (its updated_at).
+
+    Returns the new updated_at, or None when another job or sweep has taken the report.
+    """
+    now = _status_time()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Report)
+            .where(
+                Report.id == report_id,
+                Report.analysis_status == from_status.value,
+                Report.updated_at == seen_at,
+            )
+            .values(analysis_status=to_status.value, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    return now if result.rowcount == 1 else None
+
+
+async def _run_deferred_analysis(
+    report_id: UUID,
+    claimed_at: datetime,
+    content: str,
+    theme_title: Optional[str],
+    student_name: Optional[str],
+    fallback_ability_ids: List[UUID],
+    phase_locked: bool,
+) -> None:
+    """Background job: run AI analysis and update ai_comment, phase and abilities.
+
+    `claimed_at` is the report's updated_at when the job was submitted. The job
+    only starts if the report is still PENDING with that updated_at, and only
+    stores its result if it still owns the RUNNING report, so a report requeued
+    by requeue_stale_analyses() meanwhile is analyzed (and written) once.
+
+    The report never stays RUNNING: any error marks it FAILED (the heuristic
+    result is kept), and cancellation on shutdown puts it back to PENDING so
+    requeue_stale_analyses() picks it up again.
+    """
+    running_at = None
+    try:
+        running_at = await _transition_analysis(report_id, AnalysisStatus.PENDING, claimed_at, AnalysisStatus.RUNNING)
+        if running_at is None:
+            logger.info(f"Deferred analysis of report {report_id} skipped: taken by another job or deleted")
+            return
+        await _analyze_and_store(
+            report_id, running_at, content, theme_title, student_name, fallback_ability_ids, phase_locked,
+        )
+    except BaseException as e:
+        cancelled = isinstance(e, asyncio.CancelledError)
+        if cancelled:
+            logger.warning(f"Deferred analysis cancelled for report {report_id}; back to pending")
+        else:
+            logger.exception(f"Deferred analysis failed for report {report_id}: {e}")
+        if running_at is not None:
+            try:
+                await _transition_analysis(
+                    report_id, AnalysisStatus.RUNNING, running_at,
+                    AnalysisStatus.PENDING if cancelled else AnalysisStatus.FAILED,
+                )
+            except Exception as status_error:
+                # Left RUNNING; requeue_stale_analyses() retries it once it is stale
+                logger.error(f"Could not update analysis status of report {report_id}: {status_error}")
+        if not isinstance(e, Exception):
+            raise
+
+
+async def _analyze_and_store(
+    report_id: UUID,
+    running_at: datetime,
+    content: str,
+    theme_title: Optional[str],
+    student_name: Optional[str],
+    fallback_ability_ids: List[UUID],
+    phase_locked: bool,
+) -> None:
+    """AI analysis of a deferred report. The DB session is not held while waiting for Gemini."""
+    suggested_phase, detected_abilities, ai_comment = await analyze_report_content(
+        content=content,
+        theme_title=theme_title,
+        student_name=student_name,
+    )
+
+    async with AsyncSessionLocal() as db:
+        report = await db.get(Report, report_id, with_for_update=True)
+        if not report:
+            # Deleted while the analysis was running
+            return
+        if report.analysis_status != AnalysisStatus.RUNNING.value or report.updated_at != running_at:
+            # Requeued as stale while Gemini was slow; the newer job stores its result
+            logger.info(f"Deferred analysis of report {report_id} dropped: taken over by another job")
+            return
+
+        masters = await get_master_data(db)
+
+        report.ai_comment = ai_comment
+
+        await _set_report_abilities_to_three(
+            db=db,
+            report=report,
+            masters=masters,
+            detected_abilities=detected_abilities,
+            fallback_ability_ids=fallback_ability_ids,
+        )
+
+        # Keep the phase chosen by the student; otherwise replace the heuristic phase
+        if suggested_phase and not phase_locked:
+            detected_phase = masters.phase_by_name.get(suggested_phase)
+            if detected_phase:
+                report.phase_id = detected_phase.id
+
+        report.analysis_status = AnalysisStatus.COMPLETED.value
+        report.updated_at = datetime.utcnow()
+        await refresh_student_stats(db, [report_stats_key(report)])
+        await db.commit()
+
+
+async def requeue_stale_analyses() -> int:
+    """Re-submit deferred analyses left PENDING / RUNNING (worker restart, cancelled on shutdown).
+
+    Only reports untouched for ANALYSIS_STALE_AFTER_SECONDS are taken, so jobs
+    still running in other workers are left alone. Each report is claimed with
+    a conditional UPDATE, so two workers sweeping at once do not both run it.
+    The student's own phase choice is not stored, so the AI never overrides
+    the phase of a requeued report (phase_locked). Returns the number requeued.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.ANALYSIS_STALE_AFTER_SECONDS)
+    requeued = 0
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Report)
+            .options(selectinload(Report.theme), selectinload(Report.student).selectinload(Student.user))
+            .where(
+                Report.analysis_status.in_([AnalysisStatus.PENDING.value, AnalysisStatus.RUNNING.value]),
+                Report.updated_at < cutoff,
+            )
+            .order_by(Report.updated_at)
+            .limit(analysis_pool.max_pending)
+        )
+        for report in result.scalars().all():
+            if not analysis_pool.has_capacity():
+                break
+            if analysis_pool.holds(report.id):
+                # Still queued (or running) in this worker
+                continue
+            claimed_at = _status_time()
+            claimed = await db.execute(
+                update(Report)
+                .where(
+                    Report.id == report.id,
+                    Report.analysis_status == report.analysis_status,
+                    Report.updated_at == report.updated_at,
+                )
+                .values(analysis_status=AnalysisStatus.PENDING.value, updated_at=claimed_at)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                continue
+
+            def _job(report=report, claimed_at=claimed_at):
+                return _run_deferred_analysis(
+                    report_id=report.id,
+                    claimed_at=claimed_at,
+                    content=report.content,
+                    theme_title=report.theme.title if report.theme else None,
+                    student_name=report.student.user.name if report.student and report.student.user else None,
+                    fallback_ability_ids=[],
+                    phase_locked=True,
+                )
+
+            if analysis_pool.submit(_job, label=f"report {report.id} (requeued)", key=report.id):
+                requeued += 1
+    if requeued:
+        logger.info(f"Requeued {requeued} stale deferred analyses")
+    return requeued
+
 
 # Security constants for file upload
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
@@ -298,15 +421,71 @@ async def upload_image(
     return {"url": f"/static/uploads/{safe_filename}"}
 
 
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_import_reports(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="jsonl / json / csv（省略時は拡張子から判定）"),
+    analysis: str = Query("heuristic", description="heuristic（LLMなし） / ai（並列数制限付きでGemini分析）"),
+    dry_run: bool = Query(False, description="検証のみ行い、保存しない"),
+    current_user: User = Depends(get_current_teacher_or_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Import many reports at once (paper/offline diaries, historical data).
+
+    Rows are validated and inserted in chunks; invalid rows are skipped and
+    listed in `errors`. Teachers can import only for their assigned students.
+    """
+    try:
+        fmt = detect_format(file.filename, format)
+        records = parse_records(await file.read(), fmt)
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(records) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many rows: {len(records)} (max {settings.BULK_IMPORT_MAX_ROWS})",
+        )
+
+    allowed_student_ids = None
+    if current_user.role == UserRole.TEACHER:
+        result = await db.execute(
+            select(StudentTeacher.student_id)
+            .join(Teacher, Teacher.id == StudentTeacher.teacher_id)
+            .where(
+                Teacher.user_id == current_user.id,
+                StudentTeacher.is_active == True,
+            )
+        )
+        allowed_student_ids = {str(sid) for sid in result.scalars().all()}
+    # Release the request session; the import uses its own sessions
+    await db.close()
+
+    try:
+        import_result = await import_reports(
+            records,
+            analysis=analysis,
+            allowed_student_ids=allowed_student_ids,
+            dry_run=dry_run,
+        )
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return BulkImportResponse(**import_result.to_dict())
+
+
 @router.get("", response_model=List[ReportListResponse])
 async def get_reports(
+    response: Response,
     current_user: User = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
     theme_id: Optional[UUID] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor（指定時は skip を無視）"),
 ):
-    """Get current student's reports."""
+    """Get current student's reports (newest first, next page cursor in X-Next-Cursor)."""
     student = await get_student_from_user(db, current_user)
 
     query = (
@@ -321,9 +500,10 @@ async def get_reports(
     if theme_id:
         query = query.where(Report.theme_id == theme_id)
 
-    query = query.order_by(Report.reported_at.desc()).offset(skip).limit(limit)
+    keys = (Report.reported_at, Report.id)
+    query = apply_keyset(query, keys, cursor, limit, skip=skip)
     result = await db.execute(query)
-    reports = result.scalars().all()
+    reports, _ = page_result(result.scalars().all(), keys, limit, response)
 
     return [
         ReportListResponse(
@@ -346,10 +526,19 @@ async def get_reports(
 @router.post("", response_model=ReportResponse, status_code=status.HTTP_201_CREATED)
 async def create_report(
     report_data: ReportCreate,
+    response: Response,
     current_user: User = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
+    defer_analysis: Optional[bool] = Query(
+        None,
+        description="Trueで即時保存して202を返し、AI分析はバックグラウンドで実行（未指定時はREPORT_ANALYSIS_MODEに従う）",
+    ),
 ):
-    """Create a new report."""
+    """Create a new report.
+
+    In deferred mode the report is committed with heuristic abilities and 202 is
+    returned; poll GET /reports/{report_id}/analysis for the AI result.
+    """
     student = await get_student_from_user(db, current_user)
 
     # Validate theme_id is provided
@@ -373,21 +562,16 @@ async def create_report(
             detail="Research theme not found or does not belong to current student"
         )
 
+    masters = await get_master_data(db)
+
     # Verify phase if provided
-    phase = None
     if report_data.phase_id:
-        result = await db.execute(
-            select(ResearchPhase).where(ResearchPhase.id == report_data.phase_id)
-        )
-        phase = result.scalar_one_or_none()
-        if not phase:
+        if str(report_data.phase_id) not in masters.phase_by_id:
             raise HTTPException(status_code=404, detail="Research phase not found")
 
     # Verify abilities (optional fallback if AI analysis is unavailable)
     if report_data.ability_ids:
-        result = await db.execute(select(Ability).where(Ability.id.in_(report_data.ability_ids)))
-        abilities = result.scalars().all()
-        if len(abilities) != len(report_data.ability_ids):
+        if any(str(aid) not in masters.ability_by_id for aid in set(report_data.ability_ids)):
             raise HTTPException(status_code=400, detail="Some abilities not found")
 
     # Create report
@@ -407,6 +591,11 @@ async def create_report(
     # Update streak
     await update_streak(db, student.id)
 
+    deferred = settings.REPORT_ANALYSIS_MODE == "deferred" if defer_analysis is None else defer_analysis
+    # Fall back to inline analysis when the worker pool is saturated
+    deferred = deferred and analysis_pool.has_capacity()
+    student_name = current_user.name if current_user and hasattr(current_user, 'name') else None
+
     # Use pre-analyzed data if provided, otherwise analyze now
     if report_data.ai_comment and report_data.detected_abilities:
         # Use pre-analyzed data from /reports/analyze endpoint
@@ -415,23 +604,34 @@ async def create_report(
         suggested_phase = None  # Phase should already be set from analyze
 
         # Set abilities from pre-analyzed data
-        all_abilities_result = await db.execute(
-            select(Ability).where(Ability.is_active == True).order_by(Ability.display_order)
+        await _set_report_abilities_to_three(
+            db=db,
+            report=report,
+            masters=masters,
+            detected_abilities=detected_abilities,
+            fallback_ability_ids=report_data.ability_ids,
         )
-        all_abilities_ordered = list(all_abilities_result.scalars().all())
+    elif deferred:
+        # Commit immediately with heuristic abilities; AI analysis runs in the background
+        suggested_phase, detected_abilities, _ = _heuristic_analysis(report_data.content)
+        report.ai_comment = None
+        report.analysis_status = AnalysisStatus.PENDING.value
+
         await _set_report_abilities_to_three(
             db=db,
             report=report,
-            all_abilities_ordered=all_abilities_ordered,
+            masters=masters,
             detected_abilities=detected_abilities,
             fallback_ability_ids=report_data.ability_ids,
         )
+
+        if suggested_phase and not report.phase_id:
+            detected_phase = masters.phase_by_name.get(suggested_phase)
+            if detected_phase:
+                report.phase_id = detected_phase.id
     else:
         # Analyze report and get AI comment with detected abilities
         try:
-            # Get student name for personalized comment (use current_user.name since User has the name)
-            student_name = current_user.name if current_user and hasattr(current_user, 'name') else None
-
             suggested_phase, detected_abilities, ai_comment = await analyze_report_content(
                 content=report_data.content,
                 theme_title=theme.title,
@@ -441,24 +641,17 @@ async def create_report(
             report.ai_comment = ai_comment
 
             # Always set exactly 3 abilities for this report (strong 1 + sub 2) and assign points
-            all_abilities_result = await db.execute(
-                select(Ability).where(Ability.is_active == True).order_by(Ability.display_order)
-            )
-            all_abilities_ordered = list(all_abilities_result.scalars().all())
             await _set_report_abilities_to_three(
                 db=db,
                 report=report,
-                all_abilities_ordered=all_abilities_ordered,
+                masters=masters,
                 detected_abilities=detected_abilities,
                 fallback_ability_ids=report_data.ability_ids,
             )
 
             # Update phase if AI detected one and user didn't specify
             if suggested_phase and not report.phase_id:
-                phase_result = await db.execute(
-                    select(ResearchPhase).where(ResearchPhase.name == suggested_phase)
-                )
-                detected_phase = phase_result.scalar_one_or_none()
+                detected_phase = masters.phase_by_name.get(suggested_phase)
                 if detected_phase:
                     report.phase_id = detected_phase.id
 
@@ -467,21 +660,40 @@ async def create_report(
             logger.exception(f"Failed to analyze report: {e}")
             report.ai_comment = None
             # Fallback: set abilities from user selection (or default) if analysis fails
-            all_abilities_result = await db.execute(
-                select(Ability).where(Ability.is_active == True).order_by(Ability.display_order)
-            )
-            all_abilities_ordered = list(all_abilities_result.scalars().all())
             await _set_report_abilities_to_three(
                 db=db,
                 report=report,
-                all_abilities_ordered=all_abilities_ordered,
+                masters=masters,
                 detected_abilities=[],
                 fallback_ability_ids=report_data.ability_ids,
             )
 
+    await refresh_student_stats(db, [report_stats_key(report)])
     await db.commit()
     await db.refresh(report)
 
+    if report.analysis_status == AnalysisStatus.PENDING.value:
+        report_id = report.id
+        claimed_at = report.updated_at  # as stored (refreshed above)
+
+        async def _job():
+            await _run_deferred_analysis(
+                report_id=report_id,
+                claimed_at=claimed_at,
+                content=report_data.content,
+                theme_title=theme.title,
+                student_name=student_name,
+                fallback_ability_ids=list(report_data.ability_ids),
+                phase_locked=report_data.phase_id is not None,
+            )
+
+        if analysis_pool.submit(_job, label=f"report {report_id}", key=report_id):
+            response.status_code = status.HTTP_202_ACCEPTED
+        else:
+            # Pool closed/full between the capacity check and now: keep the heuristic result
+            report.analysis_status = AnalysisStatus.FAILED.value
+            await db.commit()
+
     # Reload with relationships
     result = await db.execute(
         select(Report)
@@ -509,6 +721,7 @@ async def create_report(
             for ra in report.selected_abilities
         ],
         ai_comment=report.ai_comment,
+        analysis_status=report.analysis_status,
         reported_at=report.reported_at,
         created_at=report.created_at,
         updated_at=report.updated_at,
@@ -538,6 +751,44 @@ async def get_streak(
     return streak
 
 
+@router.get("/{report_id}/analysis", response_model=ReportAnalysisStatusResponse)
+async def get_report_analysis_status(
+    report_id: UUID,
+    current_user: User = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    """Poll the AI analysis status of a report (deferred mode)."""
+    student = await get_student_from_user(db, current_user)
+
+    result = await db.execute(
+        select(Report)
+        .options(
+            selectinload(Report.phase),
+            selectinload(Report.selected_abilities).selectinload(ReportAbility.ability),
+        )
+        .where(Report.id == report_id, Report.student_id == student.id)
+    )
+    report = result.scalar_one_or_none()
+
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    return ReportAnalysisStatusResponse(
+        report_id=report.id,
+        analysis_status=report.analysis_status,
+        phase=ResearchPhaseResponse(
+            id=report.phase.id,
+            name=report.phase.name,
+            display_order=report.phase.display_order,
+        ) if report.phase else None,
+        selected_abilities=[
+            ReportAbilityResponse(id=ra.ability.id, name=ra.ability.name)
+            for ra in report.selected_abilities
+        ],
+        ai_comment=report.ai_comment,
+    )
+
+
 @router.get("/{report_id}", response_model=ReportResponse)
 async def get_report(
     report_id: UUID,
@@ -576,6 +827,7 @@ async def get_report(
             for ra in report.selected_abilities
         ],
         ai_comment=report.ai_comment,
+        analysis_status=report.analysis_status,
         reported_at=report.reported_at,
         created_at=report.created_at,
         updated_at=report.updated_at,
@@ -612,11 +864,8 @@ async def update_report(
         report.image_url = update_data.image_url
 
     if update_data.phase_id is not None:
-        result = await db.execute(
-            select(ResearchPhase).where(ResearchPhase.id == update_data.phase_id)
-        )
-        phase = result.scalar_one_or_none()
-        if not phase:
+        masters = await get_master_data(db)
+        if str(update_data.phase_id) not in masters.phase_by_id:
             raise HTTPException(status_code=404, detail="Research phase not found")
         report.phase_id = update_data.phase_id
 
@@ -644,6 +893,7 @@ async def update_report(
                 db.add(report_ability)
 
     report.updated_at = datetime.utcnow()
+    await refresh_student_stats(db, [report_stats_key(report)])
     await db.commit()
 
     # Reload report
@@ -673,6 +923,7 @@ async def update_report(
             for ra in report.selected_abilities
         ],
         ai_comment=report.ai_comment,
+        analysis_status=report.analysis_status,
         reported_at=report.reported_at,
         created_at=report.created_at,
         updated_at=report.updated_at,
@@ -696,5 +947,7 @@ async def delete_report(
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
 
+    stats_key = report_stats_key(report)
     await db.delete(report)
+    await refresh_student_stats(db, [stats_key])
     await db.commit()
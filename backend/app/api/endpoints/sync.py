@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db.session import get_db
+from app.core.config import settings
+from app.core.security import get_current_student
+from app.models import (
+    User, Student, Report, ResearchTheme, StreakRecord, Ability, ResearchPhase,
+    ChangeLog, ChangeOp,
+)
+from app.schemas.research import (
+    AbilityResponse,
+    ReportAbilityResponse,
+    ReportResponse,
+    ResearchPhaseResponse,
+    ResearchThemeResponse,
+    StreakRecordResponse,
+)
+from app.schemas.sync import SyncResponse, SyncTombstone
+from app.services.master_data import MasterDataSnapshot, get_master_data
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+async def get_student_from_user(db: AsyncSession, user: User) -> Student:
+    """Helper to get student profile from user."""
+    result = await db.execute(
+        select(Student).where(Student.user_id == user.id)
+    )
+    student = result.scalar_one_or_none()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student profile not found")
+    return student
+
+
+def _report_response(report: Report, masters: MasterDataSnapshot) -> ReportResponse:
+    """Report payload (phase / ability names from master data, no extra joins)."""
+    phase = masters.phase_by_id.get(str(report.phase_id)) if report.phase_id else None
+    abilities = []
+    for ra in report.selected_abilities:
+        ability = masters.ability_by_id.get(str(ra.ability_id))
+        if ability:
+            abilities.append(ReportAbilityResponse(id=ability.id, name=ability.name))
+    return ReportResponse(
+        id=report.id,
+        student_id=report.student_id,
+        theme_id=report.theme_id,
+        content=report.content,
+        image_url=report.image_url,
+        phase=ResearchPhaseResponse(
+            id=phase.id,
+            name=phase.name,
+            display_order=phase.display_order,
+        ) if phase else None,
+        selected_abilities=abilities,
+        ai_comment=report.ai_comment,
+        analysis_status=report.analysis_status,
+        reported_at=report.reported_at,
+        created_at=report.created_at,
+        updated_at=report.updated_at,
+    )
+
+
+async def _load_reports(db: AsyncSession, masters: MasterDataSnapshot, *where) -> List[ReportResponse]:
+    result = await db.execute(
+        select(Report)
+        .options(selectinload(Report.selected_abilities))
+        .where(*where)
+        .order_by(Report.reported_at.desc())
+    )
+    return [_report_response(r, masters) for r in result.scalars().all()]
+
+
+async def _full_sync(db: AsyncSession, student: Student, cursor: int) -> SyncResponse:
+    masters = await get_master_data(db)
+
+    result = await db.execute(
+        select(ResearchTheme).where(ResearchTheme.student_id == student.id)
+    )
+    themes = result.scalars().all()
+    result = await db.execute(
+        select(StreakRecord).where(StreakRecord.student_id == student.id)
+    )
+    streak = result.scalar_one_or_none()
+
+    return SyncResponse(
+        cursor=str(cursor),
+        full=True,
+        reports=await _load_reports(db, masters, Report.student_id == student.id),
+        themes=[ResearchThemeResponse.model_validate(t) for t in themes],
+        streak=StreakRecordResponse.model_validate(streak) if streak else None,
+        abilities=[AbilityResponse.model_validate(a) for a in masters.abilities],
+        phases=[ResearchPhaseResponse.model_validate(p) for p in masters.phases],
+    )
+
+
+@router.get("", response_model=SyncResponse)
+async def sync(
+    since: Optional[str] = Query(None, description="前回レスポンスの cursor（省略時は全件）"),
+    current_user: User = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    差分同期。`since` 以降に作成・更新・削除された日報・テーマ・継続記録・
+    マスタデータだけを返す（削除は `deleted` にトゥームストーンとして含める）。
+    """
+    student = await get_student_from_user(db, current_user)
+
+    # Read the cursor first so changes committed while building the response are not skipped
+    result = await db.execute(select(func.max(ChangeLog.id)))
+    head = result.scalar() or 0
+
+    if since is None or since == "":
+        return await _full_sync(db, student, head)
+    try:
+        since_id = int(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if since_id < 0 or since_id > head:
+        # Unknown cursor (e.g. database restored): start over
+        return await _full_sync(db, student, head)
+
+    result = await db.execute(
+        select(ChangeLog)
+        .where(
+            ChangeLog.id > max(0, since_id - settings.SYNC_CURSOR_OVERLAP),
+            ChangeLog.id <= head,
+            or_(ChangeLog.student_id == student.id, ChangeLog.student_id.is_(None)),
+        )
+        .order_by(ChangeLog.id)
+        .limit(settings.SYNC_MAX_CHANGES + 1)
+    )
+    entries = result.scalars().all()
+    has_more = len(entries) > settings.SYNC_MAX_CHANGES
+    entries = entries[: settings.SYNC_MAX_CHANGES]
+    cursor = entries[-1].id if has_more else head
+
+    # Latest op per entity wins
+    latest: Dict[Tuple[str, str], str] = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry.op
+
+    upserts: Dict[str, Set[str]] = {}
+    deleted: List[SyncTombstone] = []
+    for (entity, entity_id), op in latest.items():
+        if op == ChangeOp.DELETE:
+            deleted.append(SyncTombstone(entity=entity, id=entity_id))
+        else:
+            upserts.setdefault(entity, set()).add(entity_id)
+
+    masters = await get_master_data(db)
+    response = SyncResponse(cursor=str(cursor), has_more=has_more, deleted=deleted)
+
+    if upserts.get("report"):
+        response.reports = await _load_reports(
+            db, masters,
+            Report.id.in_(upserts["report"]),
+            Report.student_id == student.id,
+        )
+    if upserts.get("theme"):
+        result = await db.execute(
+            select(ResearchTheme).where(
+                ResearchTheme.id.in_(upserts["theme"]),
+                ResearchTheme.student_id == student.id,
+            )
+        )
+        response.themes = [ResearchThemeResponse.model_validate(t) for t in result.scalars().all()]
+    if upserts.get("streak"):
+        result = await db.execute(
+            select(StreakRecord).where(StreakRecord.student_id == student.id)
+        )
+        streak = result.scalar_one_or_none()
+        response.streak = StreakRecordResponse.model_validate(streak) if streak else None
+
+    # Master data: deactivated rows are sent as tombstones
+    for entity, model, schema, target in (
+        ("ability", Ability, AbilityResponse, response.abilities),
+        ("phase", ResearchPhase, ResearchPhaseResponse, response.phases),
+    ):
+        if not upserts.get(entity):
+            continue
+        result = await db.execute(select(model).where(model.id.in_(upserts[entity])))
+        for row in result.scalars().all():
+            if row.is_active:
+                target.append(schema.model_validate(row))
+            else:
+                response.deleted.append(SyncTombstone(entity=entity, id=str(row.id)))
+
+    # Upserted rows that no longer exist (deleted after the last entry we read)
+    returned = {
+        "report": {str(r.id) for r in response.reports},
+        "theme": {str(t.id) for t in response.themes},
+        "ability": {str(a.id) for a in response.abilities},
+        "phase": {str(p.id) for p in response.phases},
+    }
+    tombstoned = {(d.entity, d.id) for d in response.deleted}
+    for entity, ids in upserts.items():
+        if entity not in returned:
+            continue
+        for entity_id in ids - returned[entity]:
+            if (entity, entity_id) not in tombstoned:
+                response.deleted.append(SyncTombstone(entity=entity, id=entity_id))
+
+    return response
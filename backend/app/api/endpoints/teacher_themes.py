@@ -3,12 +3,13 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.db.session import get_db
 from app.core.config import settings
+from app.core.pagination import apply_keyset, page_result
 from app.core.security import get_current_teacher
 from app.models import User, Student, ResearchTheme, ThemeStatus
 from app.schemas.research import (
@@ -22,12 +23,18 @@ router = APIRouter(prefix="/teacher/themes", tags=["Teacher Theme Management"])
 
 @router.get("/", response_model=List[ResearchThemeResponse])
 async def get_all_themes(
+    response: Response,
     current_user: User = Depends(get_current_teacher),
     db: AsyncSession = Depends(get_db),
     fiscal_year: Optional[int] = None,
     student_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200, description="省略時は全件"),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor"),
 ):
-    """Get all research themes (teacher view). Can filter by fiscal year or student."""
+    """Get all research themes (teacher view). Can filter by fiscal year or student.
+
+    With `limit`, results are paged by (created_at, id); the next page cursor is in X-Next-Cursor.
+    """
     query = select(ResearchTheme)
 
     if fiscal_year:
@@ -36,9 +43,11 @@ async def get_all_themes(
     if student_id:
         query = query.where(ResearchTheme.student_id == student_id)
 
-    query = query.order_by(ResearchTheme.created_at.desc())
+    keys = (ResearchTheme.created_at, ResearchTheme.id)
+    query = apply_keyset(query, keys, cursor, limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    themes, _ = page_result(result.scalars().all(), keys, limit, response)
+    return themes
 
 
 @router.get("/student/{student_id}", response_model=List[ResearchThemeResponse])
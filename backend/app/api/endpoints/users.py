@@ -3,13 +3,14 @@ from uuid import UUID
 import uuid
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
 from app.core.config import settings
+from app.core.pagination import apply_keyset, page_result
 from app.core.security import get_current_user, get_current_admin, get_current_teacher_or_admin
 from app.models import User, UserRole, Student, Teacher, StudentTeacher, StreakRecord
 from app.schemas.user import (
@@ -277,20 +278,24 @@ async def update_user_role(
 
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
+    response: Response,
     current_user: User = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db),
     role: Optional[UserRole] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor（指定時は skip を無視）"),
 ):
-    """List all users (admin only)."""
+    """List all users (admin only, oldest first, next page cursor in X-Next-Cursor)."""
     query = select(User)
     if role:
         query = query.where(User.role == role)
 
-    query = query.offset(skip).limit(limit)
+    keys = (User.created_at, User.id)
+    query = apply_keyset(query, keys, cursor, limit, skip=skip, descending=False)
     result = await db.execute(query)
-    return result.scalars().all()
+    users, _ = page_result(result.scalars().all(), keys, limit, response)
+    return users
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, users, themes, reports, master, ai, dashboard, analysis, teacher_themes, admin
+from app.api.endpoints import auth, users, themes, reports, master, ai, dashboard, analysis, teacher_themes, admin, sync
 
 api_router = APIRouter()
 
@@ -13,4 +13,5 @@ api_router.include_router(reports.router)
 api_router.include_router(master.router)
 api_router.include_router(ai.router)
 api_router.include_router(dashboard.router)
+api_router.include_router(sync.router)  # Delta sync for the student app
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,46 @@
+"""Conditional GET (ETag / If-None-Match) for polled read endpoints.
+
+The teacher dashboard and the student summary are polled while the page is
+open. Those endpoints first compute a cheap data-version fingerprint
+(app/services/data_version.py) and turn it, together with the user, the query
+parameters and the app version, into a strong ETag. When the client's
+If-None-Match matches, they return 304 Not Modified before running the
+aggregate queries or serializing the payload.
+
+Responses carry `Cache-Control: private, no-cache`, so browsers keep the body
+and revalidate on every request without any frontend change.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag (quoted) from the response's cache key and data version."""
+    raw = "\x1f".join("" if p is None else str(p) for p in (settings.APP_VERSION, *parts))
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """304 response if the client already has this version; otherwise tag `response` and return None."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
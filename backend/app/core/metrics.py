@@ -0,0 +1,399 @@
+"""Prometheus-style metrics in the text exposition format (GET /metrics).
+
+Dependency-free: counters, gauges and histograms live in this process and are
+rendered on scrape, so each App Service instance / worker is scraped on its own.
+
+- MetricsMiddleware: request counts by status and latency histograms per route
+  template (`/api/reports/{report_id}`, not the raw path, to bound cardinality).
+- instrument_pool(engine): connection pool gauges (size, checked out, overflow)
+  and the time spent checking a connection out (waiting for a free one, pre-ping).
+- AI calls: the Gemini gateway observes every call (ai_call_duration_seconds by
+  operation and outcome); analysis / ai / rag count the answers they had to
+  replace with a heuristic or canned message (record_fallback).
+- LoopLagMonitor: how late a periodic timer fires, i.e. how long the event loop
+  was blocked by synchronous work.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. HTTP / DB buckets are finer at the low end, AI buckets reach the Gemini timeout.
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed on scrape with set_function (pool sizes, queue depths)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], Optional[float]], **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                value = fn()
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+                continue
+            if value is not None:
+                values[key] = value
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + seconds)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            # Module reloads (uvicorn --reload) re-declare the same metric
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = HTTP_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- HTTP ---------------------------------------------------------------------------
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time until the response body was sent, by route template.", ("method", "route")
+)
+http_requests_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled.")
+
+# --- Database -----------------------------------------------------------------------
+
+db_pool_size = registry.gauge("db_pool_size", "Configured pool size (connections kept open).", ("engine",))
+db_pool_checked_out = registry.gauge("db_pool_checked_out", "Connections currently checked out of the pool.", ("engine",))
+db_pool_checked_in = registry.gauge("db_pool_checked_in", "Idle connections in the pool.", ("engine",))
+db_pool_overflow = registry.gauge(
+    "db_pool_overflow", "Connections open beyond pool_size (negative: pool not filled yet).", ("engine",)
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool (waiting for a free one, pre-ping, connecting).",
+    ("engine",),
+    DB_BUCKETS,
+)
+db_pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.", ("engine",)
+)
+
+# --- AI -----------------------------------------------------------------------------
+
+ai_call_duration = registry.histogram(
+    "ai_call_duration_seconds",
+    "Gemini gateway calls by operation and outcome (ok, timeout, error, rejected_circuit, rejected_rate), incl. retries.",
+    ("operation", "outcome"),
+    AI_BUCKETS,
+)
+ai_fallbacks = registry.counter(
+    "ai_fallbacks_total",
+    "AI answers replaced by a heuristic result or a canned message, by caller and reason.",
+    ("source", "reason"),
+)
+analysis_duration = registry.histogram(
+    "ai_analysis_duration_seconds",
+    "End-to-end report analysis by result (ai, cache, comment_fallback, heuristic_fallback).",
+    ("outcome",),
+    AI_BUCKETS,
+)
+
+# --- Event loop ---------------------------------------------------------------------
+
+loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "Delay of a periodic timer beyond its interval (event loop blocked).", (), LAG_BUCKETS
+)
+loop_lag_last = registry.gauge("event_loop_lag_last_seconds", "Most recent event loop lag measurement.")
+
+
+def record_fallback(source: str, reason: str) -> None:
+    """Count an AI answer that was replaced (heuristic analysis, apology message, ...)."""
+    ai_fallbacks.inc(source=source, reason=reason)
+
+
+def render() -> str:
+    return registry.render()
+
+
+# --- ASGI middleware ----------------------------------------------------------------
+
+
+def route_label(scope, status: Optional[int]) -> str:
+    """Route template of the matched FastAPI route (set in scope by APIRoute.matches)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    return "unmatched" if status == 404 else "other"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (streaming responses are timed until the last chunk)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            http_requests_in_progress.dec()
+            method = scope.get("method", "")
+            route = route_label(scope, status)
+            # No response started: the app raised (500 from ServerErrorMiddleware) or the client left
+            http_requests.inc(method=method, route=route, status=str(status or 500))
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+
+
+# --- Connection pool ----------------------------------------------------------------
+
+
+def _pool_value(engine: AsyncEngine, attr: str) -> Optional[float]:
+    # NullPool / StaticPool (SQLite in-memory, tests) have no size accounting
+    fn = getattr(engine.sync_engine.pool, attr, None)
+    return fn() if callable(fn) else None
+
+
+def instrument_pool(engine: AsyncEngine, name: str = "primary") -> None:
+    """Pool gauges and checkout timing for `engine` (idempotent)."""
+    for gauge, attr in (
+        (db_pool_size, "size"),
+        (db_pool_checked_out, "checkedout"),
+        (db_pool_checked_in, "checkedin"),
+        (db_pool_overflow, "overflow"),
+    ):
+        gauge.set_function(lambda attr=attr: _pool_value(engine, attr), engine=name)
+
+    pool = engine.sync_engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    connect = pool.connect
+
+    def _timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        except sa_exc.TimeoutError:
+            db_pool_checkout_timeouts.inc(engine=name)
+            raise
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started, engine=name)
+
+    # Engine.raw_connection() calls pool.connect(); the instance attribute shadows the method
+    pool.connect = _timed_connect
+    pool._metrics_instrumented = True
+
+
+# --- Event loop lag -----------------------------------------------------------------
+
+
+class LoopLagMonitor:
+    """Sleeps `interval` seconds in a loop and records how late each wakeup is."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            loop_lag.observe(lag)
+            loop_lag_last.set(lag)
+            if lag > 1.0:
+                logger.warning(f"Event loop was blocked for {lag:.2f}s")
+
+
+loop_lag_monitor = LoopLagMonitor(settings.METRICS_LOOP_LAG_INTERVAL_SECONDS)
@@ -0,0 +1,96 @@
+"""Keyset (cursor) pagination helpers.
+
+List endpoints accept an opaque `cursor` query parameter and return the cursor
+for the next page in the `X-Next-Cursor` response header (absent on the last
+page). The response body stays a plain list, so `skip`/`limit` clients keep
+working unchanged.
+
+The cursor encodes the sort key of the last row, e.g. (reported_at, id). The
+next page is fetched with `WHERE (reported_at, id) < (:last_reported_at, :last_id)`,
+which uses the index instead of scanning and discarding `skip` rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, Select, and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[Any]) -> List[Any]:
+    """Decode a cursor for the given key columns (400 if it is malformed)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("length mismatch")
+        return [
+            datetime.fromisoformat(v) if isinstance(key.type, DateTime) else v
+            for key, v in zip(keys, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(keys: Sequence[Any], values: Sequence[Any], descending: bool):
+    """(k1, k2, ...) > / < (v1, v2, ...) expanded for portability.
+
+    The redundant bound on k1 lets the database seek the index to the cursor
+    instead of walking it from the start (SQLite does not seek on the OR alone).
+    """
+    clauses = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        cmp = key < value if descending else key > value
+        clauses.append(and_(*[k == v for k, v in zip(keys[:i], values[:i])], cmp))
+    bound = keys[0] <= values[0] if descending else keys[0] >= values[0]
+    return and_(bound, or_(*clauses))
+
+
+def apply_keyset(
+    query: Select,
+    keys: Sequence[Any],
+    cursor: Optional[str],
+    limit: Optional[int],
+    skip: int = 0,
+    descending: bool = True,
+) -> Select:
+    """Order by `keys` and restrict to the page after `cursor` (or at offset `skip`).
+
+    One extra row is fetched so `page_result` can tell whether a next page exists.
+    """
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    if cursor:
+        query = query.where(_after(keys, decode_cursor(cursor, keys), descending))
+    elif skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def page_result(
+    rows: Sequence[Any],
+    keys: Sequence[Any],
+    limit: Optional[int],
+    response: Optional[Response] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Trim the extra row and return (rows, next_cursor); sets X-Next-Cursor if `response` is given."""
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor([getattr(last, key.key) for key in keys])
+    if response is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows, next_cursor
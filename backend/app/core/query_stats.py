@@ -0,0 +1,183 @@
+"""Per-request SQL statement counts / DB time, with N+1 detection.
+
+- install(engine) hooks the engine's cursor events; statements executed while a
+  QueryStats is active (contextvar) are counted and timed.
+- QueryStatsMiddleware activates one per HTTP request, adds
+  `Server-Timing: db;dur=<ms>;desc="<n> queries"` to the response and logs
+  requests with many statements, or with the same statement shape repeated
+  QUERY_N_PLUS_ONE_THRESHOLD+ times (likely an N+1 loop).
+- query_budget() / assert_query_budget() assert budgets in tests.
+
+Headers are sent before a streaming body (SSE) finishes, so the header only
+covers queries up to that point; the log line covers the whole request.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) / VALUES (...), (...) vary with the number of parameters
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES \(\?\))(?:, \(\?\))+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with whitespace and parameter lists normalized."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _VALUES_ROWS.sub(r"\1", shape)
+
+
+class QueryStats:
+    """Statements executed in one request (or one query_budget block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.statements: List[str] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        self.statements.append(shape)
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times (likely N+1)."""
+        threshold = threshold or settings.QUERY_N_PLUS_ONE_THRESHOLD
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_stats_started")
+    if started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+
+def install(engine: AsyncEngine) -> None:
+    """Count statements of `engine` (idempotent)."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _log_request(method: str, path: str, status: Optional[int], stats: QueryStats, elapsed: float) -> None:
+    label = f"{method} {path} -> {status}: {stats.count} queries, db {stats.seconds * 1000:.1f}ms of {elapsed * 1000:.1f}ms"
+    repeated = stats.repeated()
+    if repeated:
+        shape, n = repeated[0]
+        logger.warning(f"Possible N+1 in {label}; {n}x {shape[:300]}")
+    elif stats.count >= settings.QUERY_LOG_MIN_QUERIES:
+        logger.info(f"Many queries in {label}")
+    else:
+        logger.debug(label)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware (streaming responses pass straight through)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((SERVER_TIMING_HEADER.lower().encode("latin-1"), stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            _log_request(scope.get("method", ""), scope.get("path", ""), status, stats, time.perf_counter() - started)
+
+
+# --- Test helpers -----------------------------------------------------------------
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Assert that code in the block (same task / context) runs at most `max_queries` statements.
+
+        with query_budget(5) as stats:
+            await get_student_stats(db, student_id)
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+    _check_budget(stats.count, max_queries, stats.statements)
+
+
+def parse_server_timing(header: str) -> Tuple[int, float]:
+    """(queries, db milliseconds) from a Server-Timing header written by the middleware."""
+    match = re.search(r'db;dur=([\d.]+);desc="(\d+) queries"', header or "")
+    if not match:
+        raise ValueError(f"No db metric in Server-Timing: {header!r}")
+    return int(match.group(2)), float(match.group(1))
+
+
+def assert_query_budget(response, max_queries: int) -> int:
+    """Assert an HTTP response (TestClient / httpx) used at most `max_queries` statements.
+
+    Works across threads (TestClient runs the app in its own event loop), since
+    the count travels in the Server-Timing header. Returns the count.
+    """
+    count, _ = parse_server_timing(response.headers.get(SERVER_TIMING_HEADER, ""))
+    _check_budget(count, max_queries, [])
+    return count
+
+
+def _check_budget(count: int, max_queries: int, statements: List[str]) -> None:
+    if count > max_queries:
+        listing = "".join(f"\n  {i}. {s[:200]}" for i, s in enumerate(statements, 1))
+        raise AssertionError(f"{count} queries executed, budget is {max_queries}{listing}")
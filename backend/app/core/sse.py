@@ -0,0 +1,29 @@
+"""Helpers for Server-Sent Events (text/event-stream) responses."""
+
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Disable proxy buffering (nginx / App Service front ends) so events flush immediately
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one SSE message. data is serialized as JSON (UTF-8, not ASCII-escaped)."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Wrap an async iterator of (event, data) tuples in a StreamingResponse."""
+
+    async def _body():
+        async for event, data in events:
+            yield format_sse(event, data)
+
+    return StreamingResponse(_body(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,53 @@
+"""Build the local RAG passage index from the book / source documents.
+
+Usage:
+    python -m app.db.build_rag_index                      # settings.RAG_SOURCE_DIR -> settings.RAG_INDEX_PATH
+    python -m app.db.build_rag_index books/ notes.md --output data/rag_index.bin --chunk-chars 300
+    python -m app.db.build_rag_index --query "仲間を巻き込むには"   # show the top passages after building
+
+Sources are UTF-8 .txt / .md files (directories are searched recursively).
+Running app processes pick up the new index on restart.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.services.retrieval import RagIndex, build_index, iter_source_files
+
+
+def main(args: argparse.Namespace) -> int:
+    files = iter_source_files(args.sources or [settings.RAG_SOURCE_DIR])
+    if not files:
+        print(f"No .txt / .md sources found in {args.sources or [settings.RAG_SOURCE_DIR]}")
+        return 1
+
+    documents = [(str(path.name), path.read_text(encoding="utf-8")) for path in files]
+    summary = build_index(documents, args.output, args.chunk_chars)
+    summary["output"] = str(args.output)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    if args.query:
+        index = RagIndex(args.output)
+        started = time.perf_counter()
+        passages = index.search(args.query, args.top_k)
+        print(f"\nquery={args.query!r} ({(time.perf_counter() - started) * 1000:.2f}ms)")
+        for p in passages:
+            print(f"- [{p.score:.2f}] {p.source}: {p.text[:120]}")
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local RAG passage index")
+    parser.add_argument("sources", nargs="*", help="files or directories (default: RAG_SOURCE_DIR)")
+    parser.add_argument("--output", default=settings.RAG_INDEX_PATH, help="index file")
+    parser.add_argument("--chunk-chars", type=int, default=settings.RAG_CHUNK_CHARS, help="approximate passage length")
+    parser.add_argument("--query", help="run a test query against the new index")
+    parser.add_argument("--top-k", type=int, default=settings.RAG_TOP_K)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,247 @@
+"""Check that the hot dashboard / report queries use their indexes (EXPLAIN).
+
+Usage:
+    python -m app.db.check_query_plans            # exit status 1 if a query scans its table
+    python -m app.db.check_query_plans --verbose  # print every plan
+
+Run against a seeded database (python -m app.db.generate_synthetic) after
+`alembic upgrade head`: ids are sampled from the data, and MySQL picks full
+scans for near-empty tables. Supports SQLite (EXPLAIN QUERY PLAN) and MySQL.
+tests/test_query_plans.py runs the same checks (run_checks) on a small SQLite
+database.
+"""
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import func, select, text
+
+from app.core.pagination import apply_keyset, encode_cursor
+from app.db.session import engine
+from app.models import Report, ReportAbility, ResearchTheme, StreakRecord, Student, StudentStats, StudentTeacher, User
+from app.services.student_stats import fiscal_year_bounds, fiscal_year_of
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    build: Callable[[dict], object]  # sample ids -> select()
+    # table -> index it must use (None: any index, e.g. an unnamed unique constraint)
+    expect: Dict[str, Optional[str]]
+
+
+def _student_reports_in_year(s: dict):
+    start, end = fiscal_year_bounds(s["fiscal_year"])
+    return (
+        select(Report.id, Report.reported_at)
+        .where(Report.student_id == s["student_id"], Report.reported_at >= start, Report.reported_at < end)
+        .order_by(Report.reported_at.desc(), Report.id.desc())
+        .limit(20)
+    )
+
+
+def _student_report_abilities(s: dict):
+    start, end = fiscal_year_bounds(s["fiscal_year"])
+    return (
+        select(Report.student_id, Report.reported_at, ReportAbility.ability_id, ReportAbility.points)
+        .join(ReportAbility, ReportAbility.report_id == Report.id)
+        .where(Report.student_id.in_([s["student_id"]]), Report.reported_at >= start, Report.reported_at < end)
+    )
+
+
+def _users_page(s: dict):
+    # Second page of the admin user list (GET /users/?cursor=...)
+    keys = (User.created_at, User.id)
+    cursor = encode_cursor([s["user_created_at"], s["user_id"]])
+    return apply_keyset(select(User.id), keys, cursor, 50, descending=False)
+
+
+CHECKS: List[PlanCheck] = [
+    PlanCheck(
+        "report list (keyset page)",
+        lambda s: select(Report.id)
+        .where(Report.student_id == s["student_id"])
+        .order_by(Report.reported_at.desc(), Report.id.desc())
+        .limit(20),
+        {"reports": "ix_reports_student_id_reported_at"},
+    ),
+    PlanCheck("calendar / year range", _student_reports_in_year, {"reports": "ix_reports_student_id_reported_at"}),
+    PlanCheck(
+        "stats rollup abilities",
+        _student_report_abilities,
+        {"reports": "ix_reports_student_id_reported_at", "report_abilities": "ix_report_abilities_report_id"},
+    ),
+    PlanCheck(
+        "ability usage",
+        lambda s: select(func.count()).select_from(ReportAbility).where(ReportAbility.ability_id == s["ability_id"]),
+        {"report_abilities": "ix_report_abilities_ability_id"},
+    ),
+    PlanCheck(
+        "dashboard assignments",
+        lambda s: select(StudentTeacher.student_id).where(
+            StudentTeacher.teacher_id == s["teacher_id"],
+            StudentTeacher.fiscal_year == s["fiscal_year"],
+            StudentTeacher.is_active == True,
+        ),
+        {"student_teachers": "ix_student_teachers_teacher_year_active"},
+    ),
+    PlanCheck(
+        "student's teachers",
+        lambda s: select(StudentTeacher.teacher_id).where(
+            StudentTeacher.student_id == s["student_id"],
+            StudentTeacher.fiscal_year == s["fiscal_year"],
+        ),
+        {"student_teachers": "ix_student_teachers_student_id_fiscal_year"},
+    ),
+    PlanCheck(
+        "dashboard themes",
+        lambda s: select(ResearchTheme.id, ResearchTheme.title).where(
+            ResearchTheme.student_id.in_([s["student_id"]]),
+            ResearchTheme.fiscal_year == s["fiscal_year"],
+        ),
+        {"research_themes": "ix_research_themes_student_id_fiscal_year"},
+    ),
+    PlanCheck(
+        "dashboard stats",
+        lambda s: select(StudentStats).where(StudentStats.student_id.in_([s["student_id"]])),
+        {"student_stats": None},
+    ),
+    PlanCheck(
+        "student by user",
+        lambda s: select(Student.id).where(Student.user_id == s["user_id"]),
+        {"students": None},
+    ),
+    PlanCheck(
+        "streak",
+        lambda s: select(StreakRecord).where(StreakRecord.student_id == s["student_id"]),
+        {"streak_records": None},
+    ),
+    PlanCheck("user list (keyset page)", _users_page, {"users": "ix_users_created_at_id"}),
+]
+
+
+async def _sample(conn) -> dict:
+    """Ids of a student with reports and of a teacher with assignments."""
+    row = (
+        await conn.execute(
+            select(Report.student_id, Report.reported_at, ReportAbility.ability_id, Student.user_id, User.created_at)
+            .join(ReportAbility, ReportAbility.report_id == Report.id)
+            .join(Student, Student.id == Report.student_id)
+            .join(User, User.id == Student.user_id)
+            .limit(1)
+        )
+    ).first()
+    if row is None:
+        raise SystemExit("No reports found: seed the database first (python -m app.db.generate_synthetic)")
+    assignment = (
+        await conn.execute(select(StudentTeacher.teacher_id, StudentTeacher.fiscal_year).limit(1))
+    ).first()
+    return {
+        "student_id": str(row.student_id),
+        "user_id": str(row.user_id),
+        "user_created_at": row.created_at,
+        "ability_id": str(row.ability_id),
+        "teacher_id": str(assignment.teacher_id) if assignment else "",
+        "fiscal_year": assignment.fiscal_year if assignment else fiscal_year_of(row.reported_at),
+    }
+
+
+def _parse_sqlite(rows) -> Dict[str, Tuple[bool, Optional[str], str]]:
+    """table -> (searched via an index, index name, plan line) from EXPLAIN QUERY PLAN."""
+    plans = {}
+    for row in rows:
+        detail = row[-1]
+        words = detail.split()
+        if len(words) < 2 or words[0] not in ("SEARCH", "SCAN"):
+            continue
+        table = words[1]
+        index = None
+        if "INDEX" in words:
+            index = words[words.index("INDEX") + 1]
+        elif "PRIMARY" in words:
+            index = "PRIMARY"
+        # "SCAN t USING INDEX i" still reads the whole index
+        plans[table] = (words[0] == "SEARCH", index, detail)
+    return plans
+
+
+def _parse_mysql(rows) -> Dict[str, Tuple[bool, Optional[str], str]]:
+    plans = {}
+    for row in rows:
+        row = row._mapping
+        access = row["type"]
+        line = f"type={access} key={row['key']} rows={row['rows']} extra={row['Extra']}"
+        plans[row["table"]] = (access not in ("ALL", "index", None), row["key"], line)
+    return plans
+
+
+async def _explain(conn, statement) -> Tuple[Dict[str, Tuple[bool, Optional[str], str]], str]:
+    dialect = conn.dialect
+    # Named parameters so the compiled SQL can go back through text()
+    compiled = statement.compile(dialect=type(dialect)(paramstyle="named"), compile_kwargs={"render_postcompile": True})
+    if dialect.name == "sqlite":
+        result = await conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"), compiled.params)
+        return _parse_sqlite(result.all()), str(compiled)
+    if dialect.name == "mysql":
+        result = await conn.execute(text(f"EXPLAIN {compiled}"), compiled.params)
+        return _parse_mysql(result.all()), str(compiled)
+    raise SystemExit(f"Unsupported database: {dialect.name}")
+
+
+@dataclass
+class PlanResult:
+    check: PlanCheck
+    plans: Dict[str, Tuple[bool, Optional[str], str]]
+    sql: str
+    problems: List[str]
+
+
+def _problems(check: PlanCheck, plans: Dict[str, Tuple[bool, Optional[str], str]]) -> List[str]:
+    problems = []
+    for table, index in check.expect.items():
+        searched, used, _ = plans.get(table, (False, None, "not in plan"))
+        if not searched:
+            problems.append(f"{table}: full scan")
+        elif index is not None and used != index:
+            problems.append(f"{table}: uses {used}, expected {index}")
+    return problems
+
+
+async def run_checks(conn, checks: Optional[List[PlanCheck]] = None) -> List[PlanResult]:
+    """EXPLAIN every check with ids sampled from the connected database."""
+    sample = await _sample(conn)
+    results = []
+    for check in CHECKS if checks is None else checks:
+        plans, sql = await _explain(conn, check.build(sample))
+        results.append(PlanResult(check, plans, sql, _problems(check, plans)))
+    return results
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with engine.connect() as conn:
+        results = await run_checks(conn)
+    await engine.dispose()
+
+    failures = 0
+    for result in results:
+        problems = result.problems
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':4}  {result.check.name}" + (f"  ({'; '.join(problems)})" if problems else ""))
+        if args.verbose or problems:
+            print("      " + " ".join(result.sql.split()))
+            for table, (_, _, line) in result.plans.items():
+                print(f"      {table}: {line}")
+    print(f"{len(results) - failures}/{len(results)} queries use their indexes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot queries and check index use")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    sys.exit(asyncio.run(main(parser.parse_args())))
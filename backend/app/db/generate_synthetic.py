@@ -0,0 +1,379 @@
+"""Generate a synthetic school for capacity planning and load tests.
+
+Creates teachers, seminar labs, students, StudentTeacher assignments and one
+theme per student per fiscal year, plus reports with 3 ReportAbility rows each
+(1 strong + 2 sub), and the matching student_stats and streak_records rows so
+dashboards work without a rebuild.
+
+Activity is skewed like the real thing: a few diligent students post almost
+every school day, many post now and then, weekends are quiet, phases move from
+課題の設定 towards まとめ・表現 over the year, and each student favours some
+abilities over others.
+
+Rows are written with chunked Core bulk inserts (executemany / multi-row
+INSERT), not the ORM, so change_log gets no entries: clients do a full sync.
+With --sql-file nothing is executed; multi-row INSERT statements are written
+for `mysql db < file` instead.
+
+Usage:
+    python -m app.db.generate_synthetic --students 1000
+    python -m app.db.generate_synthetic --students 100000 --years 3 --reports-per-year 33   # ~10M reports
+    python -m app.db.generate_synthetic --students 20000 --sql-file synthetic.sql
+
+Abilities and research phases must exist (python -m app.db.seed).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.models import (
+    Ability, Report, ReportAbility, ResearchPhase, ResearchTheme, SeminarLab, StreakRecord,
+    Student, StudentStats, StudentTeacher, Teacher, ThemeStatus, User, UserRole,
+)
+from app.services.analysis import STRONG_ABILITY_POINTS, SUB_ABILITY_POINTS
+from app.services.auth import get_password_hash
+from app.services.bulk_import import compute_streak
+
+SURNAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤",
+            "吉田", "山田", "佐々木", "山口", "松本", "井上", "木村", "林", "斎藤", "清水"]
+GIVEN_NAMES = ["花子", "太郎", "陽菜", "蓮", "結衣", "湊", "美咲", "大翔", "葵", "悠真",
+               "さくら", "陸", "凛", "颯太", "結菜", "樹", "愛", "海斗", "七海", "奏"]
+THEME_TOPICS = ["地域の商店街の活性化", "食品ロスの削減", "防災意識の向上", "高校生の学習意欲",
+                "地元の観光資源", "プラスチックごみ問題", "高齢者の見守り", "SNSと人間関係",
+                "部活動と睡眠", "再生可能エネルギー", "外国人観光客への案内", "図書館の利用促進"]
+DEPARTMENTS = ["国語", "数学", "英語", "理科", "社会", "情報", "保健体育", "芸術"]
+
+# Report text by phase (index = ResearchPhase display order)
+PHASE_SENTENCES = [
+    ["テーマについて問いを立て直した。", "先生と面談して研究の方向性を相談した。", "身近な課題を書き出して優先順位をつけた。"],
+    ["文献調査を行い、先行研究をまとめた。", "アンケートの質問項目を作成した。", "商店街の方にインタビューをした。",
+     "フィールドワークで現地を訪れた。"],
+    ["集めたデータを表に整理した。", "アンケート結果をグラフにして傾向を分析した。", "チームで議論して仮説を修正した。"],
+    ["中間発表のスライドを作成した。", "ポスターの構成を考え、図解を増やした。", "最終レポートの結論部分を書き進めた。"],
+]
+REFLECTIONS = ["思ったより時間がかかったが、新しい発見があった。", "次回は計画を立ててから取り組みたい。",
+               "仲間と協力することの大切さを感じた。", "うまくいかない部分もあったが、最後までやり切れた。",
+               "自分の考えを言葉にするのが少し上手くなった気がする。", ""]
+
+JST_OFFSET = timedelta(hours=9)
+WEEKDAY_SHARE = 0.93  # share of reports on Monday-Friday
+
+
+class Sink:
+    """Buffers rows per table and writes them in FK order when a chunk is full."""
+
+    # Insert order (parents first)
+    TABLES = [
+        User.__table__, Teacher.__table__, SeminarLab.__table__, Student.__table__,
+        StudentTeacher.__table__, ResearchTheme.__table__, Report.__table__,
+        ReportAbility.__table__, StudentStats.__table__, StreakRecord.__table__,
+    ]
+
+    def __init__(self, chunk_size: int, sql_file: Optional[TextIO] = None):
+        self.chunk_size = chunk_size
+        self.sql_file = sql_file
+        self.buffers: Dict[str, List[dict]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def add(self, table, row: dict) -> None:
+        self.buffers[table.name].append(row)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self.buffers.values())
+
+    async def maybe_flush(self) -> None:
+        if self.pending >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self.sql_file is not None:
+            for table in self.TABLES:
+                rows = self.buffers.pop(table.name, [])
+                for i in range(0, len(rows), 1000):
+                    self.sql_file.write(_insert_sql(table, rows[i:i + 1000]))
+                self.counts[table.name] += len(rows)
+            return
+
+        async with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                await conn.execute(text("PRAGMA synchronous = OFF"))
+            if conn.dialect.name == "mysql":
+                # Rows are inserted parents-first; skip the per-row checks for speed
+                await conn.execute(text("SET foreign_key_checks = 0"))
+                await conn.execute(text("SET unique_checks = 0"))
+            for table in self.TABLES:
+                rows = self.buffers.pop(table.name, [])
+                if rows:
+                    await conn.execute(table.insert(), rows)
+                    self.counts[table.name] += len(rows)
+            if conn.dialect.name == "mysql":
+                await conn.execute(text("SET foreign_key_checks = 1"))
+                await conn.execute(text("SET unique_checks = 1"))
+
+
+def _sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"'{value.strftime('%Y-%m-%d %H:%M:%S')}'"
+    if isinstance(value, date):
+        return f"'{value.isoformat()}'"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif hasattr(value, "value"):
+        value = value.value  # enums
+    value = str(value).replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{value}'"
+
+
+def _insert_sql(table, rows: List[dict]) -> str:
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    values = ",\n".join("(" + ", ".join(_sql_literal(row[c]) for c in columns) + ")" for row in rows)
+    return f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES\n{values};\n"
+
+
+def _new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def _school_days(fiscal_year: int, today: date):
+    """(weekdays, weekend days) in the active part of a fiscal year, up to today."""
+    start = date(fiscal_year, 4, 8)
+    end = min(date(fiscal_year + 1, 3, 20), today)
+    weekdays, weekends = [], []
+    day = start
+    while day <= end:
+        (weekdays if day.weekday() < 5 else weekends).append(day)
+        day += timedelta(days=1)
+    return weekdays, weekends
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace, abilities: List[str], phases: List[str]):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.abilities = abilities
+        self.phases = phases
+        self.now = datetime.utcnow()
+        today = (self.now + JST_OFFSET).date()
+        current = settings.get_current_fiscal_year()
+        self.fiscal_years = list(range(current - args.years + 1, current + 1))
+        self.days = {fy: _school_days(fy, today) for fy in self.fiscal_years}
+        self.password_hash = get_password_hash(args.password) if args.password else None
+
+    def _user(self, sink: Sink, email: str, name: str, role: UserRole) -> str:
+        user_id = _new_id()
+        sink.add(User.__table__, {
+            "id": user_id, "email": email, "name": name, "avatar_url": None, "role": role,
+            "is_active": True, "google_id": None, "password_hash": self.password_hash,
+            "created_at": self.now, "updated_at": self.now,
+        })
+        return user_id
+
+    def _name(self) -> str:
+        return f"{self.rng.choice(SURNAMES)} {self.rng.choice(GIVEN_NAMES)}"
+
+    def teachers(self, sink: Sink) -> List[dict]:
+        teachers = []
+        for i in range(self.args.teachers):
+            user_id = self._user(sink, f"{self.args.prefix}-t{i:05d}@synthetic.example", self._name(), UserRole.TEACHER)
+            teacher_id = _new_id()
+            sink.add(Teacher.__table__, {
+                "id": teacher_id, "user_id": user_id, "department": self.rng.choice(DEPARTMENTS),
+                "employee_number": f"T{i:05d}", "created_at": self.now, "updated_at": self.now,
+            })
+            teachers.append({"id": teacher_id, "lab_ids": []})
+        for i in range(self.args.labs):
+            teacher = teachers[i % len(teachers)]
+            lab_id = _new_id()
+            sink.add(SeminarLab.__table__, {
+                "id": lab_id, "name": f"{self.rng.choice(THEME_TOPICS)}ゼミ {i + 1}", "description": None,
+                "teacher_id": teacher["id"], "is_active": True, "created_at": self.now, "updated_at": self.now,
+            })
+            teacher["lab_ids"].append(lab_id)
+        return teachers
+
+    def student(self, sink: Sink, index: int, teachers: List[dict], labs: List[tuple]) -> int:
+        """One student with all of their years; returns the number of reports."""
+        rng = self.rng
+        user_id = self._user(sink, f"{self.args.prefix}-s{index:06d}@synthetic.example", self._name(), UserRole.STUDENT)
+        student_id = _new_id()
+        class_no = index // 35
+        lab_id, lab_teacher_id = labs[index % len(labs)] if labs else (None, None)
+        sink.add(Student.__table__, {
+            "id": student_id, "user_id": user_id, "grade": class_no % 3 + 1,
+            "class_name": chr(ord("A") + class_no % 8), "student_number": str(index % 35 + 1),
+            "seminar_lab_id": lab_id, "created_at": self.now, "updated_at": self.now,
+        })
+
+        # Homeroom teacher per class (primary) plus the lab teacher
+        homeroom = teachers[class_no % len(teachers)]["id"]
+        diligence = rng.betavariate(1.2, 2.4) / (1.2 / 3.6)  # mean 1.0, long right tail
+        ability_weights = [rng.gammavariate(1.0, 1.0) + 0.05 for _ in self.abilities]
+        report_dates = []
+        reports = 0
+        current_year = self.fiscal_years[-1]
+
+        for fiscal_year in self.fiscal_years:
+            for teacher_id, primary in ((homeroom, True), (lab_teacher_id, False)):
+                if teacher_id and (primary or teacher_id != homeroom):
+                    sink.add(StudentTeacher.__table__, {
+                        "id": _new_id(), "student_id": student_id, "teacher_id": teacher_id,
+                        "is_primary": primary, "fiscal_year": fiscal_year, "is_active": True,
+                        "created_at": self.now, "updated_at": self.now,
+                    })
+            theme_id = _new_id()
+            sink.add(ResearchTheme.__table__, {
+                "id": theme_id, "student_id": student_id, "title": rng.choice(THEME_TOPICS),
+                "description": None, "fiscal_year": fiscal_year,
+                "status": ThemeStatus.IN_PROGRESS if fiscal_year == current_year else ThemeStatus.COMPLETED,
+                "created_at": self.now, "updated_at": self.now,
+            })
+
+            weekdays, weekends = self.days[fiscal_year]
+            # Partial current year -> proportionally fewer reports
+            span = len(weekdays) + len(weekends)
+            expected = self.args.reports_per_year * diligence * span / 347
+            count = max(0, int(round(rng.gauss(expected, expected ** 0.5 if expected > 0 else 0))))
+            n_weekdays = min(len(weekdays), int(round(count * WEEKDAY_SHARE)))
+            days = rng.sample(weekdays, n_weekdays) + rng.sample(weekends, min(len(weekends), count - n_weekdays))
+            if not days:
+                continue
+            year_start = date(fiscal_year, 4, 1)
+
+            stats = {"report_count": 0, "ability_counts": defaultdict(int), "ability_points": defaultdict(int),
+                     "phase_counts": defaultdict(int), "latest_report_at": None, "latest_phase_id": None}
+            for day in sorted(days):
+                # Phases progress through the year (with some back-and-forth)
+                position = (day - year_start).days / 365 * len(self.phases)
+                phase_index = min(len(self.phases) - 1, max(0, int(position + rng.gauss(0, 0.6))))
+                phase_id = self.phases[phase_index]
+                reported_at = datetime(day.year, day.month, day.day, rng.randint(15, 22), rng.randint(0, 59)) - JST_OFFSET
+                report_id = _new_id()
+                content = (rng.choice(PHASE_SENTENCES[min(phase_index, len(PHASE_SENTENCES) - 1)])
+                           + rng.choice(PHASE_SENTENCES[rng.randrange(len(PHASE_SENTENCES))])
+                           + rng.choice(REFLECTIONS))
+                sink.add(Report.__table__, {
+                    "id": report_id, "student_id": student_id, "theme_id": theme_id, "phase_id": phase_id,
+                    "content": content, "image_url": None, "ai_comment": None, "analysis_status": None,
+                    "reported_at": reported_at, "created_at": reported_at, "updated_at": reported_at,
+                })
+                # 3 distinct abilities weighted by the student's tendencies (weighted sampling without replacement)
+                picked = sorted(range(len(self.abilities)), key=lambda i: rng.random() ** (1 / ability_weights[i]), reverse=True)[:3]
+                for rank, ability_index in enumerate(picked):
+                    ability_id = self.abilities[ability_index]
+                    points = STRONG_ABILITY_POINTS if rank == 0 else SUB_ABILITY_POINTS
+                    sink.add(ReportAbility.__table__, {
+                        "id": _new_id(), "report_id": report_id, "ability_id": ability_id,
+                        "role": "strong" if rank == 0 else "sub", "points": points,
+                        "created_at": reported_at, "updated_at": reported_at,
+                    })
+                    stats["ability_counts"][ability_id] += 1
+                    stats["ability_points"][ability_id] += points
+                stats["report_count"] += 1
+                stats["phase_counts"][phase_id] += 1
+                stats["latest_report_at"] = reported_at
+                stats["latest_phase_id"] = phase_id
+                report_dates.append(day)
+            reports += stats["report_count"]
+
+            sink.add(StudentStats.__table__, {
+                "id": _new_id(), "student_id": student_id, "fiscal_year": fiscal_year,
+                "report_count": stats["report_count"],
+                "ability_counts": dict(stats["ability_counts"]),
+                "ability_points": dict(stats["ability_points"]),
+                "phase_counts": dict(stats["phase_counts"]),
+                "latest_report_at": stats["latest_report_at"], "latest_phase_id": stats["latest_phase_id"],
+                "created_at": self.now, "updated_at": self.now,
+            })
+
+        current, best, last = compute_streak(report_dates)
+        sink.add(StreakRecord.__table__, {
+            "id": _new_id(), "student_id": student_id, "current_streak": current, "max_streak": best,
+            "last_report_date": last, "created_at": self.now, "updated_at": self.now,
+        })
+        return reports
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        abilities = [str(a) for a in (await db.execute(
+            select(Ability.id).where(Ability.is_active == True).order_by(Ability.display_order)
+        )).scalars()]
+        phases = [str(p) for p in (await db.execute(
+            select(ResearchPhase.id).where(ResearchPhase.is_active == True).order_by(ResearchPhase.display_order)
+        )).scalars()]
+    if len(abilities) < 3 or not phases:
+        print("Abilities / research phases are missing: run python -m app.db.seed first")
+        return 1
+
+    args.teachers = args.teachers or max(1, args.students // 30)
+    args.labs = args.labs if args.labs is not None else max(1, args.teachers // 2)
+
+    sql_file = open(args.sql_file, "w", encoding="utf-8") if args.sql_file else None
+    sink = Sink(args.chunk_size, sql_file)
+    generator = Generator(args, abilities, phases)
+    started = time.perf_counter()
+    try:
+        teachers = generator.teachers(sink)
+        labs = [(lab_id, t["id"]) for t in teachers for lab_id in t["lab_ids"]]
+        await sink.flush()
+
+        reports = 0
+        for index in range(args.students):
+            reports += generator.student(sink, index, teachers, labs)
+            await sink.maybe_flush()
+            if (index + 1) % args.progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"  {index + 1}/{args.students} students, {reports} reports ({reports / elapsed:,.0f} reports/s)")
+        await sink.flush()
+    finally:
+        if sql_file is not None:
+            sql_file.close()
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "fiscal_years": generator.fiscal_years,
+        "rows": dict(sink.counts),
+        "seconds": round(elapsed, 1),
+        "target": args.sql_file or settings.DATABASE_URL.split("://")[0],
+    }, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic school (students, teachers, themes, reports)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--teachers", type=int, help="default: students / 30")
+    parser.add_argument("--labs", type=int, help="seminar labs (default: teachers / 2)")
+    parser.add_argument("--years", type=int, default=3, help="fiscal years up to the current one")
+    parser.add_argument("--reports-per-year", type=float, default=40, help="average reports per student per full year")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="rows per bulk insert transaction")
+    parser.add_argument("--prefix", default="syn", help="email prefix (use a new one to add another school)")
+    parser.add_argument("--password", help="password for every generated account (default: none)")
+    parser.add_argument("--sql-file", help="write multi-row INSERT statements here instead of executing")
+    parser.add_argument("--progress-every", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,73 @@
+"""Bulk-import reports from a JSON lines / JSON / CSV file.
+
+Usage:
+    python -m app.db.import_reports reports.jsonl
+    python -m app.db.import_reports reports.csv --analysis ai --concurrency 8
+    python -m app.db.import_reports reports.jsonl --dry-run
+
+See app/services/bulk_import.py for the record fields.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.services.bulk_import import (
+    ANALYSIS_MODES,
+    SUPPORTED_FORMATS,
+    BulkImportError,
+    detect_format,
+    import_reports,
+    parse_records,
+)
+
+
+async def main(args: argparse.Namespace) -> int:
+    path = Path(args.path)
+    try:
+        fmt = detect_format(path.name, args.format)
+        records = parse_records(path.read_bytes(), fmt)
+    except (OSError, BulkImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Importing {len(records)} report(s) from {path} (format={fmt}, analysis={args.analysis})...")
+    result = await import_reports(
+        records,
+        analysis=args.analysis,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        dry_run=args.dry_run,
+    )
+
+    for err in result.errors[: args.max_errors]:
+        print(f"  row {err['row']}: {err['error']}")
+    if len(result.errors) > args.max_errors:
+        print(f"  ... and {len(result.errors) - args.max_errors} more error(s)")
+
+    summary = result.to_dict()
+    summary.pop("errors")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if result.dry_run:
+        print("Dry run: nothing was written.")
+    else:
+        print(f"Inserted {result.inserted} report(s) in {result.elapsed_seconds:.2f}s ({result.reports_per_second} reports/s)")
+    return 0 if not result.errors else 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import reports")
+    parser.add_argument("path", help="JSON lines / JSON / CSV file")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, help="default: from the file extension")
+    parser.add_argument("--analysis", choices=ANALYSIS_MODES, default="heuristic")
+    parser.add_argument("--chunk-size", type=int, default=settings.BULK_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.BULK_IMPORT_AI_CONCURRENCY,
+                        help="concurrent Gemini analyses (--analysis ai)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--max-errors", type=int, default=20, help="row errors to print")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,31 @@
+"""Recompute the student_stats rollup from reports.
+
+Usage:
+    python -m app.db.rebuild_student_stats
+    python -m app.db.rebuild_student_stats --chunk-size 200 --concurrency 8
+
+Safe to run while the app is serving: each chunk of students is replaced in
+its own transaction.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.services.student_stats import rebuild_all_student_stats
+
+
+async def main(args: argparse.Namespace) -> None:
+    summary = await rebuild_all_student_stats(chunk_size=args.chunk_size, concurrency=args.concurrency)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild student_stats")
+    parser.add_argument("--chunk-size", type=int, default=200, help="students per chunk/transaction")
+    parser.add_argument("--concurrency", type=int, default=4, help="chunks processed in parallel")
+    asyncio.run(main(parser.parse_args()))
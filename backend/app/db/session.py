@@ -1,4 +1,5 @@
 import ssl
+from typing import Optional
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -7,9 +8,9 @@ from sqlalchemy.orm import declarative_base
 from app.core.config import settings
 
 
-def get_database_url_and_ssl():
+def get_database_url_and_ssl(url: Optional[str] = None):
     """Parse database URL and extract SSL settings for aiomysql."""
-    url = settings.DATABASE_URL
+    url = settings.DATABASE_URL if url is None else url
 
     # Handle empty or invalid URL
     if not url:
@@ -54,27 +55,58 @@ except Exception as e:
     database_url = "sqlite+aiosqlite:///./test.db"
     ssl_context = None
 
-connect_args = {}
-if "mysql" in database_url:
-    connect_args["charset"] = "utf8mb4"
-    if ssl_context:
-        connect_args["ssl"] = ssl_context
-
-engine = create_async_engine(
-    database_url,
-    echo=settings.DATABASE_ECHO,
-    future=True,
-    connect_args=connect_args,
-    pool_pre_ping=True,  # Verify connections before using
-)
-
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+
+def create_engine_for_url(url: str, ssl_context=None):
+    """Async engine with the configured pool (DATABASE_POOL_*)."""
+    connect_args = {}
+    if "mysql" in url:
+        connect_args["charset"] = "utf8mb4"
+        if ssl_context:
+            connect_args["ssl"] = ssl_context
+
+    pool_args = {}
+    if not url.startswith("sqlite"):
+        # SQLite uses NullPool / StaticPool, which take no sizing arguments
+        pool_args = dict(
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        )
+
+    return create_async_engine(
+        url,
+        echo=settings.DATABASE_ECHO,
+        future=True,
+        connect_args=connect_args,
+        pool_pre_ping=True,  # Verify connections before using
+        **pool_args,
+    )
+
+
+def _session_factory(bind):
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+engine = create_engine_for_url(database_url, ssl_context)
+AsyncSessionLocal = _session_factory(engine)
+
+# Read-only engine (replica) for heavy read endpoints; the primary when DATABASE_READ_URL is unset.
+# Replicas lag behind the primary: anything that must see the caller's own just-committed
+# writes (edit forms, POST responses, sync cursors) keeps using get_db.
+if settings.DATABASE_READ_URL:
+    read_database_url, read_ssl_context = get_database_url_and_ssl(settings.DATABASE_READ_URL)
+    read_engine = create_engine_for_url(read_database_url, read_ssl_context)
+    print(f"Read database URL configured (SSL: {read_ssl_context is not None})")
+else:
+    read_engine = engine
+ReadSessionLocal = _session_factory(read_engine) if read_engine is not engine else AsyncSessionLocal
 
 Base = declarative_base()
 
@@ -85,3 +117,12 @@ async def get_db() -> AsyncSession:
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db() -> AsyncSession:
+    """Session on the read engine (replica). Only for endpoints that never write."""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,102 @@
+"""Train the local ability / phase classifier from stored report labels.
+
+Usage:
+    python -m app.db.train_classifier
+    python -m app.db.train_classifier --holdout 0.2 --epochs 30 --output data/report_classifier.npz
+    python -m app.db.train_classifier --eval-only
+
+Holds out a share of the reports, reports accuracy on them (next to the keyword
+heuristic as a baseline), then refits on every report and writes the model to
+settings.LOCAL_CLASSIFIER_PATH. The app loads it at startup when
+ANALYSIS_BACKEND=local.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services.analysis import _heuristic_analysis
+from app.services.classifier import evaluate_classifier, load_training_rows, train_classifier
+from app.services.master_data import get_master_data
+
+MIN_ROWS = 20
+
+
+def _model_predictor(model):
+    def predict(content):
+        phase, ranked = model.predict(content)
+        return phase, [name for name, _ in ranked]
+    return predict
+
+
+def _heuristic_predictor(content):
+    phase, abilities, _ = _heuristic_analysis(content)
+    return phase, [a["name"] for a in abilities]
+
+
+async def main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        masters = await get_master_data(db)
+        rows = await load_training_rows(db)
+    ability_names = [a.name for a in masters.abilities]
+    phase_names = [p.name for p in masters.phases]
+
+    if len(rows) < MIN_ROWS:
+        print(f"Not enough labeled reports to train ({len(rows)} < {MIN_ROWS})")
+        return 1
+
+    random.Random(args.seed).shuffle(rows)
+    n_holdout = max(1, int(len(rows) * args.holdout))
+    held_out, train_rows = rows[:n_holdout], rows[n_holdout:]
+
+    options = dict(
+        max_features=args.max_features,
+        min_df=args.min_df,
+        epochs=args.epochs,
+        learning_rate=args.learning_rate,
+        seed=args.seed,
+    )
+    model = train_classifier(train_rows, ability_names, phase_names, **options)
+
+    started = time.perf_counter()
+    holdout = evaluate_classifier(_model_predictor(model), held_out)
+    holdout["predict_ms"] = round((time.perf_counter() - started) / len(held_out) * 1000, 3)
+    summary = {
+        "rows": len(rows),
+        "train_rows": len(train_rows),
+        "holdout": holdout,
+        "heuristic_baseline": evaluate_classifier(_heuristic_predictor, held_out),
+        "vocabulary_size": len(model.vocabulary),
+    }
+
+    if not args.eval_only:
+        if not args.no_refit:
+            model = train_classifier(rows, ability_names, phase_names, **options)
+        model.meta["holdout"] = holdout
+        model.save(args.output)
+        summary["saved_to"] = str(args.output)
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local report classifier")
+    parser.add_argument("--output", default=settings.LOCAL_CLASSIFIER_PATH, help="model file (.npz)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of reports held out for evaluation")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--max-features", type=int, default=20000, help="character n-grams kept")
+    parser.add_argument("--min-df", type=int, default=2, help="minimum reports an n-gram must appear in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--eval-only", action="store_true", help="report held-out accuracy without saving")
+    parser.add_argument("--no-refit", action="store_true", help="save the model trained without the held-out rows")
+    sys.exit(asyncio.run(main(parser.parse_args())))
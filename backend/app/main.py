@@ -1,13 +1,23 @@
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
-from fastapi import FastAPI
+import secrets
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
+from app.core import metrics, query_stats
 from app.api.router import api_router
+from app.api.endpoints.reports import requeue_stale_analyses
+from app.db.session import engine, read_engine
 from app.services.rag import initialize_rag
+from app.services.background import analysis_pool
+from app.services.master_data import master_data
+from app.services.classifier import local_classifier
+from app.services.gemini_gateway import gemini
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +27,17 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _sweep_stale_analyses() -> None:
+    """Requeue deferred analyses left PENDING / RUNNING by a restart (at startup, then periodically)."""
+    while True:
+        try:
+            await requeue_stale_analyses()
+        except Exception as e:
+            # e.g. before migrations have run
+            logger.warning(f"Stale analysis sweep failed (non-critical): {e}")
+        await asyncio.sleep(settings.ANALYSIS_SWEEP_INTERVAL_SECONDS)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
@@ -29,10 +50,28 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"RAG initialization failed (non-critical): {e}")
         # Continue anyway - RAG is optional
+    try:
+        await master_data.load()
+    except Exception as e:
+        # Loaded lazily on first use instead (e.g. before migrations have run)
+        logger.warning(f"Master data preload failed (non-critical): {e}")
+    if settings.ANALYSIS_BACKEND == "local":
+        # Falls back to Gemini / heuristics if the model file is missing
+        local_classifier.reload()
+    analysis_pool.start()
+    sweeper = asyncio.create_task(_sweep_stale_analyses())
+    if settings.METRICS_ENABLED:
+        metrics.loop_lag_monitor.start()
     logger.info("Application started successfully.")
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    sweeper.cancel()
+    await asyncio.gather(sweeper, return_exceptions=True)
+    # Let deferred report analyses finish before the worker exits (cancelled ones go back to pending)
+    await analysis_pool.drain(settings.ANALYSIS_SHUTDOWN_TIMEOUT_SECONDS)
+    gemini.executor.shutdown()
+    await metrics.loop_lag_monitor.stop()
 
 
 app = FastAPI(
@@ -67,8 +106,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursor (app/core/pagination.py), per-request DB time (app/core/query_stats.py),
+    # ETag of conditional GETs (app/core/etag.py)
+    expose_headers=["X-Next-Cursor", query_stats.SERVER_TIMING_HEADER, "ETag"],
 )
 
+# Statement counts / DB time per request (Server-Timing, N+1 warnings)
+query_stats.install(engine)
+query_stats.install(read_engine)
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
+# Route latency / status counts and connection pool gauges for GET /metrics
+metrics.instrument_pool(engine)
+if read_engine is not engine:
+    metrics.instrument_pool(read_engine, "read")
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api")
 
@@ -93,3 +146,13 @@ async def root():
 async def health_check():
     """Health check endpoint for monitoring."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(authorization: str = Header("")):
+    """Prometheus text exposition format (per process; scrape every instance)."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and not secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
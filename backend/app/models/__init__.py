@@ -1,8 +1,9 @@
 from app.models.base import BaseModel
 from app.models.user import User, UserRole, Student, Teacher, StudentTeacher
 from app.models.master import SeminarLab, Ability, ResearchPhase, Book
-from app.models.research import ResearchTheme, ThemeStatus, Report, ReportAbility
-from app.models.evaluation import StreakRecord, Evaluation
+from app.models.research import ResearchTheme, ThemeStatus, AnalysisStatus, Report, ReportAbility
+from app.models.evaluation import StreakRecord, StudentStats, TeacherAdvice, Evaluation
+from app.models.sync import ChangeLog, ChangeOp
 
 __all__ = [
     "BaseModel",
@@ -17,8 +18,13 @@ __all__ = [
     "Book",
     "ResearchTheme",
     "ThemeStatus",
+    "AnalysisStatus",
     "Report",
     "ReportAbility",
     "StreakRecord",
+    "StudentStats",
+    "TeacherAdvice",
     "Evaluation",
+    "ChangeLog",
+    "ChangeOp",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, Date, JSON
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, Date, DateTime, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel, UUID36
@@ -17,6 +17,53 @@ class StreakRecord(BaseModel):
     student = relationship("Student", back_populates="streak_record")
 
 
+class StudentStats(BaseModel):
+    """生徒×年度ごとの報告集計（ダッシュボード用ロールアップ）.
+
+    報告の作成・更新・削除と同じトランザクションで更新される。
+    再集計: python -m app.db.rebuild_student_stats
+    """
+    __tablename__ = "student_stats"
+    __table_args__ = (
+        UniqueConstraint("student_id", "fiscal_year", name="uq_student_stats_student_year"),
+    )
+
+    student_id = Column(UUID36, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    fiscal_year = Column(Integer, nullable=False)  # 年度（報告日時のJSTで判定、4月始まり）
+    report_count = Column(Integer, default=0, nullable=False)
+
+    # 例: {"ability_uuid_1": 10, "ability_uuid_2": 5, ...}
+    ability_counts = Column(JSON, nullable=False, default=dict)  # 能力別の選出回数
+    ability_points = Column(JSON, nullable=False, default=dict)  # 能力別のポイント合計
+    phase_counts = Column(JSON, nullable=False, default=dict)  # フェーズ別の報告数
+
+    latest_report_at = Column(DateTime, nullable=True)  # 最新報告日時
+    latest_phase_id = Column(UUID36, nullable=True)  # 最新報告のフェーズ
+
+    # Relationships
+    student = relationship("Student")
+
+
+class TeacherAdvice(BaseModel):
+    """先生向けAIアドバイスのキャッシュ（生徒×年度）.
+
+    fingerprint は生成に使った入力（テーマ・報告数・能力別回数・継続記録・モデル）のハッシュ。
+    入力が変わらない限り保存済みのアドバイスを返し、Geminiを呼ばない。
+    """
+    __tablename__ = "teacher_advice"
+    __table_args__ = (
+        UniqueConstraint("student_id", "fiscal_year", name="uq_teacher_advice_student_year"),
+    )
+
+    student_id = Column(UUID36, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    fiscal_year = Column(Integer, nullable=False)  # 年度
+    fingerprint = Column(String(64), nullable=False)  # 入力のSHA-256
+    advice = Column(Text, nullable=False)
+
+    # Relationships
+    student = relationship("Student")
+
+
 class Evaluation(BaseModel):
     """評価データ."""
     __tablename__ = "evaluations"
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, String, Text, Integer, Enum, ForeignKey, DateTime, Date
+from sqlalchemy import Column, String, Text, Integer, Enum, ForeignKey, DateTime, Date, Index
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel, UUID36
@@ -10,9 +10,20 @@ class ThemeStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+class AnalysisStatus(str, enum.Enum):
+    """Status of the background AI analysis of a report (deferred mode)."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class ResearchTheme(BaseModel):
     """探究テーマ（生徒1人につき年度ごとに1つ）."""
     __tablename__ = "research_themes"
+    __table_args__ = (
+        Index("ix_research_themes_student_id_fiscal_year", "student_id", "fiscal_year"),
+    )
 
     student_id = Column(UUID36, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(500), nullable=False)
@@ -32,6 +43,9 @@ class ResearchTheme(BaseModel):
 class Report(BaseModel):
     """日々の報告（日記）."""
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_student_id_reported_at", "student_id", "reported_at", "id"),
+    )
 
     student_id = Column(UUID36, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     theme_id = Column(UUID36, ForeignKey("research_themes.id", ondelete="CASCADE"), nullable=False)
@@ -40,6 +54,7 @@ class Report(BaseModel):
     content = Column(Text, nullable=False)  # 報告内容（原文）
     image_url = Column(String(2048), nullable=True)  # 添付画像URL
     ai_comment = Column(Text, nullable=True)  # AIからの一言コメント
+    analysis_status = Column(String(16), nullable=True)  # 非同期AI分析の状態（同期分析時はNULL）
     reported_at = Column(DateTime, nullable=False)  # 報告日時
 
     # Relationships
@@ -52,6 +67,11 @@ class Report(BaseModel):
 class ReportAbility(BaseModel):
     """報告×能力の中間テーブル."""
     __tablename__ = "report_abilities"
+    __table_args__ = (
+        # Covers the ability_id / points lookups per report (stats rollup)
+        Index("ix_report_abilities_report_id", "report_id", "ability_id", "points"),
+        Index("ix_report_abilities_ability_id", "ability_id"),
+    )
 
     report_id = Column(UUID36, ForeignKey("reports.id", ondelete="CASCADE"), nullable=False)
     ability_id = Column(UUID36, ForeignKey("abilities.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.db.session import Base
+from app.models.base import UUID36
+from app.models.master import Ability, ResearchPhase
+from app.models.research import Report, ReportAbility, ResearchTheme
+from app.models.evaluation import StreakRecord
+
+
+class ChangeOp:
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+
+class ChangeLog(Base):
+    """変更履歴（差分同期 GET /sync 用）.
+
+    id は単調増加のカーソル。ORMのflush時に自動記録される。
+    student_id が NULL の行はマスタデータ（全員が対象）。
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_student_id_id", "student_id", "id"),
+    )
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String(32), nullable=False)  # report / theme / streak / ability / phase
+    entity_id = Column(String(36), nullable=False)
+    student_id = Column(UUID36, nullable=True)
+    op = Column(String(8), nullable=False)  # upsert / delete
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# --- Automatic capture on flush ----------------------------------------------------
+
+# Model -> (entity name, function returning the owning student_id or None for master data)
+TRACKED_MODELS = {
+    Report: ("report", lambda obj: obj.student_id),
+    ResearchTheme: ("theme", lambda obj: obj.student_id),
+    StreakRecord: ("streak", lambda obj: obj.student_id),
+    Ability: ("ability", lambda obj: None),
+    ResearchPhase: ("phase", lambda obj: None),
+}
+
+
+def _report_owner(session: Session, report_id) -> str:
+    """student_id of a report, from the identity map if possible."""
+    report = session.identity_map.get(identity_key(Report, report_id))
+    if report is not None:
+        return report.student_id
+    return session.connection().execute(
+        select(Report.student_id).where(Report.id == report_id)
+    ).scalar()
+
+
+def _record_report_upsert(session: Session, changes: dict, report_id) -> None:
+    key = ("report", str(report_id))
+    if key in changes:
+        return
+    student_id = _report_owner(session, report_id)
+    # None: the report itself was deleted in this flush (recorded as a delete)
+    if student_id is not None:
+        changes[key] = (student_id, ChangeOp.UPSERT)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session: Session, flush_context) -> None:
+    changes = {}  # (entity, entity_id) -> (student_id, op)
+
+    for obj in list(session.new) + list(session.dirty):
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked is not None:
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            entity, owner = tracked
+            changes.setdefault((entity, str(obj.id)), (owner(obj), ChangeOp.UPSERT))
+        elif isinstance(obj, ReportAbility) and obj.report_id:
+            # Ability selection is part of the report payload
+            _record_report_upsert(session, changes, obj.report_id)
+
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked is not None:
+            entity, owner = tracked
+            changes[(entity, str(obj.id))] = (owner(obj), ChangeOp.DELETE)
+        elif isinstance(obj, ReportAbility) and obj.report_id:
+            _record_report_upsert(session, changes, obj.report_id)
+
+    if not changes:
+        return
+
+    now = datetime.utcnow()
+    session.connection().execute(
+        ChangeLog.__table__.insert(),
+        [
+            {
+                "entity": entity,
+                "entity_id": entity_id,
+                "student_id": student_id,
+                "op": op,
+                "changed_at": now,
+            }
+            for (entity, entity_id), (student_id, op) in changes.items()
+        ],
+    )
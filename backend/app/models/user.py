@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, String, Enum, Integer, Boolean, ForeignKey, Date
+from sqlalchemy import Column, String, Enum, Integer, Boolean, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel, UUID36
@@ -14,6 +14,9 @@ class UserRole(str, enum.Enum):
 class User(BaseModel):
     """Base user model for authentication."""
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     email = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
@@ -74,6 +77,10 @@ class Teacher(BaseModel):
 class StudentTeacher(BaseModel):
     """Many-to-many relationship between students and teachers."""
     __tablename__ = "student_teachers"
+    __table_args__ = (
+        Index("ix_student_teachers_teacher_year_active", "teacher_id", "fiscal_year", "is_active", "student_id"),
+        Index("ix_student_teachers_student_id_fiscal_year", "student_id", "fiscal_year"),
+    )
 
     student_id = Column(UUID36, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
     teacher_id = Column(UUID36, ForeignKey("teachers.id", ondelete="CASCADE"), nullable=False)
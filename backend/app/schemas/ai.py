@@ -20,3 +20,4 @@ class TeacherAdviceResponse(BaseModel):
     report_count: int
     current_streak: int
     max_streak: int
+    cached: bool = False  # served from the teacher_advice cache (no Gemini call)
@@ -109,6 +109,7 @@ class ReportResponse(BaseModel):
     phase: Optional[ResearchPhaseResponse] = None
     selected_abilities: List[ReportAbilityResponse] = []
     ai_comment: Optional[str] = None
+    analysis_status: Optional[str] = None  # pending / running / completed / failed (deferred mode)
     reported_at: datetime
     created_at: datetime
     updated_at: datetime
@@ -117,6 +118,33 @@ class ReportResponse(BaseModel):
         from_attributes = True
 
 
+class ReportAnalysisStatusResponse(BaseModel):
+    """非同期AI分析の状態（ポーリング用）."""
+    report_id: UUID
+    analysis_status: Optional[str] = None  # NULL = analyzed synchronously
+    phase: Optional[ResearchPhaseResponse] = None
+    selected_abilities: List[ReportAbilityResponse] = []
+    ai_comment: Optional[str] = None
+
+
+class BulkImportRowError(BaseModel):
+    row: int  # 1-based index in the uploaded file
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    """一括取り込みの結果."""
+    received: int
+    inserted: int
+    skipped: int
+    ai_analyzed: int
+    students: int
+    dry_run: bool
+    elapsed_seconds: float
+    reports_per_second: float
+    errors: List[BulkImportRowError] = []
+
+
 class ReportListResponse(BaseModel):
     id: UUID
     content: str
@@ -0,0 +1,34 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.research import (
+    AbilityResponse,
+    ReportResponse,
+    ResearchPhaseResponse,
+    ResearchThemeResponse,
+    StreakRecordResponse,
+)
+
+
+class SyncTombstone(BaseModel):
+    """削除されたレコード."""
+    entity: str  # report / theme / streak / ability / phase
+    id: str
+
+
+class SyncResponse(BaseModel):
+    """差分同期（GET /sync）のレスポンス.
+
+    `cursor` を次回の `since` に指定する。`has_more` が true の場合は続けて取得する。
+    `full` が true の場合は全件（クライアント側のキャッシュを置き換える）。
+    """
+    cursor: str
+    has_more: bool = False
+    full: bool = False
+    reports: List[ReportResponse] = []
+    themes: List[ResearchThemeResponse] = []
+    streak: Optional[StreakRecordResponse] = None
+    abilities: List[AbilityResponse] = []
+    phases: List[ResearchPhaseResponse] = []
+    deleted: List[SyncTombstone] = []
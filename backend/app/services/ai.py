@@ -1,31 +1,13 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 import logging
 
+from app.core import metrics
 from app.core.config import settings
-from app.services.rag import generate_rag_response
+from app.services.gemini_gateway import fallback_reason, flight_key, gemini
+from app.services.rag import generate_rag_response, stream_rag_response
 
 logger = logging.getLogger(__name__)
 
-# Lazy import for google-generativeai SDK
-_genai_configured = False
-
-
-def _get_genai():
-    """Get configured google-generativeai module."""
-    global _genai_configured
-    try:
-        import google.generativeai as genai
-        if not _genai_configured and settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            _genai_configured = True
-        return genai
-    except ImportError:
-        logger.warning("google-generativeai not installed")
-        return None
-    except Exception as e:
-        logger.error(f"Error configuring google-generativeai: {e}")
-        return None
-
 
 # Prompts
 DAILY_COMMENT_PROMPT = """あなたは探究学習を支援するAIキャラクター「AIナマイ」です。
@@ -137,15 +119,12 @@ async def generate_ai_comment(
     theme_title: str,
 ) -> Optional[str]:
     """Generate AI comment for a daily report."""
-    if not settings.GEMINI_API_KEY:
-        return None
-
-    genai = _get_genai()
-    if not genai:
+    if not gemini.configured or not gemini.legacy_sdk():
+        metrics.record_fallback("ai_comment", "unconfigured")
         return None
 
     try:
-        model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        model = gemini.model()
 
         prompt = DAILY_COMMENT_PROMPT.format(
             content=content,
@@ -154,11 +133,16 @@ async def generate_ai_comment(
             theme=theme_title,
         )
 
-        response = await model.generate_content_async(prompt)
+        response = await gemini.call(
+            "ai_comment",
+            lambda: gemini.generate(model, prompt),
+            key=flight_key(settings.GEMINI_MODEL, prompt),
+        )
         return response.text.strip()
 
     except Exception as e:
         logger.error(f"Error generating AI comment: {e}")
+        metrics.record_fallback("ai_comment", fallback_reason(e))
         return None
 
 
@@ -172,7 +156,8 @@ async def generate_chat_response(message: str, use_rag: bool = True) -> str:
     Returns:
         Generated response text
     """
-    if not settings.GEMINI_API_KEY:
+    if not gemini.configured:
+        metrics.record_fallback("chat", "unconfigured")
         return "申し訳ありません、現在AIサービスに接続できません。"
 
     # Use RAG-enabled response
@@ -184,23 +169,70 @@ async def generate_chat_response(message: str, use_rag: bool = True) -> str:
         )
 
     # Fallback to non-RAG response
-    genai = _get_genai()
+    genai = gemini.legacy_sdk()
     if not genai:
+        metrics.record_fallback("chat", "unconfigured")
         return "申し訳ありません、現在AIサービスに接続できません。"
 
     try:
-        model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        model = gemini.model()
 
         prompt = CHAT_PROMPT.format(message=message)
 
-        response = await model.generate_content_async(prompt)
+        response = await gemini.call(
+            "chat",
+            lambda: gemini.generate(model, prompt),
+            key=flight_key(settings.GEMINI_MODEL, prompt),
+        )
         return response.text.strip()
 
     except Exception as e:
         logger.error(f"Error generating chat response: {e}")
+        metrics.record_fallback("chat", fallback_reason(e))
         return "申し訳ありません、今少し考えがまとまりません。もう一度質問していただけますか？"
 
 
+async def stream_chat_response(message: str) -> AsyncIterator[str]:
+    """Streaming variant of generate_chat_response (yields text chunks)."""
+    if not gemini.configured:
+        metrics.record_fallback("chat", "unconfigured")
+        yield "申し訳ありません、現在AIサービスに接続できません。"
+        return
+
+    async for chunk in stream_rag_response(message=message, system_prompt=CHAT_SYSTEM_PROMPT):
+        yield chunk
+
+
+ADVICE_UNAVAILABLE_MESSAGE = "AIサービスに接続できません。"
+ADVICE_FAILED_MESSAGE = "アドバイスの生成に失敗しました。"
+
+
+def is_advice_fallback(advice: str) -> bool:
+    """True if generate_teacher_advice returned an error message instead of advice."""
+    return advice in (ADVICE_UNAVAILABLE_MESSAGE, ADVICE_FAILED_MESSAGE)
+
+
+def teacher_advice_fingerprint(
+    student_name: str,
+    theme: str,
+    report_count: int,
+    ability_counts: dict,
+    current_streak: int,
+    max_streak: int,
+) -> str:
+    """Hash of every input of generate_teacher_advice (plus model and prompt) for TeacherAdvice.fingerprint."""
+    return flight_key(
+        settings.GEMINI_MODEL,
+        TEACHER_ADVICE_PROMPT,
+        student_name,
+        theme,
+        report_count,
+        sorted(ability_counts.items()),
+        current_streak,
+        max_streak,
+    )
+
+
 async def generate_teacher_advice(
     student_name: str,
     theme: str,
@@ -210,15 +242,12 @@ async def generate_teacher_advice(
     max_streak: int,
 ) -> str:
     """Generate AI advice for teachers."""
-    if not settings.GEMINI_API_KEY:
-        return "AIサービスに接続できません。"
-
-    genai = _get_genai()
-    if not genai:
-        return "AIサービスに接続できません。"
+    if not gemini.configured or not gemini.legacy_sdk():
+        metrics.record_fallback("teacher_advice", "unconfigured")
+        return ADVICE_UNAVAILABLE_MESSAGE
 
     try:
-        model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        model = gemini.model()
 
         # Format ability counts
         ability_counts_str = "\n".join(
@@ -234,9 +263,14 @@ async def generate_teacher_advice(
             max_streak=max_streak,
         )
 
-        response = await model.generate_content_async(prompt)
+        response = await gemini.call(
+            "teacher_advice",
+            lambda: gemini.generate(model, prompt),
+            key=flight_key(settings.GEMINI_MODEL, prompt),
+        )
         return response.text.strip()
 
     except Exception as e:
         logger.error(f"Error generating teacher advice: {e}")
-        return "アドバイスの生成に失敗しました。"
+        metrics.record_fallback("teacher_advice", fallback_reason(e))
+        return ADVICE_FAILED_MESSAGE
@@ -1,33 +1,25 @@
-from typing import List, Optional, Tuple
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
 from uuid import UUID
-import asyncio
+import hashlib
 import logging
-
-# Gemini SDK (google-generativeai) is optional; analysis should still work via heuristics if missing.
-try:  # pragma: no cover
-    import google.generativeai as genai  # type: ignore
-except Exception:  # pragma: no cover
-    genai = None  # type: ignore
+import time
 import json
 import re
 
+from app.core import metrics
 from app.core.config import settings
-from app.services.rag import generate_rag_response
+from app.services.rag import (
+    StreamInterrupted, augment_system_prompt, generate_rag_response, is_fallback_response, stream_rag_response,
+)
+from app.services.analysis_cache import analysis_cache
+from app.services.classifier import local_classifier
+from app.services.gemini_gateway import flight_key, gemini
+from app.services.master_data import AbilityEntry, MasterDataSnapshot
 
 logger = logging.getLogger(__name__)
 
-# Initialize the Gemini client
-_client = None
-
-def get_genai_client():
-    """Get or create the genai client."""
-    global _client
-    if genai is None or not settings.GEMINI_API_KEY:
-        return None
-    if _client is None:
-        genai.configure(api_key=settings.GEMINI_API_KEY)  # type: ignore[union-attr]
-        _client = genai  # configured module acts as client holder
-    return _client
+# Gemini SDK (google-generativeai) is optional; analysis still works via heuristics if missing.
+# Calls go through the shared gateway (rate limit, retries, circuit breaker).
 
 
 ANALYZE_PROMPT = """あなたは探究学習の分析を支援するAIです。
@@ -109,6 +101,48 @@ COMMENT_USER_PROMPT = """以下の生徒の報告に対して、励ましのコ
 上記を踏まえて、{student_name}さんの頑張りを認め、次の一歩への意欲を高める温かいコメントを日本語で生成してください。
 書籍の教えを参考に、具体的で励みになるメッセージをお願いします。"""
 
+# 分析と励ましコメントを1回の呼び出しで生成するプロンプト（ANALYSIS_PIPELINE=combined）
+# system_instruction には COMMENT_SYSTEM_PROMPT を使用する
+COMBINED_ANALYZE_PROMPT = """生徒の探究学習の報告を分析し、フェーズと発揮された能力を判定したうえで、励ましのコメントを生成してください。
+
+## 7つの能力
+1. 情報収集能力と先を見る力：トレンドを感知し、未来を予測する力
+2. 課題設定能力と構想する力：課題を設定し、構想を練る力
+3. 巻き込む力：他人を巻き込み、協力を得る力
+4. 対話する力：対話を通じて相手を理解する力
+5. 実行する力：小さなことから始め、実行に移す力
+6. 謙虚である力：謙虚な姿勢で仲間を集める力
+7. 完遂する力：諦めずにやり遂げる力
+
+## 4つの探究フェーズ
+1. 課題の設定
+2. 情報の収集
+3. 整理・分析
+4. まとめ・表現
+
+## タスク
+1. どの探究フェーズに該当するか（1つ選択）
+2. 発揮された能力（必ず3つに固定）：強く発揮された能力1つ + サブ発揮能力2つ（重複なし）
+3. 上記の分析を踏まえ、{student_name}さんの頑張りを認め、次の一歩への意欲を高める温かいコメント（日本語、3〜5文）
+
+## 入力
+【生徒名】{student_name}さん
+【研究テーマ】{theme}
+【報告内容】
+{content}
+
+## 出力（JSON形式のみ、マークダウンなし）
+{{
+  "phase": "フェーズ名",
+  "primary_ability": {{"name": "能力名", "reason": "理由"}},
+  "sub_abilities": [
+    {{"name": "能力名", "reason": "理由"}},
+    {{"name": "能力名", "reason": "理由"}}
+  ],
+  "comment": "励ましのコメント"
+}}
+"""
+
 ABILITY_NAMES = [
     "情報収集能力と先を見る力",
     "課題設定能力と構想する力",
@@ -121,39 +155,112 @@ ABILITY_NAMES = [
 
 PHASE_NAMES = ["課題の設定", "情報の収集", "整理・分析", "まとめ・表現"]
 
+# Bumped automatically whenever a prompt changes so cached results are not reused
+PROMPT_VERSION = hashlib.sha256(
+    (ANALYZE_PROMPT + COMMENT_SYSTEM_PROMPT + COMMENT_USER_PROMPT + COMBINED_ANALYZE_PROMPT).encode("utf-8")
+).hexdigest()[:12]
+
 # Ability score constants for analysis results
 STRONG_ABILITY_SCORE = 80  # Score for the primary/strong ability
 SUB_ABILITY_SCORE = 60     # Score for each sub ability
 
 
+# Heuristic keywords (JP keywords kept as-is)
+ABILITY_KEYWORDS = {
+    "情報収集能力と先を見る力": ["調べ", "検索", "資料", "文献", "情報", "データ", "統計", "調査"],
+    "課題設定能力と構想する力": ["課題", "仮説", "テーマ", "目的", "計画", "構想", "方針", "設計"],
+    "巻き込む力": ["協力", "巻き込", "チーム", "仲間", "提案", "依頼", "相談", "生徒会", "承認"],
+    "対話する力": ["インタビュー", "聞", "対話", "議論", "話", "質問", "フィードバック"],
+    "実行する力": ["実行", "作成", "作っ", "やっ", "行動", "試し", "実施", "テスト", "作業"],
+    "謙虚である力": ["反省", "学び", "気づ", "改善", "教えて", "指摘", "振り返", "フィードバック"],
+    "完遂する力": ["完了", "やり遂げ", "最後まで", "継続", "仕上げ", "提出", "発表", "達成"],
+}
+
+# Later phases win when several match
+PHASE_KEYWORDS = [
+    ("課題の設定", ["課題", "目的", "仮説", "テーマ"]),
+    ("情報の収集", ["調べ", "検索", "資料", "文献", "インタビュー", "アンケート", "データ"]),
+    ("整理・分析", ["整理", "分析", "比較", "まとめ", "表", "グラフ", "マップ"]),
+    ("まとめ・表現", ["発表", "スライド", "資料", "ポスター", "表現", "まとめた"]),
+]
+
+
+class KeywordMatcher:
+    """All ability / phase keywords compiled into one regex, matched in a single pass.
+
+    Each search restarts one character after the previous hit (not after its
+    end), so overlapping keywords such as 実行 / 行動 in 実行動 are all found.
+    Alternatives are ordered longest first; a hit on a longer keyword also
+    credits the keywords that are its prefixes (まとめた -> まとめ).
+    """
+
+    def __init__(self, ability_keywords: dict, phase_keywords: List[Tuple[str, List[str]]]):
+        self.ability_names = list(ability_keywords)
+        self.phase_names = [name for name, _ in phase_keywords]
+
+        # keyword -> (ability indexes, phase indexes)
+        owners = {}
+        for i, keywords in enumerate(ability_keywords.values()):
+            for kw in keywords:
+                owners.setdefault(kw, (set(), set()))[0].add(i)
+        for i, (_, keywords) in enumerate(phase_keywords):
+            for kw in keywords:
+                owners.setdefault(kw, (set(), set()))[1].add(i)
+
+        keywords = sorted(owners, key=lambda kw: (-len(kw), kw))
+        self._pattern = re.compile("|".join(re.escape(kw) for kw in keywords))
+        # matched keyword -> every keyword it implies (itself and its prefixes)
+        self._implied = {
+            kw: tuple(other for other in keywords if kw.startswith(other))
+            for kw in keywords
+        }
+        self._owners = {kw: (tuple(a), tuple(p)) for kw, (a, p) in owners.items()}
+
+    def keywords_in(self, text: str) -> set:
+        found = set()
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            found.update(self._implied[match.group()])
+            match = search(text, match.start() + 1)
+        return found
+
+    def score(self, text: str) -> Tuple[List[int], Optional[str]]:
+        """(hit count per ability in ABILITY_NAMES order, suggested phase or None)."""
+        ability_hits = [0] * len(self.ability_names)
+        last_phase = -1
+        for kw in self.keywords_in(text):
+            abilities, phases = self._owners[kw]
+            for i in abilities:
+                ability_hits[i] += 1
+            for i in phases:
+                if i > last_phase:
+                    last_phase = i
+        return ability_hits, self.phase_names[last_phase] if last_phase >= 0 else None
+
+
+_keyword_matcher = KeywordMatcher(ABILITY_KEYWORDS, PHASE_KEYWORDS)
+
+_HEURISTIC_REASONS = [
+    ("記述内容から最も強く表れているため", "strong", STRONG_ABILITY_SCORE),
+    ("行動や思考の過程から確認できるため", "sub", SUB_ABILITY_SCORE),
+    ("取り組みの補助的な要素として見られるため", "sub", SUB_ABILITY_SCORE),
+]
+
+
 def _heuristic_analysis(content: str) -> Tuple[Optional[str], List[dict], str]:
     """
     AIが使えない/失敗した場合のフォールバック。
     強1（score=80）＋サブ2（score=60）を必ず返す。
     """
-    text = (content or "").lower()
-
-    def score_for(name: str) -> int:
-        # Very small heuristic keyword matching (JP keywords kept as-is)
-        kws = {
-            "情報収集能力と先を見る力": ["調べ", "検索", "資料", "文献", "情報", "データ", "統計", "調査"],
-            "課題設定能力と構想する力": ["課題", "仮説", "テーマ", "目的", "計画", "構想", "方針", "設計"],
-            "巻き込む力": ["協力", "巻き込", "チーム", "仲間", "提案", "依頼", "相談", "生徒会", "承認"],
-            "対話する力": ["インタビュー", "聞", "対話", "議論", "話", "質問", "フィードバック"],
-            "実行する力": ["実行", "作成", "作っ", "やっ", "行動", "試し", "実施", "テスト", "作業"],
-            "謙虚である力": ["反省", "学び", "気づ", "改善", "教えて", "指摘", "振り返", "フィードバック"],
-            "完遂する力": ["完了", "やり遂げ", "最後まで", "継続", "仕上げ", "提出", "発表", "達成"],
-        }
-        hits = 0
-        for kw in kws.get(name, []):
-            if kw in text:
-                hits += 1
-        return hits
+    ability_hits, phase = _keyword_matcher.score((content or "").lower())
+    return _heuristic_result(ability_hits, phase)
 
-    scored = [(name, score_for(name)) for name in ABILITY_NAMES]
-    scored.sort(key=lambda x: (-x[1], ABILITY_NAMES.index(x[0])))
 
-    picked = [s[0] for s in scored if s[1] > 0][:3]
+def _heuristic_result(ability_hits: List[int], phase: Optional[str]) -> Tuple[Optional[str], List[dict], str]:
+    # Most hits first, ties in ABILITY_NAMES order
+    ranked = sorted(range(len(ability_hits)), key=lambda i: (-ability_hits[i], i))
+    picked = [_keyword_matcher.ability_names[i] for i in ranked if ability_hits[i] > 0][:3]
     # If insufficient, fill with fixed order
     for n in ABILITY_NAMES:
         if len(picked) >= 3:
@@ -162,26 +269,179 @@ def _heuristic_analysis(content: str) -> Tuple[Optional[str], List[dict], str]:
             picked.append(n)
 
     abilities = [
-        {"name": picked[0], "reason": "記述内容から最も強く表れているため", "role": "strong", "score": STRONG_ABILITY_SCORE},
-        {"name": picked[1], "reason": "行動や思考の過程から確認できるため", "role": "sub", "score": SUB_ABILITY_SCORE},
-        {"name": picked[2], "reason": "取り組みの補助的な要素として見られるため", "role": "sub", "score": SUB_ABILITY_SCORE},
+        {"name": name, "reason": reason, "role": role, "score": score}
+        for name, (reason, role, score) in zip(picked, _HEURISTIC_REASONS)
     ]
 
-    # Phase heuristic
-    phase = None
-    if any(k in text for k in ["課題", "目的", "仮説", "テーマ"]):
-        phase = "課題の設定"
-    if any(k in text for k in ["調べ", "検索", "資料", "文献", "インタビュー", "アンケート", "データ"]):
-        phase = "情報の収集"
-    if any(k in text for k in ["整理", "分析", "比較", "まとめ", "表", "グラフ", "マップ"]):
-        phase = "整理・分析"
-    if any(k in text for k in ["発表", "スライド", "資料", "ポスター", "表現", "まとめた"]):
-        phase = "まとめ・表現"
+    return phase, abilities, _fallback_comment(abilities)
+
 
+def _fallback_comment(abilities: List[dict]) -> str:
     # フォールバック時のコメントも能力に基づいて生成
     primary_name = abilities[0]["name"] if abilities else "探究する力"
-    comment = f"報告ありがとうございます。今回の取り組みでは特に「{primary_name}」を発揮していますね。小さな一歩でも、積み重ねることで大きな成長につながります。次のステップも楽しみにしています！"
-    return phase, abilities, comment
+    return f"報告ありがとうございます。今回の取り組みでは特に「{primary_name}」を発揮していますね。小さな一歩でも、積み重ねることで大きな成長につながります。次のステップも楽しみにしています！"
+
+
+def _offline_analysis(content: str, local: Optional[Tuple[Optional[str], List[dict]]]) -> Tuple[Optional[str], List[dict], str]:
+    """Result without Gemini: the local classifier if loaded, otherwise the keyword heuristic."""
+    if local is not None:
+        return local[0], local[1], _fallback_comment(local[1])
+    return _heuristic_analysis(content)
+
+
+def _local_classification(content: str) -> Optional[Tuple[Optional[str], List[dict]]]:
+    """ANALYSIS_BACKEND=local: phase and strong/sub abilities from the trained classifier.
+
+    Returns None if the local backend is off or no model is available.
+    """
+    if settings.ANALYSIS_BACKEND != "local":
+        return None
+    model = local_classifier.get()
+    if model is None:
+        return None
+    phase, ranked = model.predict(content)
+    abilities = [
+        {"name": name, "reason": reason, "role": role, "score": score}
+        for (name, _), (reason, role, score) in zip(ranked, _HEURISTIC_REASONS)
+    ]
+    return phase, abilities
+
+
+def batch_heuristic_analysis(contents: Iterable[str]) -> List[Tuple[Optional[str], List[dict], str]]:
+    """`_heuristic_analysis` over many reports (backfills / bulk import); identical texts are matched once."""
+    scores = {}
+    results = []
+    for content in contents:
+        text = (content or "").lower()
+        score = scores.get(text)
+        if score is None:
+            score = scores[text] = _keyword_matcher.score(text)
+        results.append(_heuristic_result(*score))
+    return results
+
+
+# Ability point constants
+STRONG_ABILITY_POINTS = 2  # Points for the primary/strong ability
+SUB_ABILITY_POINTS = 1     # Points for each sub ability
+
+
+def _get_ability_attr(item: Any, attr: str, default=None):
+    """Get attribute from dict or DetectedAbility object."""
+    if isinstance(item, dict):
+        return item.get(attr, default)
+    return getattr(item, attr, default)
+
+
+def pick_report_abilities(
+    masters: MasterDataSnapshot,
+    detected_abilities: Optional[List[Any]] = None,
+    fallback_ability_ids: Optional[List[Any]] = None,
+) -> List[Tuple[AbilityEntry, str, int]]:
+    """
+    Pick exactly 3 abilities for a report as (ability, role, points):
+    - strong: +2
+    - sub: +1, +1
+
+    Uses 'role' field from detected_abilities if available to determine strong vs sub,
+    then fallback_ability_ids, then display order.
+    """
+    detected_abilities = detected_abilities or []
+    fallback_ability_ids = fallback_ability_ids or []
+
+    # Ability lookups (active abilities only)
+    all_abilities_ordered = masters.abilities
+    name_to_ability = masters.ability_by_name
+    id_to_ability = masters.active_ability_by_id
+
+    # Separate strong and sub abilities based on 'role' field
+    strong_ability: Optional[AbilityEntry] = None
+    sub_abilities: List[AbilityEntry] = []
+
+    for item in detected_abilities:
+        name = _get_ability_attr(item, "name")
+        if not name or name not in name_to_ability:
+            continue
+        ability = name_to_ability[name]
+        role = _get_ability_attr(item, "role", "sub")
+
+        # First strong ability found becomes the primary
+        if role == "strong" and strong_ability is None:
+            strong_ability = ability
+        elif ability != strong_ability and ability not in sub_abilities:
+            sub_abilities.append(ability)
+            if len(sub_abilities) >= 2:
+                break
+
+    # If no strong ability found, use the first detected ability
+    if strong_ability is None and detected_abilities:
+        for item in detected_abilities:
+            name = _get_ability_attr(item, "name")
+            if name and name in name_to_ability:
+                strong_ability = name_to_ability[name]
+                break
+
+    # If still no strong, use fallback or first from all abilities
+    if strong_ability is None:
+        for aid in fallback_ability_ids:
+            a = id_to_ability.get(str(aid))
+            if a:
+                strong_ability = a
+                break
+        if strong_ability is None and all_abilities_ordered:
+            strong_ability = all_abilities_ordered[0]
+
+    # Fill sub abilities if needed
+    for aid in fallback_ability_ids:
+        if len(sub_abilities) >= 2:
+            break
+        a = id_to_ability.get(str(aid))
+        if a and a != strong_ability and a not in sub_abilities:
+            sub_abilities.append(a)
+
+    for a in all_abilities_ordered:
+        if len(sub_abilities) >= 2:
+            break
+        if a != strong_ability and a not in sub_abilities:
+            sub_abilities.append(a)
+
+    # Build final list: strong first, then subs
+    picked = []
+    if strong_ability:
+        picked.append(strong_ability)
+    picked.extend(sub_abilities[:2])
+
+    return [
+        (ability, "strong" if idx == 0 else "sub", STRONG_ABILITY_POINTS if idx == 0 else SUB_ABILITY_POINTS)
+        for idx, ability in enumerate(picked)
+    ]
+
+
+def _build_comment_prompt(
+    content: str,
+    theme_title: str,
+    student_name: str,
+    phase: str,
+    primary_ability: dict,
+    sub_abilities: List[dict],
+) -> str:
+    """励ましコメント生成用のユーザープロンプトを作成する."""
+    return COMMENT_USER_PROMPT.format(
+        student_name=student_name,
+        theme=theme_title or "未設定",
+        content=content,
+        phase=phase or "未判定",
+        primary_ability=primary_ability.get("name", "未判定") if primary_ability else "未判定",
+        primary_reason=primary_ability.get("reason", "") if primary_ability else "",
+        sub_ability1=sub_abilities[0].get("name", "未判定") if len(sub_abilities) > 0 else "未判定",
+        sub_reason1=sub_abilities[0].get("reason", "") if len(sub_abilities) > 0 else "",
+        sub_ability2=sub_abilities[1].get("name", "未判定") if len(sub_abilities) > 1 else "未判定",
+        sub_reason2=sub_abilities[1].get("reason", "") if len(sub_abilities) > 1 else "",
+    )
+
+
+def _short_comment_fallback(student_name: str, phase: str, primary_ability: Optional[dict]) -> str:
+    """生成されたコメントが空または短すぎる場合のフォールバック."""
+    return f"{student_name}さん、報告ありがとうございます。{phase or '探究活動'}の段階で、{primary_ability.get('name', '能力') if primary_ability else '様々な能力'}を発揮していますね。この調子で頑張りましょう！"
 
 
 async def _generate_encouraging_comment(
@@ -195,17 +455,13 @@ async def _generate_encouraging_comment(
     """RAGを使用して励ましコメントを生成する."""
     try:
         # コメント生成用のプロンプトを作成
-        user_prompt = COMMENT_USER_PROMPT.format(
-            student_name=student_name,
-            theme=theme_title or "未設定",
+        user_prompt = _build_comment_prompt(
             content=content,
-            phase=phase or "未判定",
-            primary_ability=primary_ability.get("name", "未判定") if primary_ability else "未判定",
-            primary_reason=primary_ability.get("reason", "") if primary_ability else "",
-            sub_ability1=sub_abilities[0].get("name", "未判定") if len(sub_abilities) > 0 else "未判定",
-            sub_reason1=sub_abilities[0].get("reason", "") if len(sub_abilities) > 0 else "",
-            sub_ability2=sub_abilities[1].get("name", "未判定") if len(sub_abilities) > 1 else "未判定",
-            sub_reason2=sub_abilities[1].get("reason", "") if len(sub_abilities) > 1 else "",
+            theme_title=theme_title,
+            student_name=student_name,
+            phase=phase,
+            primary_ability=primary_ability,
+            sub_abilities=sub_abilities,
         )
 
         # RAGサービスを使用してコメント生成（書籍の内容を参照）
@@ -213,108 +469,258 @@ async def _generate_encouraging_comment(
             message=user_prompt,
             system_prompt=COMMENT_SYSTEM_PROMPT,
             use_rag=True,
+            rag_query=content,
         )
 
         # コメントが空または短すぎる場合はフォールバック
         if not comment or len(comment) < 20:
-            return f"{student_name}さん、報告ありがとうございます。{phase or '探究活動'}の段階で、{primary_ability.get('name', '能力') if primary_ability else '様々な能力'}を発揮していますね。この調子で頑張りましょう！"
+            metrics.record_fallback("analysis_comment", "empty")
+            return _short_comment_fallback(student_name, phase, primary_ability)
 
         return comment
 
     except Exception as e:
         logger.warning(f"Error generating encouraging comment: {e}")
+        metrics.record_fallback("analysis_comment", "error")
         # フォールバックメッセージ
         return f"{student_name}さん、報告ありがとうございます。着実に探究を進めていますね。次のステップも楽しみにしています！"
 
 
+def _load_json_response(response_text: str) -> dict:
+    """Parse a Gemini JSON response (tolerates ```json fences)."""
+    # マークダウンのコードブロックを除去
+    if response_text.startswith("```"):
+        response_text = re.sub(r'^```json?\s*', '', response_text)
+        response_text = re.sub(r'\s*```$', '', response_text)
+    result = json.loads(response_text)
+    if not isinstance(result, dict):
+        raise json.JSONDecodeError("Expected a JSON object", response_text, 0)
+    return result
+
+
+def _parse_analysis_result(result: dict) -> Tuple[Optional[str], List[dict]]:
+    """Extract (phase, abilities) from an ANALYZE_PROMPT-shaped JSON object."""
+    phase = result.get("phase")
+    abilities: List[dict] = []
+
+    # New format (preferred): 1 strong + 2 sub
+    primary = result.get("primary_ability")
+    subs = result.get("sub_abilities", [])
+    if isinstance(primary, dict) and isinstance(subs, list) and len(subs) >= 2:
+        abilities = [
+            {"name": primary.get("name"), "reason": primary.get("reason"), "role": "strong", "score": STRONG_ABILITY_SCORE},
+            {"name": subs[0].get("name"), "reason": subs[0].get("reason"), "role": "sub", "score": SUB_ABILITY_SCORE},
+            {"name": subs[1].get("name"), "reason": subs[1].get("reason"), "role": "sub", "score": SUB_ABILITY_SCORE},
+        ]
+    else:
+        # Backward-compatible: old format list -> take first 3 deterministically
+        old = result.get("abilities", [])
+        if isinstance(old, list):
+            trimmed = old[:3]
+            for i, ab in enumerate(trimmed):
+                if not isinstance(ab, dict):
+                    continue
+                abilities.append({
+                    "name": ab.get("name"),
+                    "reason": ab.get("reason"),
+                    "role": "strong" if i == 0 else "sub",
+                    "score": STRONG_ABILITY_SCORE if i == 0 else SUB_ABILITY_SCORE,
+                })
+
+    return phase, abilities
+
+
+async def _analyze_combined(
+    content: str,
+    theme_title: Optional[str],
+    surname: str,
+) -> Optional[Tuple[Optional[str], List[dict], str]]:
+    """
+    1回のGemini呼び出しでフェーズ・能力・励ましコメントをまとめて生成する。
+    JSONとして解釈できない場合はNoneを返す（呼び出し元で2段階方式にフォールバック）。
+    """
+    prompt = COMBINED_ANALYZE_PROMPT.format(
+        content=content,
+        theme=theme_title or "未設定",
+        student_name=surname,
+    )
+    system_instruction = augment_system_prompt(COMMENT_SYSTEM_PROMPT, content)
+    model = gemini.model(
+        system_instruction=system_instruction,
+        generation_config={"response_mime_type": "application/json"},
+        # Instructions carrying retrieved passages are one-off
+        cache=system_instruction == COMMENT_SYSTEM_PROMPT,
+    )
+
+    response_text = ""
+    try:
+        response = await gemini.call(
+            "analysis_combined",
+            lambda: gemini.generate(model, prompt),
+            # A double-submitted report shares one request
+            key=flight_key(settings.GEMINI_MODEL, system_instruction, "json", prompt),
+        )
+        response_text = (getattr(response, "text", "") or "").strip()
+        result = _load_json_response(response_text)
+        phase, abilities = _parse_analysis_result(result)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Combined analysis JSON parse error: {e}, response: {response_text}")
+        return None
+    except Exception as e:
+        logger.warning(f"Combined analysis timeout or error: {e}")
+        return None
+
+    if len(abilities) < 3:
+        logger.warning(f"Combined analysis returned incomplete abilities: {response_text}")
+        return None
+
+    comment = result.get("comment")
+    if not isinstance(comment, str) or len(comment.strip()) < 20:
+        # Analysis is usable; only the comment needs a second call
+        comment = await _generate_encouraging_comment(
+            content=content,
+            theme_title=theme_title or "未設定",
+            student_name=surname,
+            phase=phase or "探究活動",
+            primary_ability=abilities[0],
+            sub_abilities=abilities[1:3],
+        )
+
+    return phase, abilities, comment.strip()
+
+
+def _extract_surname(student_name: Optional[str]) -> str:
+    """生徒名から苗字を抽出（スペースや全角スペースで分割して最初の部分を取得）."""
+    if student_name:
+        return student_name.split()[0] if ' ' in student_name else student_name.split('　')[0] if '　' in student_name else student_name
+    return "生徒"
+
+
+def _analysis_cache_key(content: str, theme_title: Optional[str], surname: str) -> str:
+    return analysis_cache.make_key(
+        content,
+        theme_title,
+        surname,
+        version=f"{settings.ANALYSIS_BACKEND}:{settings.GEMINI_MODEL}:{PROMPT_VERSION}",
+    )
+
+
+async def _classify_report(
+    content: str,
+    theme_title: Optional[str],
+) -> Optional[Tuple[Optional[str], List[dict]]]:
+    """分析（フェーズと能力の判定）のみを行う。失敗時はNoneを返す."""
+    prompt = ANALYZE_PROMPT.format(
+        content=content,
+        theme=theme_title or "未設定",
+    )
+
+    model = gemini.model()
+
+    try:
+        response = await gemini.call(
+            "analysis",
+            lambda: gemini.generate(model, prompt),
+            key=flight_key(settings.GEMINI_MODEL, prompt),
+        )
+    except Exception as e:
+        logger.warning(f"Analysis timeout or error: {e}")
+        return None
+
+    response_text = (getattr(response, "text", "") or "").strip()
+    try:
+        # JSONをパース
+        result = _load_json_response(response_text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"JSON parse error: {e}, response: {response_text}")
+        return None
+
+    return _parse_analysis_result(result)
+
+
 async def analyze_report_content(
     content: str,
     theme_title: Optional[str] = None,
     student_name: Optional[str] = None,
+    use_cache: bool = True,
+    pipeline: Optional[str] = None,
 ) -> Tuple[Optional[str], List[dict], str]:
     """
     報告内容をAIで分析し、フェーズと能力を提案する。
     その後、RAGを使用して励ましコメントを生成。
+    同じ内容の結果はキャッシュされ、Gemini呼び出しを再利用する。
 
     Args:
         content: 報告内容
         theme_title: 研究テーマ
         student_name: 生徒名（苗字）
+        use_cache: Falseでキャッシュを使わずに再分析
+        pipeline: "two_step"（分析→コメントの2回呼び出し）または "combined"（1回呼び出し）。
+            未指定時は settings.ANALYSIS_PIPELINE
 
     Returns:
         Tuple of (suggested_phase, abilities_list, ai_comment)
     """
-    # If SDK or API key is missing, fall back to heuristics (AI is optional)
-    if genai is None or not settings.GEMINI_API_KEY:
-        return _heuristic_analysis(content)
+    started = time.perf_counter()
+    result, outcome = await _analyze_report_content(content, theme_title, student_name, use_cache, pipeline)
+    metrics.analysis_duration.observe(time.perf_counter() - started, outcome=outcome)
+    return result
 
-    # 生徒名から苗字を抽出（スペースや全角スペースで分割して最初の部分を取得）
-    if student_name:
-        surname = student_name.split()[0] if ' ' in student_name else student_name.split('　')[0] if '　' in student_name else student_name
-    else:
-        surname = "生徒"
 
-    response_text = ""
-    try:
-        client = get_genai_client()
-        if not client:
-            return _heuristic_analysis(content)
+def _offline_fallback(
+    content: str, local: Optional[Tuple[Optional[str], List[dict]]], reason: str
+) -> Tuple[Tuple[Optional[str], List[dict], str], str]:
+    metrics.record_fallback("analysis", reason)
+    return _offline_analysis(content, local), "heuristic_fallback"
 
-        # Step 1: 分析（フェーズと能力の判定）
-        prompt = ANALYZE_PROMPT.format(
-            content=content,
-            theme=theme_title or "未設定",
-        )
 
-        model_name = settings.GEMINI_MODEL or "gemini-2.0-flash"
-        model = genai.GenerativeModel(model_name)  # type: ignore[union-attr]
-        timeout_s = getattr(settings, "GEMINI_TIMEOUT_SECONDS", 8)
+def _ai_outcome(comment: str) -> str:
+    return "comment_fallback" if is_fallback_response(comment) else "ai"
 
-        try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(model.generate_content, prompt),
-                timeout=timeout_s,
-            )
-        except Exception as e:
-            logger.warning(f"Analysis timeout or error: {e}")
-            return _heuristic_analysis(content)
 
-        response_text = (getattr(response, "text", "") or "").strip()
+async def _analyze_report_content(
+    content: str,
+    theme_title: Optional[str],
+    student_name: Optional[str],
+    use_cache: bool,
+    pipeline: Optional[str],
+) -> Tuple[Tuple[Optional[str], List[dict], str], str]:
+    """analyze_report_content の本体。(結果, metrics用のoutcome) を返す。"""
+    local = _local_classification(content)
 
-        # マークダウンのコードブロックを除去
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```json?\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
+    # If SDK or API key is missing, fall back to heuristics (AI is optional)
+    if gemini.legacy_sdk() is None:
+        return _offline_fallback(content, local, "unconfigured")
 
-        # JSONをパース
-        result = json.loads(response_text)
-
-        phase = result.get("phase")
-        abilities: List[dict] = []
-
-        # New format (preferred): 1 strong + 2 sub
-        primary = result.get("primary_ability")
-        subs = result.get("sub_abilities", [])
-        if isinstance(primary, dict) and isinstance(subs, list) and len(subs) >= 2:
-            abilities = [
-                {"name": primary.get("name"), "reason": primary.get("reason"), "role": "strong", "score": STRONG_ABILITY_SCORE},
-                {"name": subs[0].get("name"), "reason": subs[0].get("reason"), "role": "sub", "score": SUB_ABILITY_SCORE},
-                {"name": subs[1].get("name"), "reason": subs[1].get("reason"), "role": "sub", "score": SUB_ABILITY_SCORE},
-            ]
-        else:
-            # Backward-compatible: old format list -> take first 3 deterministically
-            old = result.get("abilities", [])
-            if isinstance(old, list):
-                trimmed = old[:3]
-                for i, ab in enumerate(trimmed):
-                    if not isinstance(ab, dict):
-                        continue
-                    abilities.append({
-                        "name": ab.get("name"),
-                        "reason": ab.get("reason"),
-                        "role": "strong" if i == 0 else "sub",
-                        "score": STRONG_ABILITY_SCORE if i == 0 else SUB_ABILITY_SCORE,
-                    })
+    surname = _extract_surname(student_name)
+
+    cache_key = None
+    if use_cache and settings.ANALYSIS_CACHE_ENABLED:
+        cache_key = _analysis_cache_key(content, theme_title, surname)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached, "cache"
+    started = time.perf_counter()
+
+    if gemini.circuit_open:
+        # Gemini is failing: answer now instead of waiting for timeouts
+        return _offline_fallback(content, local, "circuit_open")
+
+    try:
+        if local is None and (pipeline or settings.ANALYSIS_PIPELINE) == "combined":
+            combined = await _analyze_combined(content, theme_title, surname)
+            if combined is not None:
+                if cache_key and not is_fallback_response(combined[2]):
+                    analysis_cache.set(cache_key, combined, time.perf_counter() - started, gemini_calls=1)
+                return combined, _ai_outcome(combined[2])
+            logger.info("Combined analysis unavailable, falling back to two-step pipeline")
+
+        # Step 1: 分析（フェーズと能力の判定）。ローカル分類器があればGeminiを呼ばない
+        classified = local or await _classify_report(content, theme_title)
+        if classified is None:
+            metrics.record_fallback("analysis", "classify_failed")
+            return _heuristic_analysis(content), "heuristic_fallback"
+        phase, abilities = classified
 
         # Step 2: RAGを使用して励ましコメントを生成
         primary_ability = abilities[0] if abilities else None
@@ -329,14 +735,103 @@ async def analyze_report_content(
             sub_abilities=sub_abilities,
         )
 
-        return phase, abilities, comment
+        # Only cache real AI results (not apology messages from a failed comment call)
+        if cache_key and abilities and not is_fallback_response(comment):
+            analysis_cache.set(
+                cache_key, (phase, abilities, comment), time.perf_counter() - started,
+                gemini_calls=1 if local else 2,
+            )
+
+        return (phase, abilities, comment), _ai_outcome(comment)
 
-    except json.JSONDecodeError as e:
-        logger.warning(f"JSON parse error: {e}, response: {response_text}")
-        return _heuristic_analysis(content)
     except Exception as e:
         logger.exception(f"Error analyzing report: {e}")
-        return _heuristic_analysis(content)
+        return _offline_fallback(content, local, "error")
+
+
+async def stream_report_analysis(
+    content: str,
+    theme_title: Optional[str] = None,
+    student_name: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    analyze_report_content のストリーミング版。(event, data) を順に返す。
+
+    - "heuristic": キーワード判定の結果（即時）
+    - "analysis": Geminiによるフェーズ・能力判定の結果
+    - "comment_delta": 励ましコメントの断片（生成され次第）
+    - "error": コメント生成が途中で失敗した（それまでの断片は破棄し、done の comment を使う）
+    - "done": 最終結果（phase, abilities, comment）
+    """
+    phase, abilities, heuristic_comment = _heuristic_analysis(content)
+    yield "heuristic", {"phase": phase, "abilities": abilities}
+
+    local = _local_classification(content)
+    if local is not None:
+        phase, abilities = local
+        heuristic_comment = _fallback_comment(abilities)
+        yield "analysis", {"phase": phase, "abilities": abilities}
+
+    if gemini.legacy_sdk() is None or gemini.circuit_open:
+        metrics.record_fallback("analysis_stream", "circuit_open" if gemini.circuit_open else "unconfigured")
+        yield "done", {"phase": phase, "abilities": abilities, "comment": heuristic_comment}
+        return
+
+    surname = _extract_surname(student_name)
+    cache_key = _analysis_cache_key(content, theme_title, surname) if settings.ANALYSIS_CACHE_ENABLED else None
+    cached = analysis_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        phase, abilities, comment = cached
+        yield "analysis", {"phase": phase, "abilities": abilities}
+        yield "comment_delta", {"text": comment}
+        yield "done", {"phase": phase, "abilities": abilities, "comment": comment}
+        return
+    started = time.perf_counter()
+
+    if local is None:
+        classified = await _classify_report(content, theme_title)
+        if classified is None or not classified[1]:
+            metrics.record_fallback("analysis_stream", "classify_failed")
+            yield "done", {"phase": phase, "abilities": abilities, "comment": heuristic_comment}
+            return
+        phase, abilities = classified
+        yield "analysis", {"phase": phase, "abilities": abilities}
+
+    primary_ability = abilities[0] if abilities else None
+    user_prompt = _build_comment_prompt(
+        content=content,
+        theme_title=theme_title or "未設定",
+        student_name=surname,
+        phase=phase or "探究活動",
+        primary_ability=primary_ability,
+        sub_abilities=abilities[1:3],
+    )
+
+    chunks: List[str] = []
+    try:
+        async for chunk in stream_rag_response(message=user_prompt, system_prompt=COMMENT_SYSTEM_PROMPT, rag_query=content):
+            chunks.append(chunk)
+            yield "comment_delta", {"text": chunk}
+    except StreamInterrupted as e:
+        # The text so far is truncated: neither cached nor returned as the comment
+        logger.warning(f"Comment stream interrupted: {e}")
+        metrics.record_fallback("analysis_comment", "interrupted")
+        yield "error", {"detail": "コメントの生成が途中で途切れました。"}
+        comment = _short_comment_fallback(surname, phase or "探究活動", primary_ability)
+        yield "done", {"phase": phase, "abilities": abilities, "comment": comment}
+        return
+
+    comment = "".join(chunks).strip()
+    if not comment or len(comment) < 20:
+        metrics.record_fallback("analysis_comment", "empty")
+        comment = _short_comment_fallback(surname, phase or "探究活動", primary_ability)
+    elif cache_key and not is_fallback_response(comment):
+        analysis_cache.set(
+            cache_key, (phase, abilities, comment), time.perf_counter() - started,
+            gemini_calls=1 if local else 2,
+        )
+
+    yield "done", {"phase": phase, "abilities": abilities, "comment": comment}
 
 
 def calculate_badges(
@@ -0,0 +1,116 @@
+"""In-memory memoization of report analysis results keyed by a content hash.
+
+The student app calls POST /reports/analyze for a preview and then POST /reports
+with the same text. When the client does not send the pre-analyzed result back,
+this cache lets the second call reuse the Gemini output instead of paying for it
+twice.
+"""
+
+import copy
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_content(text: Optional[str]) -> str:
+    """NFKC-normalize and collapse whitespace so trivial edits still hit the cache."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class AnalysisCache:
+    """LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, value, elapsed_seconds, gemini_calls)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saved_seconds = 0.0  # Gemini latency avoided by cache hits
+        self.saved_calls = 0  # Gemini calls avoided by cache hits
+
+    @staticmethod
+    def make_key(
+        content: str,
+        theme_title: Optional[str],
+        student_name: Optional[str],
+        version: str,
+    ) -> str:
+        parts = [
+            normalize_content(content),
+            normalize_content(theme_title),
+            normalize_content(student_name),
+            version,
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value, elapsed, calls = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += elapsed
+        self.saved_calls += calls
+        # Callers may mutate the returned lists/dicts
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, elapsed_seconds: float = 0.0, gemini_calls: int = 0) -> None:
+        """Store a result with what producing it cost (counted as saved on every hit)."""
+        self._entries[key] = (
+            time.monotonic() + self.ttl_seconds, copy.deepcopy(value), elapsed_seconds, gemini_calls,
+        )
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            # Calls the cached entries cost (1 combined, 2 two-step, 1 with the local classifier)
+            "gemini_calls_saved": self.saved_calls,
+            "gemini_seconds_saved": round(self.saved_seconds, 3),
+        }
+
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+)
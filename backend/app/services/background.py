@@ -0,0 +1,212 @@
+"""Bounded background worker pool for work that should not block a request,
+and a dedicated thread executor for blocking calls that cannot be made async."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, TypeVar
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BackgroundWorkerPool:
+    """Runs coroutine jobs on the event loop with bounded concurrency.
+
+    - At most ``max_concurrency`` jobs run at the same time.
+    - At most ``max_pending`` jobs (running + waiting) are accepted; ``submit``
+      returns False beyond that so callers can fall back to inline processing.
+    - Jobs may carry a ``key`` (e.g. a report id); ``holds`` tells whether a
+      job with that key is still waiting or running here.
+    - ``drain`` waits for in-flight jobs on shutdown and cancels stragglers.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_pending: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(1, max_pending)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._keys: Dict[asyncio.Task, Hashable] = {}
+        self._closing = False
+
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def has_capacity(self) -> bool:
+        return not self._closing and len(self._tasks) < self.max_pending
+
+    def holds(self, key: Hashable) -> bool:
+        return key in self._keys.values()
+
+    def start(self) -> None:
+        """Accept jobs again (called on application startup)."""
+        self._closing = False
+
+    def submit(self, job: Callable[[], Awaitable[None]], label: str = "", key: Optional[Hashable] = None) -> bool:
+        """Schedule a job. Returns False if the pool is closing or full."""
+        if not self.has_capacity():
+            self.rejected += 1
+            logger.warning(f"[{self.name}] job rejected (pending={self.pending}, closing={self._closing}): {label}")
+            return False
+
+        task = asyncio.create_task(self._run(job, label))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if key is not None:
+            self._keys[task] = key
+            task.add_done_callback(lambda t: self._keys.pop(t, None))
+        self.submitted += 1
+        return True
+
+    async def _run(self, job: Callable[[], Awaitable[None]], label: str) -> None:
+        async with self._semaphore:
+            try:
+                await job()
+                self.completed += 1
+            except asyncio.CancelledError:
+                self.failed += 1
+                logger.warning(f"[{self.name}] job cancelled: {label}")
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"[{self.name}] job failed: {label}: {e}")
+
+    async def drain(self, timeout: float) -> None:
+        """Stop accepting jobs and wait for in-flight ones (cancel after timeout)."""
+        self._closing = True
+        if not self._tasks:
+            return
+
+        logger.info(f"[{self.name}] draining {len(self._tasks)} in-flight job(s)...")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"[{self.name}] cancelling {len(pending)} job(s) after {timeout}s")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+class BlockingExecutor:
+    """Own, fixed-size thread pool for blocking calls (instead of asyncio.to_thread).
+
+    asyncio.to_thread shares the loop's default executor (min(32, cpu + 4)
+    threads) with everything else, so a burst of slow calls starves unrelated
+    work. Jobs here queue behind ``max_workers`` threads of their own, and the
+    queue depth / wait time is visible in ``stats``.
+
+    Note: cancelling the awaiting coroutine (e.g. a timeout) does not stop a job
+    that is already running; it still holds its thread until it returns.
+    """
+
+    def __init__(self, name: str, max_workers: int, window: int = 512):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Updated from worker threads
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._waits = deque(maxlen=window)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on this executor's threads and await the result."""
+        submitted_at = time.monotonic()
+
+        def _job():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._waits.append(time.monotonic() - submitted_at)
+            try:
+                result = fn(*args)
+            except BaseException:
+                with self._lock:
+                    self.running -= 1
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+            return result
+
+        def _dropped(future) -> None:
+            # Never started (cancelled while queued, e.g. shutdown(cancel_futures=True) or
+            # the awaiting coroutine timed out), so _job did not take it off the queue
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        future = self._pool().submit(_job)
+        future.add_done_callback(_dropped)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "queue_wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else None,
+            }
+
+
+# Worker pool for deferred report analysis (POST /reports in deferred mode)
+analysis_pool = BackgroundWorkerPool(
+    name="report-analysis",
+    max_concurrency=settings.ANALYSIS_WORKER_CONCURRENCY,
+    max_pending=settings.ANALYSIS_WORKER_MAX_PENDING,
+)
+metrics.registry.gauge(
+    "analysis_pool_pending", "Deferred report analyses queued or running."
+).set_function(lambda: analysis_pool.pending)
@@ -0,0 +1,517 @@
+"""Bulk ingestion of reports (paper/offline diaries, historical data migration).
+
+Used by POST /reports/bulk and `python -m app.db.import_reports`.
+
+Compared to calling POST /reports once per report:
+- students, themes and master data are resolved up front with a few queries,
+- Report / ReportAbility rows are written with executemany in chunks,
+- StreakRecord and student_stats are recomputed once per student from the report dates,
+- analysis is heuristic-only (no LLM calls) or AI with bounded concurrency.
+
+Record fields (JSON lines / JSON array / CSV header):
+    student_email | student_id   required (one of them)
+    content                      required
+    reported_at                  ISO date or datetime; naive values are JST (default: now)
+    theme_id                     optional (default: the student's theme for that fiscal year)
+    phase                        optional phase name or id (skips phase detection)
+    abilities                    optional ability names, strong first (list, or "|"-separated in CSV)
+    image_url                    optional
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models import (
+    ChangeLog, ChangeOp, Report, ReportAbility, ResearchTheme, StreakRecord, Student, ThemeStatus, User,
+)
+from app.services.analysis import (
+    analyze_report_content, batch_heuristic_analysis, pick_report_abilities, _heuristic_analysis,
+)
+from app.services.master_data import MasterDataSnapshot, get_master_data
+from app.services.student_stats import fiscal_year_of, refresh_student_stats
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+
+SUPPORTED_FORMATS = ("jsonl", "json", "csv")
+ANALYSIS_MODES = ("heuristic", "ai")
+
+# Rows per executemany / IN (...) batch
+_ID_BATCH_SIZE = 500
+
+
+class BulkImportError(ValueError):
+    """The input could not be parsed at all (as opposed to per-row errors)."""
+
+
+@dataclass
+class BulkImportResult:
+    received: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    ai_analyzed: int = 0
+    students: int = 0
+    dry_run: bool = False
+    elapsed_seconds: float = 0.0
+    errors: List[dict] = field(default_factory=list)  # {"row": 1-based index, "error": message}
+
+    @property
+    def reports_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return round(self.inserted / self.elapsed_seconds, 1)
+
+    def add_error(self, row: int, message: str) -> None:
+        self.skipped += 1
+        self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "ai_analyzed": self.ai_analyzed,
+            "students": self.students,
+            "dry_run": self.dry_run,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "reports_per_second": self.reports_per_second,
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class _PreparedRow:
+    row: int
+    student_id: str
+    student_name: Optional[str]
+    theme_id: str
+    theme_title: Optional[str]
+    content: str
+    reported_at: datetime  # naive UTC, like datetime.utcnow()
+    image_url: Optional[str]
+    phase_id: Optional[str]
+    ability_names: List[str]
+    # Filled by analysis
+    detected_abilities: List[dict] = field(default_factory=list)
+    ai_comment: Optional[str] = None
+
+
+# --- Parsing -------------------------------------------------------------------
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    """Pick the input format from an explicit value or the file extension."""
+    if explicit:
+        fmt = explicit.lower().lstrip(".")
+    else:
+        fmt = (filename or "").rsplit(".", 1)[-1].lower() if "." in (filename or "") else "jsonl"
+        if fmt == "ndjson":
+            fmt = "jsonl"
+    if fmt not in SUPPORTED_FORMATS:
+        raise BulkImportError(f"Unsupported format: {fmt} (supported: {', '.join(SUPPORTED_FORMATS)})")
+    return fmt
+
+
+def parse_records(data: Any, fmt: str) -> List[dict]:
+    """Parse JSON lines / JSON array / CSV into a list of dicts."""
+    if isinstance(data, bytes):
+        # utf-8-sig: CSV exported from Excel starts with a BOM
+        data = data.decode("utf-8-sig")
+
+    if fmt == "jsonl":
+        records = []
+        for lineno, line in enumerate(data.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise BulkImportError(f"Invalid JSON on line {lineno}: {e}")
+    elif fmt == "json":
+        try:
+            records = json.loads(data)
+        except json.JSONDecodeError as e:
+            raise BulkImportError(f"Invalid JSON: {e}")
+        if isinstance(records, dict):
+            records = records.get("reports", [])
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        records = [{k.strip(): v for k, v in row.items() if k} for row in reader]
+    else:
+        raise BulkImportError(f"Unsupported format: {fmt}")
+
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise BulkImportError("Expected a list of report objects")
+    return records
+
+
+def _parse_reported_at(value: Any) -> datetime:
+    """Return naive UTC. Date-only values are stored at noon JST so the JST date is preserved."""
+    if value in (None, ""):
+        return datetime.utcnow()
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime.combine(value, dt_time(12, 0))
+    else:
+        text = str(value).strip().replace("/", "-")
+        if len(text) <= 10:
+            dt = datetime.combine(date.fromisoformat(text), dt_time(12, 0))
+        else:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=JST)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_jst_date(utc_naive: datetime) -> date:
+    return utc_naive.replace(tzinfo=timezone.utc).astimezone(JST).date()
+
+
+def _split_abilities(value: Any) -> List[str]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split("|") if v.strip()]
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --- Streaks -------------------------------------------------------------------
+
+
+def compute_streak(report_dates: Iterable[date]) -> Tuple[int, int, Optional[date]]:
+    """Return (current_streak, max_streak, last_report_date) for a set of JST dates.
+
+    Matches update_streak(): current_streak is the run of consecutive days ending
+    at the last report date.
+    """
+    days = sorted(set(report_dates))
+    if not days:
+        return 0, 0, None
+    current = best = 1
+    for prev, day in zip(days, days[1:]):
+        current = current + 1 if (day - prev).days == 1 else 1
+        best = max(best, current)
+    return current, best, days[-1]
+
+
+async def recompute_streaks(db, student_ids: Sequence[str]) -> None:
+    """Rebuild StreakRecord for the given students from all of their reports."""
+    for batch in _chunks(list(student_ids), _ID_BATCH_SIZE):
+        result = await db.execute(
+            select(Report.student_id, Report.reported_at).where(Report.student_id.in_(batch))
+        )
+        dates_by_student: Dict[str, Set[date]] = {}
+        for student_id, reported_at in result.all():
+            dates_by_student.setdefault(str(student_id), set()).add(_to_jst_date(reported_at))
+
+        result = await db.execute(select(StreakRecord).where(StreakRecord.student_id.in_(batch)))
+        streaks = {str(s.student_id): s for s in result.scalars().all()}
+
+        now = datetime.utcnow()
+        for student_id in batch:
+            current, best, last = compute_streak(dates_by_student.get(str(student_id), ()))
+            if last is None:
+                continue
+            streak = streaks.get(str(student_id))
+            if streak is None:
+                db.add(StreakRecord(
+                    student_id=student_id,
+                    current_streak=current,
+                    max_streak=best,
+                    last_report_date=last,
+                    created_at=now,
+                    updated_at=now,
+                ))
+            else:
+                streak.current_streak = current
+                # Keep a longer historical record (e.g. reports deleted since)
+                streak.max_streak = max(streak.max_streak or 0, best)
+                streak.last_report_date = last
+                streak.updated_at = now
+
+
+# --- Import --------------------------------------------------------------------
+
+
+async def _resolve_rows(
+    db,
+    records: List[dict],
+    masters: MasterDataSnapshot,
+    result: BulkImportResult,
+    allowed_student_ids: Optional[Set[str]],
+) -> List[_PreparedRow]:
+    """Validate records and resolve students / themes / phases with batched queries."""
+    emails = {str(r["student_email"]).strip().lower() for r in records if r.get("student_email")}
+    ids = {str(r["student_id"]).strip() for r in records if r.get("student_id")}
+
+    students_by_id: Dict[str, Tuple[str, Optional[str]]] = {}  # student_id -> (student_id, name)
+    students_by_email: Dict[str, Tuple[str, Optional[str]]] = {}
+    for batch in _chunks(sorted(emails), _ID_BATCH_SIZE):
+        rows = await db.execute(
+            select(Student.id, User.email, User.name)
+            .join(User, User.id == Student.user_id)
+            .where(User.email.in_(batch))
+        )
+        for sid, email, name in rows.all():
+            students_by_email[email.lower()] = (str(sid), name)
+    for batch in _chunks(sorted(ids), _ID_BATCH_SIZE):
+        rows = await db.execute(
+            select(Student.id, User.name)
+            .join(User, User.id == Student.user_id)
+            .where(Student.id.in_(batch))
+        )
+        for sid, name in rows.all():
+            students_by_id[str(sid)] = (str(sid), name)
+
+    student_ids = {v[0] for v in students_by_email.values()} | set(students_by_id)
+    themes_by_student: Dict[str, List[ResearchTheme]] = {}
+    for batch in _chunks(sorted(student_ids), _ID_BATCH_SIZE):
+        rows = await db.execute(select(ResearchTheme).where(ResearchTheme.student_id.in_(batch)))
+        for theme in rows.scalars().all():
+            themes_by_student.setdefault(str(theme.student_id), []).append(theme)
+
+    prepared: List[_PreparedRow] = []
+    for idx, record in enumerate(records, 1):
+        content = str(record.get("content") or "").strip()
+        if not content:
+            result.add_error(idx, "content is required")
+            continue
+
+        if record.get("student_id"):
+            student = students_by_id.get(str(record["student_id"]).strip())
+        elif record.get("student_email"):
+            student = students_by_email.get(str(record["student_email"]).strip().lower())
+        else:
+            result.add_error(idx, "student_email or student_id is required")
+            continue
+        if student is None:
+            result.add_error(idx, "Student not found")
+            continue
+        student_id, student_name = student
+        if allowed_student_ids is not None and student_id not in allowed_student_ids:
+            result.add_error(idx, "Student is not assigned to you")
+            continue
+
+        try:
+            reported_at = _parse_reported_at(record.get("reported_at"))
+        except (TypeError, ValueError):
+            result.add_error(idx, f"Invalid reported_at: {record.get('reported_at')}")
+            continue
+
+        themes = themes_by_student.get(student_id, [])
+        if record.get("theme_id"):
+            theme = next((t for t in themes if str(t.id) == str(record["theme_id"]).strip()), None)
+            if theme is None:
+                result.add_error(idx, "Research theme not found or does not belong to the student")
+                continue
+        else:
+            # Theme of the report's fiscal year, else the latest in-progress theme
+            year = fiscal_year_of(reported_at)
+            theme = next((t for t in themes if t.fiscal_year == year), None)
+            if theme is None:
+                ordered = sorted(
+                    themes,
+                    key=lambda t: (t.status == ThemeStatus.IN_PROGRESS, t.fiscal_year),
+                    reverse=True,
+                )
+                theme = ordered[0] if ordered else None
+            if theme is None:
+                result.add_error(idx, "Student has no research theme")
+                continue
+
+        phase_id = None
+        phase_value = str(record.get("phase") or record.get("phase_id") or "").strip()
+        if phase_value:
+            phase = masters.phase_by_name.get(phase_value) or masters.phase_by_id.get(phase_value)
+            if phase is None:
+                result.add_error(idx, f"Research phase not found: {phase_value}")
+                continue
+            phase_id = phase.id
+
+        ability_names = _split_abilities(record.get("abilities"))
+        unknown = [n for n in ability_names if n not in masters.ability_by_name]
+        if unknown:
+            result.add_error(idx, f"Abilities not found: {', '.join(unknown)}")
+            continue
+
+        prepared.append(_PreparedRow(
+            row=idx,
+            student_id=student_id,
+            student_name=student_name,
+            theme_id=str(theme.id),
+            theme_title=theme.title,
+            content=content,
+            reported_at=reported_at,
+            image_url=record.get("image_url") or None,
+            phase_id=phase_id,
+            ability_names=ability_names,
+        ))
+    return prepared
+
+
+async def _analyze_rows(
+    rows: List[_PreparedRow],
+    masters: MasterDataSnapshot,
+    analysis: str,
+    concurrency: int,
+    result: BulkImportResult,
+) -> None:
+    """Fill phase / abilities / comment. Rows with both phase and abilities given are not analyzed."""
+
+    def apply(row: _PreparedRow, suggested_phase: Optional[str], detected: List[dict]) -> None:
+        if row.ability_names:
+            detected = [
+                {"name": name, "role": "strong" if i == 0 else "sub"}
+                for i, name in enumerate(row.ability_names)
+            ]
+        row.detected_abilities = detected
+        if row.phase_id is None and suggested_phase:
+            phase = masters.phase_by_name.get(suggested_phase)
+            row.phase_id = phase.id if phase else None
+
+    pending = []
+    for row in rows:
+        if row.ability_names and row.phase_id:
+            apply(row, None, [])
+        else:
+            pending.append(row)
+
+    if analysis == "heuristic":
+        analyzed = batch_heuristic_analysis(row.content for row in pending)
+        for row, (suggested_phase, detected, _) in zip(pending, analyzed):
+            apply(row, suggested_phase, detected)
+        return
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(row: _PreparedRow) -> None:
+        async with semaphore:
+            try:
+                suggested_phase, detected, comment = await analyze_report_content(
+                    content=row.content,
+                    theme_title=row.theme_title,
+                    student_name=row.student_name,
+                )
+                row.ai_comment = comment
+                result.ai_analyzed += 1
+            except Exception as e:
+                logger.warning(f"Bulk import: AI analysis failed for row {row.row}: {e}")
+                suggested_phase, detected, _ = _heuristic_analysis(row.content)
+            apply(row, suggested_phase, detected)
+
+    await asyncio.gather(*(run(row) for row in pending))
+
+
+async def import_reports(
+    records: List[dict],
+    analysis: str = "heuristic",
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    allowed_student_ids: Optional[Set[str]] = None,
+    dry_run: bool = False,
+) -> BulkImportResult:
+    """Validate, analyze and insert reports. Invalid rows are skipped and reported.
+
+    All valid rows are committed in one transaction (all-or-nothing on DB errors).
+    """
+    if analysis not in ANALYSIS_MODES:
+        raise BulkImportError(f"Unsupported analysis mode: {analysis} (supported: {', '.join(ANALYSIS_MODES)})")
+    chunk_size = max(1, chunk_size or settings.BULK_IMPORT_CHUNK_SIZE)
+    concurrency = concurrency or settings.BULK_IMPORT_AI_CONCURRENCY
+
+    started = time.perf_counter()
+    result = BulkImportResult(received=len(records), dry_run=dry_run)
+
+    async with AsyncSessionLocal() as db:
+        masters = await get_master_data(db)
+        rows = await _resolve_rows(db, records, masters, result, allowed_student_ids)
+
+    # No DB session is held while analyzing (AI mode can take a while)
+    await _analyze_rows(rows, masters, analysis, concurrency, result)
+
+    result.students = len({row.student_id for row in rows})
+    if dry_run or not rows:
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
+
+    report_table = Report.__table__
+    ability_table = ReportAbility.__table__
+    async with AsyncSessionLocal() as db:
+        now = datetime.utcnow()
+        for chunk in _chunks(rows, chunk_size):
+            report_params = []
+            ability_params = []
+            for row in chunk:
+                report_id = str(uuid.uuid4())
+                report_params.append({
+                    "id": report_id,
+                    "student_id": row.student_id,
+                    "theme_id": row.theme_id,
+                    "phase_id": row.phase_id,
+                    "content": row.content,
+                    "image_url": row.image_url,
+                    "ai_comment": row.ai_comment,
+                    "analysis_status": None,
+                    "reported_at": row.reported_at,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+                for ability, role, points in pick_report_abilities(masters, row.detected_abilities):
+                    ability_params.append({
+                        "id": str(uuid.uuid4()),
+                        "report_id": report_id,
+                        "ability_id": ability.id,
+                        "role": role,
+                        "points": points,
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+            # executemany (Core inserts bypass the ORM change capture: log them here)
+            await db.execute(report_table.insert(), report_params)
+            if ability_params:
+                await db.execute(ability_table.insert(), ability_params)
+            await db.execute(
+                ChangeLog.__table__.insert(),
+                [
+                    {
+                        "entity": "report",
+                        "entity_id": params["id"],
+                        "student_id": params["student_id"],
+                        "op": ChangeOp.UPSERT,
+                        "changed_at": now,
+                    }
+                    for params in report_params
+                ],
+            )
+            result.inserted += len(report_params)
+
+        student_ids = sorted({row.student_id for row in rows})
+        await recompute_streaks(db, student_ids)
+        await refresh_student_stats(db, {(row.student_id, fiscal_year_of(row.reported_at)) for row in rows})
+        await db.commit()
+
+    result.elapsed_seconds = time.perf_counter() - started
+    logger.info(
+        f"Bulk import: inserted={result.inserted} skipped={result.skipped} students={result.students} "
+        f"in {result.elapsed_seconds:.2f}s ({result.reports_per_second} reports/s)"
+    )
+    return result
@@ -0,0 +1,374 @@
+"""Local ability / phase classifier (ANALYSIS_BACKEND=local).
+
+Character n-gram TF-IDF features and two softmax (multinomial logistic
+regression) heads, trained from the labels already stored on past reports:
+`reports.phase_id` for the phase and `report_abilities.points` for the
+abilities (strong = 2, sub = 1, used as soft targets). Inference is a sparse
+dot product in NumPy, so classifying a report takes well under a millisecond
+and Gemini is only needed for the comment text.
+
+Train with `python -m app.db.train_classifier`; the model is a single .npz file
+(settings.LOCAL_CLASSIFIER_PATH) loaded at startup.
+"""
+
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# NumPy is optional; without it the local backend is unavailable and analysis falls back.
+try:  # pragma: no cover
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Report, ReportAbility
+from app.services.master_data import get_master_data
+
+logger = logging.getLogger(__name__)
+
+NGRAM_RANGE = (1, 3)
+
+
+@dataclass
+class TrainingRow:
+    content: str
+    phase: Optional[str]
+    ability_points: Dict[str, int] = field(default_factory=dict)  # ability name -> points
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _ngrams(text: str, ngram_range: Tuple[int, int] = NGRAM_RANGE) -> Iterable[str]:
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        for i in range(len(text) - n + 1):
+            yield text[i:i + n]
+
+
+class ReportClassifier:
+    """TF-IDF vectorizer + softmax heads for abilities and phase."""
+
+    def __init__(
+        self,
+        vocabulary: Sequence[str],
+        idf,
+        ability_names: Sequence[str],
+        ability_weights,
+        ability_bias,
+        phase_names: Sequence[str],
+        phase_weights,
+        phase_bias,
+        meta: Optional[dict] = None,
+    ):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.ability_names = list(ability_names)
+        self.ability_weights = ability_weights
+        self.ability_bias = ability_bias
+        self.phase_names = list(phase_names)
+        self.phase_weights = phase_weights
+        self.phase_bias = phase_bias
+        self.meta = meta or {}
+
+    # --- features ---------------------------------------------------------------
+
+    def vectorize(self, content: str):
+        """Sparse L2-normalized TF-IDF vector as (indices, values)."""
+        counts: Dict[int, int] = {}
+        vocabulary = self.vocabulary
+        for gram in _ngrams(_normalize(content)):
+            idx = vocabulary.get(gram)
+            if idx is not None:
+                counts[idx] = counts.get(idx, 0) + 1
+        if not counts:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values = (1.0 + np.log(tf)) * self.idf[indices]
+        values /= np.linalg.norm(values) or 1.0
+        return indices, values
+
+    # --- inference --------------------------------------------------------------
+
+    @staticmethod
+    def _softmax(scores):
+        scores = scores - scores.max()
+        exp = np.exp(scores)
+        return exp / exp.sum()
+
+    def predict_proba(self, content: str):
+        indices, values = self.vectorize(content)
+        ability_scores = values @ self.ability_weights[indices] + self.ability_bias
+        phase_scores = values @ self.phase_weights[indices] + self.phase_bias
+        return self._softmax(ability_scores), self._softmax(phase_scores)
+
+    def predict(self, content: str, top_k: int = 3) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """(phase name, [(ability name, probability), ...] best first)."""
+        ability_proba, phase_proba = self.predict_proba(content)
+        ranked = np.argsort(-ability_proba)[:top_k]
+        abilities = [(self.ability_names[i], float(ability_proba[i])) for i in ranked]
+        phase = self.phase_names[int(np.argmax(phase_proba))] if self.phase_names else None
+        return phase, abilities
+
+    # --- persistence ------------------------------------------------------------
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        # Write then rename so a running app never loads a half-written file
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                vocabulary=np.array(vocabulary, dtype=str),
+                idf=self.idf,
+                ability_names=np.array(self.ability_names, dtype=str),
+                ability_weights=self.ability_weights,
+                ability_bias=self.ability_bias,
+                phase_names=np.array(self.phase_names, dtype=str),
+                phase_weights=self.phase_weights,
+                phase_bias=self.phase_bias,
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "ReportClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                vocabulary=data["vocabulary"].tolist(),
+                idf=data["idf"],
+                ability_names=data["ability_names"].tolist(),
+                ability_weights=data["ability_weights"],
+                ability_bias=data["ability_bias"],
+                phase_names=data["phase_names"].tolist(),
+                phase_weights=data["phase_weights"],
+                phase_bias=data["phase_bias"],
+                meta=json.loads(str(data["meta"])),
+            )
+
+
+# --- Training ----------------------------------------------------------------------
+
+
+async def load_training_rows(db: AsyncSession) -> List[TrainingRow]:
+    """Reports with their stored phase / ability labels (names from master data)."""
+    masters = await get_master_data(db)
+
+    rows: Dict[str, TrainingRow] = {}
+    result = await db.execute(select(Report.id, Report.content, Report.phase_id))
+    for report_id, content, phase_id in result.all():
+        phase = masters.phase_by_id.get(str(phase_id)) if phase_id else None
+        rows[str(report_id)] = TrainingRow(content=content or "", phase=phase.name if phase else None)
+
+    result = await db.execute(select(ReportAbility.report_id, ReportAbility.ability_id, ReportAbility.points))
+    for report_id, ability_id, points in result.all():
+        row = rows.get(str(report_id))
+        ability = masters.ability_by_id.get(str(ability_id))
+        if row is not None and ability is not None:
+            # Rows saved before points existed count as sub
+            row.ability_points[ability.name] = row.ability_points.get(ability.name, 0) + max(int(points or 0), 1)
+
+    return [row for row in rows.values() if row.content and (row.phase or row.ability_points)]
+
+
+def _build_vocabulary(contents: Sequence[str], max_features: int, min_df: int):
+    df: Counter = Counter()
+    for content in contents:
+        df.update(set(_ngrams(_normalize(content))))
+    terms = [term for term, count in df.most_common() if count >= min_df][:max_features]
+    n = len(contents)
+    idf = np.array([math.log((1 + n) / (1 + df[t])) + 1.0 for t in terms], dtype=np.float32)
+    return terms, idf
+
+
+def _fit_softmax(
+    features: List[Tuple["np.ndarray", "np.ndarray"]],
+    targets,
+    n_features: int,
+    epochs: int,
+    learning_rate: float,
+    l2: float,
+    batch_size: int,
+    seed: int,
+):
+    """Mini-batch AdaGrad on the cross-entropy of soft targets (rows sum to 1)."""
+    n_classes = targets.shape[1]
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    g_weights = np.full_like(weights, 1e-8)
+    g_bias = np.full_like(bias, 1e-8)
+    order = list(range(len(features)))
+    rng = random.Random(seed)
+
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            x = np.zeros((len(batch), n_features), dtype=np.float32)
+            for row, i in enumerate(batch):
+                indices, values = features[i]
+                x[row, indices] = values
+            scores = x @ weights + bias
+            scores -= scores.max(axis=1, keepdims=True)
+            proba = np.exp(scores)
+            proba /= proba.sum(axis=1, keepdims=True)
+            error = (proba - targets[batch]) / len(batch)
+
+            grad_w = x.T @ error + l2 * weights
+            grad_b = error.sum(axis=0)
+            g_weights += grad_w ** 2
+            g_bias += grad_b ** 2
+            weights -= learning_rate * grad_w / np.sqrt(g_weights)
+            bias -= learning_rate * grad_b / np.sqrt(g_bias)
+    return weights, bias
+
+
+def train_classifier(
+    rows: Sequence[TrainingRow],
+    ability_names: Sequence[str],
+    phase_names: Sequence[str],
+    max_features: int = 20000,
+    min_df: int = 2,
+    epochs: int = 20,
+    learning_rate: float = 0.5,
+    l2: float = 1e-5,
+    batch_size: int = 128,
+    seed: int = 0,
+) -> ReportClassifier:
+    if np is None:
+        raise RuntimeError("numpy is required to train the local classifier")
+    started = time.perf_counter()
+    ability_index = {name: i for i, name in enumerate(ability_names)}
+    phase_index = {name: i for i, name in enumerate(phase_names)}
+
+    vocabulary, idf = _build_vocabulary([row.content for row in rows], max_features, min_df)
+    model = ReportClassifier(
+        vocabulary, idf,
+        ability_names, np.zeros((len(vocabulary), len(ability_names)), dtype=np.float32),
+        np.zeros(len(ability_names), dtype=np.float32),
+        phase_names, np.zeros((len(vocabulary), len(phase_names)), dtype=np.float32),
+        np.zeros(len(phase_names), dtype=np.float32),
+    )
+    features = [model.vectorize(row.content) for row in rows]
+
+    ability_rows, ability_targets = [], []
+    phase_rows, phase_targets = [], []
+    for i, row in enumerate(rows):
+        points = {ability_index[n]: p for n, p in row.ability_points.items() if n in ability_index}
+        if points:
+            target = np.zeros(len(ability_names), dtype=np.float32)
+            for idx, p in points.items():
+                target[idx] = p
+            ability_rows.append(i)
+            ability_targets.append(target / target.sum())
+        if row.phase in phase_index:
+            target = np.zeros(len(phase_names), dtype=np.float32)
+            target[phase_index[row.phase]] = 1.0
+            phase_rows.append(i)
+            phase_targets.append(target)
+
+    fit = dict(
+        n_features=len(vocabulary), epochs=epochs, learning_rate=learning_rate,
+        l2=l2, batch_size=batch_size, seed=seed,
+    )
+    if ability_rows:
+        model.ability_weights, model.ability_bias = _fit_softmax(
+            [features[i] for i in ability_rows], np.stack(ability_targets), **fit
+        )
+    if phase_rows:
+        model.phase_weights, model.phase_bias = _fit_softmax(
+            [features[i] for i in phase_rows], np.stack(phase_targets), **fit
+        )
+
+    model.meta = {
+        "trained_at": datetime.utcnow().isoformat(),
+        "train_rows": len(rows),
+        "ability_rows": len(ability_rows),
+        "phase_rows": len(phase_rows),
+        "vocabulary_size": len(vocabulary),
+        "ngram_range": list(NGRAM_RANGE),
+        "train_seconds": round(time.perf_counter() - started, 2),
+    }
+    return model
+
+
+def evaluate_classifier(predict, rows: Sequence[TrainingRow]) -> dict:
+    """Accuracy of `predict(content) -> (phase, [ability names best first])` on labeled rows.
+
+    - phase_accuracy: predicted phase == stored phase
+    - strong_accuracy: first ability == the stored strong ability (highest points)
+    - top3_overlap: share of the stored abilities found in the predicted three
+    """
+    phase_total = phase_hits = 0
+    ability_total = strong_hits = 0
+    overlap = 0.0
+    for row in rows:
+        phase, abilities = predict(row.content)
+        if row.phase:
+            phase_total += 1
+            phase_hits += int(phase == row.phase)
+        if row.ability_points:
+            ability_total += 1
+            best = max(row.ability_points.values())
+            strong_hits += int(bool(abilities) and row.ability_points.get(abilities[0]) == best)
+            overlap += len(set(abilities[:3]) & set(row.ability_points)) / min(3, len(row.ability_points))
+    return {
+        "rows": len(rows),
+        "phase_accuracy": round(phase_hits / phase_total, 4) if phase_total else None,
+        "strong_accuracy": round(strong_hits / ability_total, 4) if ability_total else None,
+        "top3_overlap": round(overlap / ability_total, 4) if ability_total else None,
+    }
+
+
+# --- Loaded model ------------------------------------------------------------------
+
+
+class LocalClassifierRegistry:
+    """The model from settings.LOCAL_CLASSIFIER_PATH, loaded once (reload() after retraining)."""
+
+    def __init__(self):
+        self._model: Optional[ReportClassifier] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[ReportClassifier]:
+        if not self._loaded:
+            self.reload()
+        return self._model
+
+    def reload(self, path: Optional[str] = None) -> Optional[ReportClassifier]:
+        with self._lock:
+            path = Path(path or settings.LOCAL_CLASSIFIER_PATH)
+            model = None
+            if np is None:
+                logger.warning("numpy is not installed; local classifier unavailable")
+            elif not path.exists():
+                logger.warning(f"Local classifier model not found at {path} (run python -m app.db.train_classifier)")
+            else:
+                try:
+                    model = ReportClassifier.load(path)
+                    logger.info(f"Local classifier loaded from {path} ({model.meta.get('trained_at')})")
+                except Exception as e:
+                    logger.error(f"Failed to load local classifier from {path}: {e}")
+            self._model = model
+            self._loaded = True
+            return model
+
+
+local_classifier = LocalClassifierRegistry()
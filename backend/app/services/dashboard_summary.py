@@ -0,0 +1,177 @@
+"""Teacher dashboard student list in a single SQL statement (DASHBOARD_SUMMARY_QUERY=single).
+
+The default ("batched") implementation in endpoints/dashboard.py runs one query
+per table (relations, students + user / seminar lab, themes, student_stats,
+streaks) and ranks top abilities in Python. This one lets the database do all
+of it with CTEs and window functions and returns plain rows:
+
+- rel: the teacher's active assignments of the year (scope = all students if none)
+- stats: student_stats summed across years; ROW_NUMBER over years picks the latest phase
+- scope: students in scope with ROW_NUMBER by report count (the 5 lowest get alert_level 1,
+  ranked across the whole scope even when paging)
+- page: keyset page of scope by (created_at, id), same cursor as the batched version
+- top_abilities: report_abilities counts of the page's students, ROW_NUMBER per student
+  (ties by display order), pivoted into three columns
+
+Requires window functions (MySQL 8 / SQLite 3.25+).
+"""
+
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import Select, and_, case, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import apply_keyset
+from app.models import (
+    Ability, Report, ReportAbility, ResearchPhase, ResearchTheme, SeminarLab,
+    StreakRecord, Student, StudentStats, StudentTeacher, User,
+)
+
+TOP_ABILITIES = 3
+ALERT_LOWEST = 5
+
+
+def students_summary_statement(
+    teacher_id: str,
+    fiscal_year: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Select, Sequence]:
+    """(statement, keyset keys) for the teacher's student summaries; one row per student."""
+    rel = (
+        select(
+            StudentTeacher.student_id,
+            func.max(case((StudentTeacher.is_primary == True, 1), else_=0)).label("is_primary"),
+        )
+        .where(
+            StudentTeacher.teacher_id == teacher_id,
+            StudentTeacher.fiscal_year == fiscal_year,
+            StudentTeacher.is_active == True,
+        )
+        .group_by(StudentTeacher.student_id)
+        .cte("rel")
+    )
+
+    def in_scope(student_id):
+        # Teachers without assignments see every student
+        return or_(student_id.in_(select(rel.c.student_id)), ~exists(select(rel.c.student_id)))
+
+    stats = (
+        select(
+            StudentStats.student_id,
+            StudentStats.latest_phase_id,
+            func.sum(StudentStats.report_count).over(partition_by=StudentStats.student_id).label("report_count"),
+            func.row_number().over(
+                partition_by=StudentStats.student_id,
+                order_by=StudentStats.latest_report_at.desc(),
+            ).label("rn"),
+        )
+        .where(in_scope(StudentStats.student_id))
+        .cte("stats")
+    )
+
+    report_count = func.coalesce(stats.c.report_count, 0)
+    scope = (
+        select(
+            Student.id,
+            Student.created_at,
+            Student.user_id,
+            Student.grade,
+            Student.class_name,
+            Student.seminar_lab_id,
+            report_count.label("report_count"),
+            stats.c.latest_phase_id,
+            func.row_number().over(order_by=(report_count, Student.created_at, Student.id)).label("report_rank"),
+        )
+        .join(User, User.id == Student.user_id)
+        .outerjoin(stats, and_(stats.c.student_id == Student.id, stats.c.rn == 1))
+        .where(in_scope(Student.id))
+        .cte("scope")
+    )
+
+    keys = (scope.c.created_at, scope.c.id)
+    page = apply_keyset(select(scope), keys, cursor, limit, descending=False).cte("page")
+
+    ability_counts = (
+        select(Report.student_id, ReportAbility.ability_id, func.count().label("n"))
+        .join(ReportAbility, ReportAbility.report_id == Report.id)
+        .where(Report.student_id.in_(select(page.c.id)))
+        .group_by(Report.student_id, ReportAbility.ability_id)
+        .cte("ability_counts")
+    )
+    ability_ranked = (
+        select(
+            ability_counts.c.student_id,
+            Ability.name,
+            func.row_number().over(
+                partition_by=ability_counts.c.student_id,
+                order_by=(ability_counts.c.n.desc(), Ability.display_order),
+            ).label("rn"),
+        )
+        .join(Ability, Ability.id == ability_counts.c.ability_id)
+        .cte("ability_ranked")
+    )
+    top_abilities = (
+        select(
+            ability_ranked.c.student_id,
+            *[
+                func.max(case((ability_ranked.c.rn == i, ability_ranked.c.name))).label(f"ability_{i}")
+                for i in range(1, TOP_ABILITIES + 1)
+            ],
+        )
+        .where(ability_ranked.c.rn <= TOP_ABILITIES)
+        .group_by(ability_ranked.c.student_id)
+        .cte("top_abilities")
+    )
+
+    statement = (
+        select(
+            page.c.id,
+            page.c.created_at,
+            page.c.user_id,
+            User.name,
+            User.email,
+            page.c.grade,
+            page.c.class_name,
+            ResearchTheme.title.label("theme_title"),
+            ResearchPhase.name.label("current_phase"),
+            page.c.report_count,
+            StreakRecord.current_streak,
+            StreakRecord.max_streak,
+            StreakRecord.last_report_date,
+            rel.c.is_primary,
+            page.c.seminar_lab_id,
+            SeminarLab.name.label("seminar_lab_name"),
+            (page.c.report_rank <= ALERT_LOWEST).label("alert"),
+            *[top_abilities.c[f"ability_{i}"] for i in range(1, TOP_ABILITIES + 1)],
+        )
+        .select_from(page)
+        .join(User, User.id == page.c.user_id)
+        .outerjoin(ResearchTheme, and_(ResearchTheme.student_id == page.c.id, ResearchTheme.fiscal_year == fiscal_year))
+        .outerjoin(ResearchPhase, ResearchPhase.id == page.c.latest_phase_id)
+        .outerjoin(StreakRecord, StreakRecord.student_id == page.c.id)
+        .outerjoin(SeminarLab, SeminarLab.id == page.c.seminar_lab_id)
+        .outerjoin(rel, rel.c.student_id == page.c.id)
+        .outerjoin(top_abilities, top_abilities.c.student_id == page.c.id)
+        .order_by(page.c.created_at, page.c.id)
+    )
+    return statement, keys
+
+
+async def fetch_students_summary_rows(
+    db: AsyncSession,
+    teacher_id: str,
+    fiscal_year: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Tuple[list, Sequence]:
+    """Rows of students_summary_statement (limit + 1 rows when paging; trim with page_result)."""
+    statement, keys = students_summary_statement(teacher_id, fiscal_year, cursor, limit)
+    result = await db.execute(statement)
+    return result.all(), keys
+
+
+def top_ability_names(row) -> list:
+    """Top ability names of a row (fewer than three if the student used fewer)."""
+    names = (getattr(row, f"ability_{i}") for i in range(1, TOP_ABILITIES + 1))
+    return [name for name in names if name]
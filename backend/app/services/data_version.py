@@ -0,0 +1,98 @@
+"""Cheap data-version fingerprints for conditional GET (app/core/etag.py).
+
+Each function returns a tuple that changes whenever the response of the
+corresponding endpoint can change, read with one or two aggregate queries
+instead of the endpoint's own queries:
+
+- change_log (count, max id) of the students in scope and of master data:
+  reports (including their abilities), themes, streaks, abilities and phases,
+  deletes included. The count catches an id committed out of order
+  (see SYNC_CURSOR_OVERLAP).
+- student_stats (count, max updated_at): rollup refreshes and rebuilds.
+- (count, max updated_at) of tables that change_log does not track:
+  student_teachers, students, users and seminar_labs.
+
+Writes that bypass the ORM must append change_log rows (bulk_import does);
+data from python -m app.db.generate_synthetic is picked up through students /
+student_stats.
+"""
+
+from typing import Optional, Tuple
+
+from sqlalchemy import Select, case, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import ChangeLog, SeminarLab, Student, StudentStats, StudentTeacher, User
+
+
+async def _fetch(db: AsyncSession, *queries: Select) -> tuple:
+    """Single-row aggregate queries in one round trip (cross join of their subqueries)."""
+    subqueries = [q.subquery() for q in queries]
+    statement = select(*[column for sq in subqueries for column in sq.c]).select_from(subqueries[0])
+    for sq in subqueries[1:]:
+        statement = statement.join(sq, true())
+    return tuple((await db.execute(statement)).one())
+
+
+def _master_changes() -> Select:
+    return select(func.count(ChangeLog.id), func.max(ChangeLog.id)).where(ChangeLog.student_id.is_(None))
+
+
+async def student_version(db: AsyncSession, student_id: str) -> Tuple:
+    """Version of one student's reports, rollup, streak and theme (GET /reports/summary)."""
+    return await _fetch(
+        db,
+        select(func.count(ChangeLog.id), func.max(ChangeLog.id)).where(ChangeLog.student_id == student_id),
+        select(func.count(StudentStats.id), func.max(StudentStats.updated_at)).where(StudentStats.student_id == student_id),
+        _master_changes(),
+    )
+
+
+async def teacher_scope_version(db: AsyncSession, teacher_id: str, fiscal_year: int) -> Tuple:
+    """Version of everything the teacher dashboard lists (GET /dashboard/students, /dashboard/scatter-data).
+
+    Same scope as the dashboard: the teacher's active assignments of the year,
+    or every student when there are none.
+    """
+    relations = (
+        await db.execute(
+            select(
+                func.count(StudentTeacher.id),
+                func.max(StudentTeacher.updated_at),
+                func.coalesce(func.sum(case((StudentTeacher.is_active == True, 1), else_=0)), 0),
+            ).where(StudentTeacher.teacher_id == teacher_id, StudentTeacher.fiscal_year == fiscal_year)
+        )
+    ).one()
+
+    scope: Optional[Select] = None
+    if relations[2]:
+        scope = select(StudentTeacher.student_id).where(
+            StudentTeacher.teacher_id == teacher_id,
+            StudentTeacher.fiscal_year == fiscal_year,
+            StudentTeacher.is_active == True,
+        )
+
+    students = select(func.count(Student.id), func.max(Student.updated_at), func.max(User.updated_at)).join(
+        User, User.id == Student.user_id
+    )
+    stats = select(func.count(StudentStats.id), func.max(StudentStats.updated_at))
+    if scope is not None:
+        students = students.where(Student.id.in_(scope))
+        stats = stats.where(StudentStats.student_id.in_(scope))
+        changes = select(func.count(ChangeLog.id), func.max(ChangeLog.id)).where(ChangeLog.student_id.in_(scope))
+    else:
+        # Everyone is in scope: the newest ids (a full count would scan the whole log)
+        head = select(func.max(ChangeLog.id)).scalar_subquery()
+        changes = select(func.count(ChangeLog.id), func.max(ChangeLog.id)).where(
+            ChangeLog.id > func.coalesce(head, 0) - settings.SYNC_CURSOR_OVERLAP
+        )
+
+    return tuple(relations) + await _fetch(
+        db,
+        students,
+        stats,
+        changes,
+        _master_changes(),
+        select(func.count(SeminarLab.id), func.max(SeminarLab.updated_at)),
+    )
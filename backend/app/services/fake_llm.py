@@ -0,0 +1,165 @@
+"""Offline stand-in for the Gemini SDK (LLM_BACKEND=fake) for load tests and local runs.
+
+Implements the small part of the google-generativeai surface the app uses
+(`GenerativeModel(...)`, `generate_content_async`, `generate_content`,
+`stream=True`), so every AI path runs through the gateway unchanged: rate
+limit, retries, circuit breaker, single-flight and fallbacks included.
+
+- Latency is lognormal around FAKE_LLM_LATENCY_MS (spread FAKE_LLM_LATENCY_SIGMA).
+- FAKE_LLM_ERROR_RATE of calls raise a 503 (transient: retried by the gateway).
+- FAKE_LLM_TIMEOUT_RATE of calls never answer (they hit GEMINI_TIMEOUT_SECONDS).
+- Analysis prompts get valid ANALYZE_PROMPT / COMBINED_ANALYZE_PROMPT JSON with
+  abilities and phase chosen deterministically from the prompt, other prompts
+  a short Japanese comment.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_rng = random.Random()
+
+_ABILITY_LINE = re.compile(r"^\d+\. (.+?)：", re.MULTILINE)
+_PHASE_SECTION = re.compile(r"## 4つの探究フェーズ\n((?:\d+\. .+\n?)+)")
+
+COMMENTS = [
+    "{name}、今日の取り組みからしっかり前に進んでいることが伝わってきました。",
+    "小さな一歩を積み重ねる姿勢がとても素敵です。",
+    "気づいたことを言葉にできているのは大きな成長ですね。",
+    "次はその発見を誰かに話してみると、さらに視野が広がりそうです。",
+    "この調子で、自分のペースで探究を続けていきましょう。",
+]
+
+
+class FakeServiceUnavailable(Exception):
+    """Mimics the SDK's 503 error (is_transient -> retried)."""
+
+    code = 503
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeStream:
+    """Async-iterable response of generate_content_async(..., stream=True)."""
+
+    def __init__(self, chunks: List[str], delay: float):
+        self._chunks = chunks
+        self._delay = delay
+
+    async def __aiter__(self) -> AsyncIterator[FakeResponse]:
+        for chunk in self._chunks:
+            await asyncio.sleep(self._delay)
+            yield FakeResponse(chunk)
+
+
+def sample_latency() -> float:
+    """Seconds for one call (lognormal with median FAKE_LLM_LATENCY_MS)."""
+    median = max(0.0, settings.FAKE_LLM_LATENCY_MS) / 1000
+    sigma = max(0.0, settings.FAKE_LLM_LATENCY_SIGMA)
+    if median == 0 or sigma == 0:
+        return median
+    return median * math.exp(_rng.gauss(0, sigma))
+
+
+def _outcome() -> str:
+    roll = _rng.random()
+    if roll < settings.FAKE_LLM_ERROR_RATE:
+        return "error"
+    if roll < settings.FAKE_LLM_ERROR_RATE + settings.FAKE_LLM_TIMEOUT_RATE:
+        return "timeout"
+    return "ok"
+
+
+def _pick(options: List[str], seed: bytes, count: int) -> List[str]:
+    # Same prompt -> same answer, like a temperature-0 model
+    ordered = sorted(options, key=lambda o: hashlib.blake2b(seed + o.encode("utf-8"), digest_size=8).digest())
+    return ordered[:count]
+
+
+def _comment(prompt: str) -> str:
+    name = re.search(r"【生徒名】(.+?)さん", prompt)
+    seed = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+    sentences = _pick(COMMENTS, seed, 3)
+    return "".join(sentences).format(name=f"{name.group(1)}さん" if name else "あなた")
+
+
+def fake_reply(prompt: str) -> str:
+    """Response text for a prompt (JSON for analysis prompts)."""
+    if '"primary_ability"' not in prompt:
+        return _comment(prompt)
+
+    seed = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+    abilities = _ABILITY_LINE.findall(prompt.split("## 4つの探究フェーズ")[0]) or ["実行する力", "対話する力", "完遂する力"]
+    phases_section = _PHASE_SECTION.search(prompt)
+    phases = re.findall(r"^\d+\. (.+)$", phases_section.group(1), re.MULTILINE) if phases_section else ["情報の収集"]
+
+    primary, *subs = _pick(abilities, seed, 3)
+    result = {
+        "phase": _pick(phases, seed, 1)[0],
+        "primary_ability": {"name": primary, "reason": "報告の中心となる行動に表れています"},
+        "sub_abilities": [{"name": name, "reason": "報告の一部に表れています"} for name in subs],
+    }
+    if '"comment"' in prompt:
+        result["comment"] = _comment(prompt)
+    return json.dumps(result, ensure_ascii=False)
+
+
+def _chunks(text: str) -> List[str]:
+    parts = [p for p in re.split(r"(?<=[。！？])", text) if p]
+    return parts or [text]
+
+
+class GenerativeModel:
+    def __init__(
+        self,
+        model_name: str = "fake",
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[dict] = None,
+        **kwargs: Any,
+    ):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.generation_config = generation_config
+
+    async def generate_content_async(self, contents: Any, stream: bool = False):
+        latency = sample_latency()
+        outcome = _outcome()
+        if outcome == "timeout":
+            # Never answers: the gateway's wait_for gives up
+            await asyncio.sleep(settings.GEMINI_TIMEOUT_SECONDS * 10)
+        if stream:
+            chunks = _chunks(fake_reply(str(contents)))
+            if outcome == "error":
+                await asyncio.sleep(latency)
+                raise FakeServiceUnavailable("503 fake backend unavailable")
+            return _FakeStream(chunks, latency / len(chunks))
+        await asyncio.sleep(latency)
+        if outcome == "error":
+            raise FakeServiceUnavailable("503 fake backend unavailable")
+        return FakeResponse(fake_reply(str(contents)))
+
+    def generate_content(self, contents: Any):
+        outcome = _outcome()
+        if outcome == "timeout":
+            time.sleep(settings.GEMINI_TIMEOUT_SECONDS * 2)
+        time.sleep(sample_latency())
+        if outcome == "error":
+            raise FakeServiceUnavailable("503 fake backend unavailable")
+        return FakeResponse(fake_reply(str(contents)))
+
+
+def configure(**kwargs: Any) -> None:
+    """No-op (google.generativeai.configure)."""
@@ -0,0 +1,531 @@
+"""Single gateway for every Gemini call (analysis, comments, chat, teacher advice).
+
+- Owns the SDK clients: the google-genai `Client` and the configured legacy
+  google-generativeai module (previously three separate singletons).
+- Token bucket sized to the API quota (GEMINI_RATE_LIMIT_PER_MINUTE / _BURST).
+  A call that would wait longer than GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS for a
+  token fails fast instead.
+- Retries transient errors (429 / 5xx / timeouts) with full-jitter exponential
+  backoff, within the overall GEMINI_TIMEOUT_SECONDS budget of the call.
+- Circuit breaker: after GEMINI_BREAKER_FAILURE_THRESHOLD consecutive failures,
+  calls raise GeminiUnavailable immediately for GEMINI_BREAKER_RESET_SECONDS so
+  callers fall back (e.g. to _heuristic_analysis) without waiting for timeouts.
+  After that one probe call is let through to decide whether to close again.
+- Reuses GenerativeModel instances per (model, system_instruction, config) and
+  calls the SDKs' native async APIs; a sync-only SDK falls back to a dedicated
+  GEMINI_EXECUTOR_WORKERS thread pool, never the loop's default executor.
+- Single-flight: concurrent calls with the same key (a hash of the fully
+  rendered prompt) share one in-flight request instead of each calling Gemini.
+- LLM_BACKEND=fake swaps the SDK for app/services/fake_llm.py (no API key or
+  quota needed) so load tests exercise all of the above offline.
+- Per-operation latency / outcome / coalesced counters (GET /admin/ai-stats),
+  also exported as the ai_call_duration_seconds histogram (GET /metrics).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core import metrics
+from app.core.config import settings
+from app.services.background import BlockingExecutor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "ServerError", "GatewayTimeout",
+}
+_TRANSIENT_MESSAGES = ("429", "503", "quota", "rate limit", "unavailable", "deadline exceeded", "overloaded")
+
+
+class GeminiUnavailable(Exception):
+    """Raised without calling Gemini (not configured, circuit open or rate limited)."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None)
+    if isinstance(code, int) and code in _TRANSIENT_STATUS:
+        return True
+    if type(exc).__name__ in _TRANSIENT_ERRORS:
+        return True
+    message = str(exc).lower()
+    return any(m in message for m in _TRANSIENT_MESSAGES)
+
+
+def fallback_reason(exc: BaseException) -> str:
+    """ai_fallbacks_total reason label for an error that made a caller fall back."""
+    if isinstance(exc, GeminiUnavailable):
+        return "unavailable"
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    return "error"
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` tokens per minute up to `burst`; one token per call."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait: float) -> None:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return
+        wait = (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            raise GeminiUnavailable(f"rate limited (next token in {wait:.1f}s)")
+        # Reserve the token now so later callers queue behind this one
+        self.tokens -= 1
+        await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (callers can skip straight to their fallback)."""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.reset_seconds
+        return self.state == self.HALF_OPEN and self.probe_in_flight
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def release(self) -> None:
+        """The admitted call ended without telling us anything about Gemini's health."""
+        self.probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Gemini circuit closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    f"Gemini circuit opened after {self.consecutive_failures} consecutive failures; "
+                    f"failing fast for {self.reset_seconds}s"
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def flight_key(*parts: Any) -> str:
+    """Single-flight key for a call: hash of everything that determines its output."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key.
+
+    The call runs as its own task, so a caller that goes away (client
+    disconnect) does not cancel it for the others. The key is forgotten as soon
+    as the call finishes: this coalesces, it does not cache.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    def is_inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run the call for `key`, or wait for the one already in flight."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+
+class OperationStats:
+    """Outcome counters and recent latencies of one kind of call."""
+
+    def __init__(self, window: int = 512):
+        self.calls = 0
+        self.ok = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.rejected_circuit = 0
+        self.rejected_rate = 0
+        self.coalesced = 0
+        self._latencies = deque(maxlen=window)
+
+    def record(self, outcome: str, seconds: float) -> None:
+        if outcome == "ok":
+            self.ok += 1
+        elif outcome == "timeout":
+            self.timeouts += 1
+        else:
+            self.failed += 1
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "ok": self.ok,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "rejected_circuit": self.rejected_circuit,
+            "rejected_rate": self.rejected_rate,
+            "coalesced": self.coalesced,
+            "latency_p50_ms": pct(0.5),
+            "latency_p95_ms": pct(0.95),
+            "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+
+
+class GeminiGateway:
+    def __init__(self):
+        self.bucket = TokenBucket(settings.GEMINI_RATE_LIMIT_PER_MINUTE, settings.GEMINI_RATE_LIMIT_BURST)
+        self.breaker = CircuitBreaker(settings.GEMINI_BREAKER_FAILURE_THRESHOLD, settings.GEMINI_BREAKER_RESET_SECONDS)
+        self.operations: Dict[str, OperationStats] = {}
+        self._legacy_sdk: Any = None
+        self._legacy_checked = False
+        self._client: Any = None
+        self._client_checked = False
+        # LRU of legacy GenerativeModel instances
+        self._models: "OrderedDict[tuple, Any]" = OrderedDict()
+        self.model_cache_hits = 0
+        self.model_cache_misses = 0
+        self.executor = BlockingExecutor("gemini-sdk", settings.GEMINI_EXECUTOR_WORKERS)
+        self.flights = SingleFlight()
+
+    # --- SDK clients ------------------------------------------------------------
+
+    @property
+    def configured(self) -> bool:
+        """An API key is set and at least one SDK is importable (always true for the fake backend)."""
+        if self.fake:
+            return True
+        return bool(settings.GEMINI_API_KEY) and (self.client() is not None or self.legacy_sdk() is not None)
+
+    @property
+    def fake(self) -> bool:
+        return settings.LLM_BACKEND == "fake"
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.breaker.is_open
+
+    def available(self) -> bool:
+        """Worth calling right now (configured and the circuit is not open)."""
+        return self.configured and not self.circuit_open
+
+    def legacy_sdk(self):
+        """The configured google-generativeai module (or the fake backend), or None."""
+        if not self._legacy_checked:
+            self._legacy_checked = True
+            if self.fake:
+                from app.services import fake_llm
+                self._legacy_sdk = fake_llm
+                logger.warning("LLM_BACKEND=fake: AI responses come from the offline stand-in")
+            elif settings.GEMINI_API_KEY:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=settings.GEMINI_API_KEY)
+                    self._legacy_sdk = genai
+                    logger.info("Legacy google-generativeai configured successfully")
+                except ImportError:
+                    logger.warning("google-generativeai not installed")
+                except Exception as e:
+                    logger.error(f"Failed to configure legacy google-generativeai: {e}")
+        return self._legacy_sdk
+
+    def client(self):
+        """The google-genai Client, or None (also with the fake backend: callers use legacy_sdk)."""
+        if not self._client_checked:
+            self._client_checked = True
+            if self.fake:
+                pass
+            elif not settings.GEMINI_API_KEY:
+                logger.warning("GEMINI_API_KEY not configured, Gemini calls disabled")
+            else:
+                try:
+                    from google import genai
+                    self._client = genai.Client(api_key=settings.GEMINI_API_KEY)
+                    logger.info("Google GenAI client configured successfully")
+                except ImportError:
+                    logger.info("google-genai package not installed, using google-generativeai fallback")
+                except Exception as e:
+                    logger.error(f"Failed to configure Google GenAI client: {e}")
+        return self._client
+
+    def model(
+        self,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[dict] = None,
+        cache: bool = True,
+    ):
+        """A legacy GenerativeModel, reused across requests (None without the SDK).
+
+        Pass cache=False for one-off system instructions (e.g. with retrieved
+        passages) so they do not evict the shared instances.
+        """
+        genai = self.legacy_sdk()
+        if genai is None:
+            return None
+        model_name = model_name or settings.GEMINI_MODEL or "gemini-2.0-flash"
+        key = (
+            model_name,
+            system_instruction,
+            json.dumps(generation_config, sort_keys=True) if generation_config else None,
+        )
+        model = self._models.get(key)
+        if model is not None:
+            self.model_cache_hits += 1
+            self._models.move_to_end(key)
+            return model
+
+        self.model_cache_misses += 1
+        kwargs: Dict[str, Any] = {}
+        if system_instruction:
+            kwargs["system_instruction"] = system_instruction
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        model = genai.GenerativeModel(model_name, **kwargs)
+        if cache:
+            self._models[key] = model
+            while len(self._models) > max(1, settings.GEMINI_MODEL_CACHE_SIZE):
+                self._models.popitem(last=False)
+        return model
+
+    def generate(self, model, prompt: Any) -> Awaitable[Any]:
+        """model.generate_content as an awaitable (native async, executor only if the SDK has none)."""
+        generate_async = getattr(model, "generate_content_async", None)
+        if generate_async is not None:
+            return generate_async(prompt)
+        return self.executor.run(model.generate_content, prompt)
+
+    # --- Calls ------------------------------------------------------------------
+
+    def _stats(self, operation: str) -> OperationStats:
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats()
+        return stats
+
+    @staticmethod
+    def _record(operation: str, stats: OperationStats, outcome: str, started: float) -> None:
+        seconds = time.monotonic() - started
+        stats.record(outcome, seconds)
+        metrics.ai_call_duration.observe(seconds, operation=operation, outcome="error" if outcome == "failed" else outcome)
+
+    async def _admit(self, operation: str, stats: OperationStats, deadline: float) -> None:
+        stats.calls += 1
+        started = time.monotonic()
+        if not self.breaker.allow():
+            stats.rejected_circuit += 1
+            metrics.ai_call_duration.observe(0.0, operation=operation, outcome="rejected_circuit")
+            raise GeminiUnavailable(f"{operation}: circuit open")
+        max_wait = min(settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS, deadline - time.monotonic())
+        try:
+            await self.bucket.acquire(max_wait)
+        except BaseException:
+            stats.rejected_rate += 1
+            metrics.ai_call_duration.observe(time.monotonic() - started, operation=operation, outcome="rejected_rate")
+            self.breaker.release()
+            raise
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        cap = min(settings.GEMINI_RETRY_MAX_SECONDS, settings.GEMINI_RETRY_BASE_SECONDS * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    async def call(
+        self,
+        operation: str,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+    ) -> T:
+        """Run `fn()` (a fresh awaitable per attempt) under the limiter, retries and breaker.
+
+        With a `key` (see flight_key), concurrent calls with the same key share
+        one request and all get its result or error.
+
+        Raises GeminiUnavailable if the call was not attempted, otherwise the
+        last error once retries or the `timeout` budget are exhausted.
+        """
+        if key is None:
+            return await self._call(operation, fn, timeout)
+        flight = f"{operation}:{key}"
+        if self.flights.is_inflight(flight):
+            self._stats(operation).coalesced += 1
+        return await self.flights.do(flight, lambda: self._call(operation, fn, timeout))
+
+    async def _call(
+        self,
+        operation: str,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float],
+    ) -> T:
+        stats = self._stats(operation)
+        started = time.monotonic()
+        deadline = started + (timeout or settings.GEMINI_TIMEOUT_SECONDS)
+        await self._admit(operation, stats, deadline)
+
+        attempt = 0
+        try:
+            while True:
+                try:
+                    result = await asyncio.wait_for(fn(), timeout=max(0.001, deadline - time.monotonic()))
+                except Exception as exc:
+                    attempt += 1
+                    delay = self._backoff(attempt)
+                    if (
+                        attempt <= settings.GEMINI_MAX_RETRIES
+                        and is_transient(exc)
+                        and time.monotonic() + delay < deadline
+                    ):
+                        stats.retries += 1
+                        logger.info(f"Gemini {operation} failed ({type(exc).__name__}: {exc}); retry {attempt} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                    self.breaker.record_failure()
+                    timed_out = isinstance(exc, (asyncio.TimeoutError, TimeoutError))
+                    self._record(operation, stats, "timeout" if timed_out else "failed", started)
+                    raise
+                self.breaker.record_success()
+                self._record(operation, stats, "ok", started)
+                return result
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.release()
+            raise
+
+    @asynccontextmanager
+    async def stream(self, operation: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Admission and outcome tracking for a streaming call (no retries once it started)."""
+        stats = self._stats(operation)
+        started = time.monotonic()
+        await self._admit(operation, stats, started + (timeout or settings.GEMINI_TIMEOUT_SECONDS))
+        try:
+            yield
+        except Exception as exc:
+            self.breaker.record_failure()
+            timed_out = isinstance(exc, (asyncio.TimeoutError, TimeoutError))
+            self._record(operation, stats, "timeout" if timed_out else "failed", started)
+            raise
+        except BaseException:
+            # Client went away mid-stream
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        self._record(operation, stats, "ok", started)
+
+    def stats(self) -> dict:
+        return {
+            "backend": settings.LLM_BACKEND,
+            "circuit": {
+                "state": self.breaker.state,
+                "open": self.breaker.is_open,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "times_opened": self.breaker.times_opened,
+            },
+            "rate_limit": {
+                "per_minute": settings.GEMINI_RATE_LIMIT_PER_MINUTE,
+                "burst": self.bucket.capacity,
+                "tokens": round(self.bucket.tokens, 2),
+            },
+            "model_cache": {
+                "size": len(self._models),
+                "max_size": settings.GEMINI_MODEL_CACHE_SIZE,
+                "hits": self.model_cache_hits,
+                "misses": self.model_cache_misses,
+            },
+            "executor": self.executor.stats(),
+            "single_flight": {
+                "inflight": self.flights.inflight,
+                "leaders": self.flights.leaders,
+                "coalesced": self.flights.coalesced,
+            },
+            "operations": {name: s.snapshot() for name, s in sorted(self.operations.items())},
+        }
+
+
+gemini = GeminiGateway()
+
+metrics.registry.gauge("ai_circuit_open", "1 while the Gemini circuit breaker rejects calls.").set_function(
+    lambda: float(gemini.circuit_open)
+)
+metrics.registry.gauge(
+    "ai_executor_queued", "Sync-SDK Gemini calls waiting for a GEMINI_EXECUTOR_WORKERS thread."
+).set_function(lambda: gemini.executor.queued)
@@ -0,0 +1,177 @@
+"""In-process registry of master data (abilities and research phases).
+
+The 7 abilities and 4 phases are read on every report write and analysis
+preview but almost never change. The registry loads them once (at startup),
+serves immutable snapshots, and reloads when:
+
+- an Ability / ResearchPhase row is inserted, updated or deleted through the
+  ORM in this process (invalidated on commit), or
+- the snapshot is older than MASTER_DATA_CACHE_TTL_SECONDS (edits made by
+  other processes, e.g. `python -m app.db.seed` or other App Service instances).
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models import Ability, ResearchPhase
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AbilityEntry:
+    id: str
+    name: str
+    description: Optional[str]
+    display_order: int
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class PhaseEntry:
+    id: str
+    name: str
+    display_order: int
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class MasterDataSnapshot:
+    version: int  # per process; counts reloads
+    digest: str  # hash of the contents; the same in every process (ETags)
+    abilities: List[AbilityEntry]  # active, ordered by display_order
+    ability_by_name: Dict[str, AbilityEntry]  # active only
+    ability_by_id: Dict[str, AbilityEntry]  # all (including inactive)
+    phases: List[PhaseEntry]  # active, ordered by display_order
+    phase_by_name: Dict[str, PhaseEntry]  # all
+    phase_by_id: Dict[str, PhaseEntry]  # all
+
+    @property
+    def active_ability_by_id(self) -> Dict[str, AbilityEntry]:
+        return {a.id: a for a in self.abilities}
+
+
+class MasterDataRegistry:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[MasterDataSnapshot] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._loaded_at < self.ttl_seconds
+        )
+
+    async def get(self, db: Optional[AsyncSession] = None) -> MasterDataSnapshot:
+        """Return the current snapshot, loading it if missing or stale."""
+        if self._is_fresh():
+            return self._snapshot  # type: ignore[return-value]
+        async with self._lock:
+            if self._is_fresh():
+                return self._snapshot  # type: ignore[return-value]
+            return await self.load(db)
+
+    async def load(self, db: Optional[AsyncSession] = None) -> MasterDataSnapshot:
+        """(Re)load abilities and phases from the database."""
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                return await self._load(session)
+        return await self._load(db)
+
+    async def _load(self, db: AsyncSession) -> MasterDataSnapshot:
+        result = await db.execute(select(Ability).order_by(Ability.display_order))
+        abilities = [
+            AbilityEntry(
+                id=str(a.id),
+                name=a.name,
+                description=a.description,
+                display_order=a.display_order,
+                is_active=a.is_active,
+            )
+            for a in result.scalars().all()
+        ]
+        result = await db.execute(select(ResearchPhase).order_by(ResearchPhase.display_order))
+        phases = [
+            PhaseEntry(
+                id=str(p.id),
+                name=p.name,
+                display_order=p.display_order,
+                is_active=p.is_active,
+            )
+            for p in result.scalars().all()
+        ]
+
+        active_abilities = [a for a in abilities if a.is_active]
+        self._version += 1
+        self._snapshot = MasterDataSnapshot(
+            version=self._version,
+            digest=hashlib.sha256(repr((abilities, phases)).encode("utf-8")).hexdigest()[:16],
+            abilities=active_abilities,
+            ability_by_name={a.name: a for a in active_abilities},
+            ability_by_id={a.id: a for a in abilities},
+            phases=[p for p in phases if p.is_active],
+            phase_by_name={p.name: p for p in phases},
+            phase_by_id={p.id: p for p in phases},
+        )
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"Master data loaded (version={self._version}, abilities={len(active_abilities)}, phases={len(phases)})"
+        )
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        """Force a reload on the next access."""
+        self._loaded_at = 0.0
+        self._snapshot = None
+
+
+master_data = MasterDataRegistry(ttl_seconds=settings.MASTER_DATA_CACHE_TTL_SECONDS)
+
+
+async def get_master_data(db: Optional[AsyncSession] = None) -> MasterDataSnapshot:
+    """Shortcut for master_data.get()."""
+    return await master_data.get(db)
+
+
+# --- Invalidation on in-process edits -------------------------------------
+
+_DIRTY_KEY = "master_data_dirty"
+
+
+def _mark_dirty(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info[_DIRTY_KEY] = True
+
+
+for _model in (Ability, ResearchPhase):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _mark_dirty)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        master_data.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
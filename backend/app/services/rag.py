@@ -1,14 +1,22 @@
-"""RAG Service using Gemini File Search Store for knowledge retrieval."""
+"""RAG Service: passages from the local book index (app/services/retrieval.py) + Gemini generation."""
 
 import asyncio
 import logging
-from typing import Optional, Any
+from pathlib import Path
+from typing import AsyncIterator, Optional, Any
 
+from app.core import metrics
 from app.core.config import settings
+from app.services.gemini_gateway import GeminiUnavailable, flight_key, gemini
+from app.services.retrieval import rag_index, retrieve_passages
 
 logger = logging.getLogger(__name__)
 
 
+class StreamInterrupted(Exception):
+    """stream_rag_response failed after text was already yielded (what was sent is incomplete)."""
+
+
 def _extract_response_text(response: Any) -> Optional[str]:
     """Extract text from various Gemini response formats."""
     if response is None:
@@ -42,95 +50,66 @@ def _extract_response_text(response: Any) -> Optional[str]:
 
     return None
 
-# Lazy import for google-genai SDK
-_client = None
-_client_configured = False
-_genai_legacy_configured = False
-
-
-def _get_client():
-    """Get or create the Google GenAI client."""
-    global _client, _client_configured
+def is_fallback_response(text: Optional[str]) -> bool:
+    """True if text is one of the apology messages returned when generation failed."""
+    return not text or text.startswith("申し訳ありません")
 
-    if _client_configured:
-        return _client
-
-    _client_configured = True
-
-    if not settings.GEMINI_API_KEY:
-        logger.warning("GEMINI_API_KEY not configured, RAG service disabled")
-        return None
 
-    try:
-        from google import genai
-        _client = genai.Client(api_key=settings.GEMINI_API_KEY)
-        logger.info("Google GenAI client configured successfully")
-        return _client
-    except ImportError:
-        logger.info("google-genai package not installed, using google-generativeai fallback")
-        return "FALLBACK"
-    except Exception as e:
-        logger.error(f"Failed to configure Google GenAI client: {e}")
-        return "FALLBACK"
+def augment_system_prompt(system_prompt: str, query: str) -> str:
+    """Append the top book passages for `query` to the system prompt (unchanged if none)."""
+    passages = retrieve_passages(query)
+    if not passages:
+        return system_prompt
+    excerpts = "\n\n".join(
+        f"[{i}] 『{Path(p.source).stem}』より\n{p.text}" for i, p in enumerate(passages, 1)
+    )
+    return (
+        f"{system_prompt}\n\n## 参考資料（書籍からの抜粋）\n"
+        "役に立つ場合だけ、考え方を自分の言葉で取り入れてください（長い引用はしない）。\n\n"
+        f"{excerpts}"
+    )
 
 
-def _configure_legacy_genai():
-    """Configure the legacy google-generativeai SDK (one-time)."""
-    global _genai_legacy_configured
-    if _genai_legacy_configured:
-        return True
-    if not settings.GEMINI_API_KEY:
-        return False
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        _genai_legacy_configured = True
-        logger.info("Legacy google-generativeai configured successfully")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to configure legacy google-generativeai: {e}")
-        return False
+UNAVAILABLE_MESSAGE = "申し訳ありません、現在AIサービスに接続できません。"
+BUSY_MESSAGE = "申し訳ありません、現在AIサービスが混み合っています。しばらくしてからもう一度お試しください。"
 
 
 async def generate_rag_response(
     message: str,
     system_prompt: str,
-    use_rag: bool = True
+    use_rag: bool = True,
+    rag_query: Optional[str] = None,
 ) -> str:
-    """Generate a response using RAG with File Search Store.
+    """Generate a response, with book passages from the local index in the system prompt.
 
     Args:
         message: User's message/question
         system_prompt: System prompt defining the AI's behavior
-        use_rag: Whether to use RAG with File Search Store
+        use_rag: Whether to add retrieved passages to the system prompt
+        rag_query: Text to retrieve passages for (default: message)
 
     Returns:
         Generated response text
     """
-    client = _get_client()
-    logger.info(f"RAG request - client: {type(client).__name__ if client and client != 'FALLBACK' else client}, use_rag: {use_rag}")
+    client = gemini.client()
+    logger.info(f"RAG request - client: {type(client).__name__ if client else None}, use_rag: {use_rag}")
 
-    # Try using new SDK for direct generation (without File Search Store for now)
-    # File Search Store API format changed, so we skip it temporarily
-    if client and client != "FALLBACK":
+    base_prompt = system_prompt
+    if use_rag:
+        system_prompt = augment_system_prompt(system_prompt, rag_query or message)
+
+    if client:
         try:
             from google.genai import types
 
             model_name = settings.GEMINI_MODEL or "gemini-2.0-flash"
             logger.info(f"Using new SDK for direct generation, model: {model_name}")
 
-            def _call_generate():
-                return client.models.generate_content(
-                    model=model_name,
-                    contents=message,
-                    config=types.GenerateContentConfig(
-                        system_instruction=system_prompt
-                    )
-                )
-
-            response = await asyncio.wait_for(
-                asyncio.to_thread(_call_generate),
-                timeout=settings.GEMINI_TIMEOUT_SECONDS
+            config = types.GenerateContentConfig(system_instruction=system_prompt)
+            response = await gemini.call(
+                "rag_generate",
+                lambda: client.aio.models.generate_content(model=model_name, contents=message, config=config),
+                key=flight_key(model_name, system_prompt, message),
             )
 
             text = _extract_response_text(response)
@@ -140,6 +119,10 @@ async def generate_rag_response(
             else:
                 logger.warning(f"New SDK response has no extractable text. Response type: {type(response)}")
 
+        except GeminiUnavailable as e:
+            logger.warning(f"Gemini unavailable: {e}")
+            metrics.record_fallback("rag", "unavailable")
+            return BUSY_MESSAGE
         except asyncio.TimeoutError:
             logger.warning(f"New SDK request timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
         except Exception as e:
@@ -148,32 +131,113 @@ async def generate_rag_response(
 
     # Fallback: Try legacy google-generativeai SDK
     logger.info("Falling back to legacy SDK")
-    return await _generate_without_rag(message, system_prompt)
+    return await _generate_without_rag(message, system_prompt, cache_model=system_prompt == base_prompt)
 
 
-async def _generate_without_rag(message: str, system_prompt: str) -> str:
-    """Generate response without RAG as fallback."""
-    if not _configure_legacy_genai():
+async def stream_rag_response(
+    message: str,
+    system_prompt: str,
+    use_rag: bool = True,
+    rag_query: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Stream a response as text chunks using the SDK's streaming generate API.
+
+    Falls back to a single chunk from generate_rag_response if streaming is
+    unavailable or fails before any text was produced. A timeout or error after
+    the first chunk raises StreamInterrupted: callers must not treat the chunks
+    so far as a complete answer.
+    """
+    base_prompt = system_prompt
+    if use_rag:
+        system_prompt = augment_system_prompt(system_prompt, rag_query or message)
+    model_name = settings.GEMINI_MODEL or "gemini-2.0-flash"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.GEMINI_TIMEOUT_SECONDS
+
+    async def _next_chunk(iterator):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+
+    produced = False
+    try:
+        client = gemini.client()
+        legacy = gemini.legacy_sdk() if client is None else None
+        if client is not None or legacy is not None:
+            async with gemini.stream("rag_stream"):
+                if client is not None:
+                    from google.genai import types
+
+                    stream = await asyncio.wait_for(
+                        client.aio.models.generate_content_stream(
+                            model=model_name,
+                            contents=message,
+                            config=types.GenerateContentConfig(system_instruction=system_prompt),
+                        ),
+                        timeout=settings.GEMINI_TIMEOUT_SECONDS,
+                    )
+                    iterator = stream.__aiter__()
+                else:
+                    model = gemini.model(model_name, system_instruction=system_prompt, cache=system_prompt == base_prompt)
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(message, stream=True),
+                        timeout=settings.GEMINI_TIMEOUT_SECONDS,
+                    )
+                    iterator = response.__aiter__()
+
+                while True:
+                    try:
+                        chunk = await _next_chunk(iterator)
+                    except StopAsyncIteration:
+                        break
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        produced = True
+                        yield text
+            if produced:
+                return
+
+    except GeminiUnavailable as e:
+        logger.warning(f"Gemini unavailable: {e}")
+        metrics.record_fallback("rag_stream", "unavailable")
+        yield BUSY_MESSAGE
+        return
+    except asyncio.TimeoutError as e:
+        logger.warning(f"Streaming request timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
+        if produced:
+            metrics.record_fallback("rag_stream", "interrupted")
+            raise StreamInterrupted("timeout") from e
+    except Exception as e:
+        logger.warning(f"Error streaming response: {e}")
+        if produced:
+            metrics.record_fallback("rag_stream", "interrupted")
+            raise StreamInterrupted(str(e)) from e
+
+    if not produced:
+        # Nothing was sent yet: answer in one piece with the non-streaming path
+        yield await generate_rag_response(
+            message=message, system_prompt=base_prompt, use_rag=use_rag, rag_query=rag_query
+        )
+
+
+async def _generate_without_rag(message: str, system_prompt: str, cache_model: bool = True) -> str:
+    """Generate response without RAG as fallback (cache_model=False for one-off system prompts)."""
+    genai = gemini.legacy_sdk()
+    if genai is None:
         logger.error("Legacy genai configuration failed")
-        return "申し訳ありません、現在AIサービスに接続できません。"
+        metrics.record_fallback("rag", "unconfigured")
+        return UNAVAILABLE_MESSAGE
 
     try:
-        import google.generativeai as genai
-
         model_name = settings.GEMINI_MODEL or "gemini-2.0-flash"
         logger.info(f"Generating response with legacy SDK, model: {model_name}")
 
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            system_instruction=system_prompt
-        )
-
-        def _call_generate():
-            return model.generate_content(message)
-
-        response = await asyncio.wait_for(
-            asyncio.to_thread(_call_generate),
-            timeout=settings.GEMINI_TIMEOUT_SECONDS
+        model = gemini.model(model_name, system_instruction=system_prompt, cache=cache_model)
+        response = await gemini.call(
+            "rag_generate_legacy",
+            lambda: gemini.generate(model, message),
+            key=flight_key(model_name, system_prompt, message),
         )
 
         text = _extract_response_text(response)
@@ -182,12 +246,19 @@ async def _generate_without_rag(message: str, system_prompt: str) -> str:
             return text
 
         logger.warning(f"Legacy SDK response has no extractable text. Response type: {type(response)}")
+        metrics.record_fallback("rag", "empty")
         return "申し訳ありません、今少し考えがまとまりません。もう一度質問していただけますか？"
 
+    except GeminiUnavailable as e:
+        logger.warning(f"Gemini unavailable: {e}")
+        metrics.record_fallback("rag", "unavailable")
+        return BUSY_MESSAGE
     except asyncio.TimeoutError:
         logger.warning(f"Legacy SDK request timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
+        metrics.record_fallback("rag", "timeout")
         return "申し訳ありません、応答に時間がかかっています。もう一度お試しください。"
     except Exception as e:
+        metrics.record_fallback("rag", "error")
         error_msg = str(e).lower()
         # Check for network-related errors
         if "dns" in error_msg or "resolution" in error_msg or "network" in error_msg:
@@ -207,14 +278,15 @@ async def _generate_without_rag(message: str, system_prompt: str) -> str:
 def initialize_rag():
     """Initialize RAG service on startup."""
     try:
-        client = _get_client()
-        if client and client != "FALLBACK" and settings.GEMINI_FILE_SEARCH_STORE_ID:
-            logger.info(f"RAG initialized with File Search Store: {settings.GEMINI_FILE_SEARCH_STORE_ID}")
-        elif client == "FALLBACK":
-            logger.info("RAG initialized with google-generativeai fallback (direct generation without RAG)")
-        elif client:
-            logger.info("RAG initialized without File Search Store (will use direct generation)")
+        # Map the passage index now rather than on the first request
+        index = rag_index.reload()
+        if gemini.client() is not None:
+            logger.info("RAG initialized with google-genai client")
+        elif gemini.legacy_sdk() is not None:
+            logger.info("RAG initialized with google-generativeai fallback")
         else:
             logger.warning("RAG initialization: Client not available")
+        if index is None:
+            logger.info("RAG: no local passage index, prompts are sent without book excerpts")
     except Exception as e:
         logger.error(f"RAG initialization error: {e}")
@@ -0,0 +1,342 @@
+"""Local passage retrieval for RAG (BM25 over character bigrams).
+
+Source documents (the book text etc. as .txt / .md) are split into passages and
+indexed with `python -m app.db.build_rag_index`. The index is one binary file
+that is memory-mapped at startup, so opening it is instant and the OS page
+cache is shared between worker processes; a query only touches the postings
+of its own terms.
+
+Tokens are character bigrams for Japanese runs (no morphological analyzer
+needed) and whole words for ASCII runs.
+
+File layout (little endian, every section 8-byte aligned):
+
+    magic "RAGIDX01" | header | meta JSON
+    term_hashes    u64[n_terms]      sorted 64-bit term hashes
+    term_starts    u64[n_terms + 1]  posting range of each term
+    post_docs      u32[n_postings]   passage ids
+    post_tfs       u16[n_postings]   term frequencies
+    doc_lens       u32[n_docs]       passage lengths in tokens
+    doc_sources    u16[n_docs]       index into meta["sources"]
+    text_offsets   u64[n_docs + 1]   passage text ranges in the blob
+    text blob      UTF-8
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import math
+import mmap
+import re
+import struct
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RAGIDX01"
+_HEADER = struct.Struct("<IIIQdI4x")  # version, n_docs, n_terms, n_postings, avgdl, meta_len
+VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Terms found in more than this share of passages carry almost no signal; skipping them
+# keeps queries from walking the longest posting lists.
+MAX_DF_RATIO = 0.5
+
+SUPPORTED_SUFFIXES = (".txt", ".md")
+
+_RUN_RE = re.compile(r"\w+")
+_SENTENCE_RE = re.compile(r"[^。！？!?\n]+[。！？!?]?")
+
+
+@dataclass
+class Passage:
+    id: int
+    source: str
+    text: str
+    score: float = 0.0
+
+
+# --- Tokenizing / chunking ---------------------------------------------------------
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: List[str] = []
+    for run in _RUN_RE.findall(text):
+        if run.isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """Split into passages of about `max_chars`, on sentence boundaries.
+
+    Consecutive passages share one sentence so an idea cut at the boundary is
+    still found whole in one of them.
+    """
+    passages: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        sentences = [s.strip() for s in _SENTENCE_RE.findall(paragraph) if s.strip()]
+        current: List[str] = []
+        size = 0
+        for sentence in sentences:
+            if current and size + len(sentence) > max_chars:
+                passages.append("".join(current))
+                current = current[-1:] if len(current[-1]) < max_chars // 2 else []
+                size = sum(len(s) for s in current)
+            current.append(sentence)
+            size += len(sentence)
+        if current:
+            passages.append("".join(current))
+    return passages
+
+
+def iter_source_files(paths: Iterable) -> List[Path]:
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in SUPPORTED_SUFFIXES))
+        elif path.is_file():
+            files.append(path)
+    return files
+
+
+# --- Building ----------------------------------------------------------------------
+
+
+def _align(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+
+def build_index(documents: Sequence[Tuple[str, str]], output, chunk_chars: int) -> dict:
+    """Index (source name, text) documents into `output`. Returns build stats."""
+    started = time.perf_counter()
+    sources: List[str] = []
+    passages: List[Tuple[int, str]] = []
+    for source, text in documents:
+        sources.append(source)
+        passages.extend((len(sources) - 1, p) for p in chunk_text(text, chunk_chars))
+
+    postings: Dict[int, List[Tuple[int, int]]] = {}
+    doc_lens: List[int] = []
+    for doc_id, (_, text) in enumerate(passages):
+        counts = Counter(tokenize(text))
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term_hash(term), []).append((doc_id, min(tf, 0xFFFF)))
+
+    hashes = sorted(postings)
+    n_docs = len(passages)
+    n_postings = sum(len(p) for p in postings.values())
+    avgdl = (sum(doc_lens) / n_docs) if n_docs else 0.0
+    meta = json.dumps({
+        "sources": sources,
+        "chunk_chars": chunk_chars,
+        "built_at": datetime.utcnow().isoformat(),
+    }, ensure_ascii=False).encode("utf-8")
+
+    buf = bytearray(MAGIC)
+    buf += _HEADER.pack(VERSION, n_docs, len(hashes), n_postings, avgdl, len(meta))
+    buf += meta
+    _align(buf)
+
+    starts = [0]
+    docs: List[int] = []
+    tfs: List[int] = []
+    for h in hashes:
+        for doc_id, tf in postings[h]:
+            docs.append(doc_id)
+            tfs.append(tf)
+        starts.append(len(docs))
+
+    texts = [text.encode("utf-8") for _, text in passages]
+    offsets = [0]
+    for t in texts:
+        offsets.append(offsets[-1] + len(t))
+
+    for fmt, values in (
+        ("Q", hashes),
+        ("Q", starts),
+        ("I", docs),
+        ("H", tfs),
+        ("I", doc_lens),
+        ("H", [source for source, _ in passages]),
+        ("Q", offsets),
+    ):
+        buf += struct.pack(f"<{len(values)}{fmt}", *values)
+        _align(buf)
+    for t in texts:
+        buf += t
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename: running processes keep their mapping of the old file
+    tmp = output.with_name(output.name + ".tmp")
+    tmp.write_bytes(bytes(buf))
+    tmp.replace(output)
+
+    return {
+        "sources": len(sources),
+        "passages": n_docs,
+        "terms": len(hashes),
+        "postings": n_postings,
+        "bytes": len(buf),
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# --- Reading -----------------------------------------------------------------------
+
+
+class RagIndex:
+    """Read-only view of an index file through mmap (no parsing at open time)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a RAG index")
+        pos = len(MAGIC)
+        version, self.n_docs, self.n_terms, n_postings, self.avgdl, meta_len = _HEADER.unpack_from(view, pos)
+        if version != VERSION:
+            raise ValueError(f"Unsupported RAG index version {version}")
+        pos += _HEADER.size
+        self.meta = json.loads(bytes(view[pos:pos + meta_len]).decode("utf-8"))
+        pos += meta_len
+
+        def section(fmt: str, count: int):
+            nonlocal pos
+            pos += -pos % 8
+            size = struct.calcsize(fmt) * count
+            part = view[pos:pos + size].cast(fmt)
+            pos += size
+            return part
+
+        self._hashes = section("Q", self.n_terms)
+        self._starts = section("Q", self.n_terms + 1)
+        self._docs = section("I", n_postings)
+        self._tfs = section("H", n_postings)
+        self._doc_lens = section("I", self.n_docs)
+        self._doc_sources = section("H", self.n_docs)
+        self._offsets = section("Q", self.n_docs + 1)
+        pos += -pos % 8
+        self._text_base = pos
+        self._view = view
+        self.sources: List[str] = self.meta.get("sources", [])
+
+    def _postings(self, term: str):
+        h = term_hash(term)
+        i = bisect.bisect_left(self._hashes, h)
+        if i == self.n_terms or self._hashes[i] != h:
+            return None
+        return self._starts[i], self._starts[i + 1]
+
+    def passage(self, doc_id: int, score: float = 0.0) -> Passage:
+        start = self._text_base + self._offsets[doc_id]
+        end = self._text_base + self._offsets[doc_id + 1]
+        return Passage(
+            id=doc_id,
+            source=self.sources[self._doc_sources[doc_id]],
+            text=bytes(self._view[start:end]).decode("utf-8"),
+            score=score,
+        )
+
+    def search(self, query: str, k: int = 3) -> List[Passage]:
+        if not self.n_docs or k <= 0:
+            return []
+        n = self.n_docs
+        max_df = max(1, int(n * MAX_DF_RATIO))
+        scores: Dict[int, float] = {}
+        docs, tfs, doc_lens = self._docs, self._tfs, self._doc_lens
+        norm = BM25_K1 / self.avgdl if self.avgdl else 0.0
+        for term, qtf in Counter(tokenize(query)).items():
+            span = self._postings(term)
+            if span is None:
+                continue
+            start, end = span
+            df = end - start
+            if df > max_df and n > 2:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5)) * qtf
+            for j in range(start, end):
+                doc = docs[j]
+                tf = tfs[j]
+                denom = tf + BM25_K1 * (1 - BM25_B) + BM25_B * norm * doc_lens[doc]
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / denom
+        if not scores:
+            return []
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [self.passage(doc, score) for doc, score in best]
+
+    def close(self) -> None:
+        for part in (self._hashes, self._starts, self._docs, self._tfs,
+                     self._doc_lens, self._doc_sources, self._offsets, self._view):
+            part.release()
+        self._mmap.close()
+
+
+class RagIndexRegistry:
+    """The index at settings.RAG_INDEX_PATH, opened once (reload() after a rebuild)."""
+
+    def __init__(self):
+        self._index: Optional[RagIndex] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[RagIndex]:
+        if not self._loaded:
+            self.reload()
+        return self._index
+
+    def reload(self, path: Optional[str] = None) -> Optional[RagIndex]:
+        with self._lock:
+            path = Path(path or settings.RAG_INDEX_PATH)
+            index = None
+            if not path.exists():
+                logger.info(f"RAG index not found at {path} (run python -m app.db.build_rag_index)")
+            else:
+                try:
+                    index = RagIndex(path)
+                    logger.info(f"RAG index loaded from {path}: {index.n_docs} passages")
+                except Exception as e:
+                    logger.error(f"Failed to open RAG index {path}: {e}")
+            # The previous mapping is left to the GC: in-flight searches may still use it
+            self._index = index
+            self._loaded = True
+            return index
+
+
+rag_index = RagIndexRegistry()
+
+
+def retrieve_passages(query: str, k: Optional[int] = None) -> List[Passage]:
+    """Top-k passages for `query` (empty if no index is built or retrieval fails)."""
+    index = rag_index.get()
+    if index is None or not (query or "").strip():
+        return []
+    try:
+        return index.search(query, k if k is not None else settings.RAG_TOP_K)
+    except Exception as e:
+        logger.warning(f"RAG retrieval failed: {e}")
+        return []
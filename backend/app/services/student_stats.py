@@ -0,0 +1,322 @@
+"""Per-student, per-fiscal-year report rollup (student_stats).
+
+Dashboards, the report summary and teacher advice read report counts,
+ability counts/points and phase distributions from this table instead of
+running GROUP BY over reports ⋈ report_abilities on every request.
+
+Maintenance:
+- refresh_student_stats() recomputes only the affected (student, fiscal_year)
+  rows and is called in the same transaction as report create/update/delete.
+  It is a full recompute of each affected row (not a delta), serialized per
+  row: the row is upserted first, which takes its exclusive lock, and the
+  reports are then read with locking reads so the latest commits are counted
+  even under MySQL REPEATABLE READ.
+- rebuild_all_student_stats() recomputes everything in parallel chunks
+  (python -m app.db.rebuild_student_stats, POST /admin/rebuild-student-stats).
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models import Report, ReportAbility, Student, StudentStats
+
+logger = logging.getLogger(__name__)
+
+JST = timezone(timedelta(hours=9))
+
+# Students per IN (...) batch
+_ID_BATCH_SIZE = 500
+
+StatsKey = Tuple[str, int]  # (student_id, fiscal_year)
+
+
+def fiscal_year_of(reported_at: datetime) -> int:
+    """Fiscal year (April start) of a naive-UTC reported_at, judged in JST."""
+    jst = reported_at.replace(tzinfo=timezone.utc).astimezone(JST)
+    return jst.year if jst.month >= 4 else jst.year - 1
+
+
+def fiscal_year_bounds(fiscal_year: int) -> Tuple[datetime, datetime]:
+    """[start, end) of a fiscal year as naive UTC datetimes."""
+    start = datetime(fiscal_year, 4, 1, tzinfo=JST).astimezone(timezone.utc).replace(tzinfo=None)
+    end = datetime(fiscal_year + 1, 4, 1, tzinfo=JST).astimezone(timezone.utc).replace(tzinfo=None)
+    return start, end
+
+
+def report_stats_key(report: Report) -> StatsKey:
+    return str(report.student_id), fiscal_year_of(report.reported_at)
+
+
+@dataclass
+class StudentStatsView:
+    """Stats of one student, for one fiscal year or summed across years."""
+    report_count: int = 0
+    ability_counts: Dict[str, int] = field(default_factory=dict)
+    ability_points: Dict[str, int] = field(default_factory=dict)
+    phase_counts: Dict[str, int] = field(default_factory=dict)
+    latest_report_at: Optional[datetime] = None
+    latest_phase_id: Optional[str] = None
+
+    def add(self, row: StudentStats) -> None:
+        self.report_count += row.report_count or 0
+        for target, source in (
+            (self.ability_counts, row.ability_counts),
+            (self.ability_points, row.ability_points),
+            (self.phase_counts, row.phase_counts),
+        ):
+            for key, value in (source or {}).items():
+                target[key] = target.get(key, 0) + int(value or 0)
+        if row.latest_report_at and (self.latest_report_at is None or row.latest_report_at > self.latest_report_at):
+            self.latest_report_at = row.latest_report_at
+            self.latest_phase_id = str(row.latest_phase_id) if row.latest_phase_id else None
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --- Computation -----------------------------------------------------------------
+
+
+async def _compute(
+    db: AsyncSession,
+    student_ids: Sequence[str],
+    fiscal_year: Optional[int] = None,
+    locking: bool = False,
+) -> Dict[StatsKey, dict]:
+    """Aggregate reports of the given students (optionally one fiscal year).
+
+    locking: read with FOR SHARE (latest committed rows instead of the transaction's snapshot).
+    """
+    report_filter = [Report.student_id.in_(student_ids)]
+    if fiscal_year is not None:
+        start, end = fiscal_year_bounds(fiscal_year)
+        report_filter += [Report.reported_at >= start, Report.reported_at < end]
+
+    def _read(statement):
+        return statement.with_for_update(read=True) if locking else statement
+
+    stats: Dict[StatsKey, dict] = {}
+    result = await db.execute(
+        _read(select(Report.student_id, Report.reported_at, Report.phase_id).where(*report_filter))
+    )
+    for student_id, reported_at, phase_id in result.all():
+        key = (str(student_id), fiscal_year_of(reported_at))
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = {
+                "report_count": 0,
+                "ability_counts": defaultdict(int),
+                "ability_points": defaultdict(int),
+                "phase_counts": defaultdict(int),
+                "latest_report_at": None,
+                "latest_phase_id": None,
+            }
+        entry["report_count"] += 1
+        if phase_id:
+            entry["phase_counts"][str(phase_id)] += 1
+        if entry["latest_report_at"] is None or reported_at > entry["latest_report_at"]:
+            entry["latest_report_at"] = reported_at
+            entry["latest_phase_id"] = str(phase_id) if phase_id else None
+
+    result = await db.execute(
+        _read(
+            select(Report.student_id, Report.reported_at, ReportAbility.ability_id, ReportAbility.points)
+            .join(ReportAbility, ReportAbility.report_id == Report.id)
+            .where(*report_filter)
+        )
+    )
+    for student_id, reported_at, ability_id, points in result.all():
+        entry = stats.get((str(student_id), fiscal_year_of(reported_at)))
+        if entry is None:
+            continue
+        entry["ability_counts"][str(ability_id)] += 1
+        entry["ability_points"][str(ability_id)] += int(points or 0)
+
+    for entry in stats.values():
+        for name in ("ability_counts", "ability_points", "phase_counts"):
+            entry[name] = dict(entry[name])
+    return stats
+
+
+async def _lock_rows(db: AsyncSession, fiscal_year: int, student_ids: Sequence[str], now: datetime) -> None:
+    """Create missing stats rows and take the exclusive lock on all of them (held until commit).
+
+    An upsert rather than SELECT ... FOR UPDATE: a missing row cannot be locked,
+    and two writers inserting it would collide on uq_student_stats_student_year.
+    ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE waits for a concurrent
+    writer's commit instead. Rows are locked in id order to avoid deadlocks.
+    """
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "fiscal_year": fiscal_year,
+            "report_count": 0,
+            "ability_counts": {},
+            "ability_points": {},
+            "phase_counts": {},
+            "created_at": now,
+            "updated_at": now,
+        }
+        for student_id in sorted(student_ids)
+    ]
+    dialect = (await db.connection()).dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(StudentStats).values(rows)
+        statement = statement.on_duplicate_key_update(updated_at=statement.inserted.updated_at)
+    elif dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = insert(StudentStats).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[StudentStats.student_id, StudentStats.fiscal_year],
+            set_={"updated_at": statement.excluded.updated_at},
+        )
+    else:
+        logger.warning(f"student_stats rows are not locked on {dialect}")
+        return
+    await db.execute(statement)
+
+
+async def refresh_student_stats(db: AsyncSession, keys: Iterable[StatsKey]) -> None:
+    """Recompute the given (student_id, fiscal_year) rows in the caller's transaction.
+
+    Call after the report changes are added to the session and before commit.
+    Concurrent refreshes of the same row wait for each other (see _lock_rows).
+    """
+    keys = {(str(sid), int(fy)) for sid, fy in keys}
+    if not keys:
+        return
+    await db.flush()
+
+    by_year: Dict[int, List[str]] = defaultdict(list)
+    for student_id, fiscal_year in keys:
+        by_year[fiscal_year].append(student_id)
+
+    now = datetime.utcnow()
+    for fiscal_year, student_ids in by_year.items():
+        for batch in _chunks(sorted(student_ids), _ID_BATCH_SIZE):
+            await _lock_rows(db, fiscal_year, batch, now)
+            computed = await _compute(db, batch, fiscal_year, locking=True)
+            result = await db.execute(
+                select(StudentStats)
+                .where(
+                    StudentStats.student_id.in_(batch),
+                    StudentStats.fiscal_year == fiscal_year,
+                )
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+            existing = {str(row.student_id): row for row in result.scalars().all()}
+
+            for student_id in batch:
+                values = computed.get((student_id, fiscal_year))
+                row = existing.get(student_id)
+                if values is None:
+                    # No reports left in this fiscal year
+                    if row is not None:
+                        await db.delete(row)
+                    continue
+                if row is None:
+                    db.add(StudentStats(
+                        student_id=student_id,
+                        fiscal_year=fiscal_year,
+                        created_at=now,
+                        updated_at=now,
+                        **values,
+                    ))
+                else:
+                    for name, value in values.items():
+                        setattr(row, name, value)
+                    row.updated_at = now
+
+
+async def rebuild_student_stats_chunk(student_ids: Sequence[str]) -> int:
+    """Replace all stats rows of the given students (own session and transaction)."""
+    async with AsyncSessionLocal() as db:
+        computed = await _compute(db, student_ids)
+        await db.execute(delete(StudentStats).where(StudentStats.student_id.in_(student_ids)))
+        now = datetime.utcnow()
+        if computed:
+            await db.execute(
+                StudentStats.__table__.insert(),
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "student_id": student_id,
+                        "fiscal_year": fiscal_year,
+                        "created_at": now,
+                        "updated_at": now,
+                        **values,
+                    }
+                    for (student_id, fiscal_year), values in computed.items()
+                ],
+            )
+        await db.commit()
+        return len(computed)
+
+
+async def rebuild_all_student_stats(chunk_size: int = 200, concurrency: int = 4) -> dict:
+    """Recompute student_stats for every student in parallel chunks."""
+    started = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Student.id))
+        student_ids = [str(sid) for sid in result.scalars().all()]
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(batch: Sequence[str]) -> int:
+        async with semaphore:
+            return await rebuild_student_stats_chunk(batch)
+
+    counts = await asyncio.gather(*(run(batch) for batch in _chunks(student_ids, max(1, chunk_size))))
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    summary = {
+        "students": len(student_ids),
+        "rows": sum(counts),
+        "chunks": len(counts),
+        "elapsed_seconds": round(elapsed, 3),
+    }
+    logger.info(f"student_stats rebuilt: {summary}")
+    return summary
+
+
+# --- Reading ---------------------------------------------------------------------
+
+
+async def load_student_stats(
+    db: AsyncSession,
+    student_ids: Sequence[str],
+    fiscal_year: Optional[int] = None,
+) -> Dict[str, StudentStatsView]:
+    """Stats per student; summed across fiscal years (all-time) unless one is given."""
+    views: Dict[str, StudentStatsView] = {}
+    ids = [str(sid) for sid in student_ids]
+    for batch in _chunks(ids, _ID_BATCH_SIZE):
+        query = select(StudentStats).where(StudentStats.student_id.in_(batch))
+        if fiscal_year is not None:
+            query = query.where(StudentStats.fiscal_year == fiscal_year)
+        result = await db.execute(query)
+        for row in result.scalars().all():
+            views.setdefault(str(row.student_id), StudentStatsView()).add(row)
+    return views
+
+
+async def get_student_stats(
+    db: AsyncSession,
+    student_id: str,
+    fiscal_year: Optional[int] = None,
+) -> StudentStatsView:
+    views = await load_student_stats(db, [student_id], fiscal_year)
+    return views.get(str(student_id), StudentStatsView())
@@ -0,0 +1,105 @@
+"""Side-by-side latency benchmark of the report analysis pipelines.
+
+Compares ANALYSIS_PIPELINE="two_step" (analysis call + comment call) with
+"combined" (one structured-output call) against the configured Gemini model.
+
+Usage (from backend/):
+    python -m benchmarks.analysis_pipeline --iterations 10 --concurrency 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.services.analysis import analyze_report_content
+from app.services.gemini_gateway import gemini
+
+SAMPLE_REPORTS = [
+    ("今日は文献調査を行った。特に「マインドセット」に関する章を読み、成長思考の重要性を学んだ。", "高校生の学習意欲"),
+    ("アンケートの質問項目を作成した。想定される回答をシミュレーションしながら記述を調整した。", "地域の商店街の活性化"),
+    ("インタビューの依頼メールを送った。失礼のないように敬語の使い方を先生に確認してもらった。", "地域の商店街の活性化"),
+    ("集めたデータをエクセルに入力した。意外と時間がかかったが、傾向が見えてきて面白かった。", "食品ロスの削減"),
+    ("中間発表のポスターを作成した。文字を減らして図解を増やす工夫をした。", "食品ロスの削減"),
+    ("チームで議論を行い、研究の方向性を修正することにした。対話の重要性を感じた。", "防災意識の向上"),
+]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def _run_mode(mode: str, iterations: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    heuristic_fallbacks = 0
+
+    async def _one(i: int):
+        nonlocal heuristic_fallbacks
+        content, theme = SAMPLE_REPORTS[i % len(SAMPLE_REPORTS)]
+        async with semaphore:
+            started = time.perf_counter()
+            _, _, comment = await analyze_report_content(
+                content=content,
+                theme_title=theme,
+                student_name="山田 花子",
+                use_cache=False,
+                pipeline=mode,
+            )
+            latencies.append(time.perf_counter() - started)
+            if comment.startswith("報告ありがとうございます。今回の取り組みでは特に"):
+                heuristic_fallbacks += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(iterations)))
+    wall = time.perf_counter() - wall_started
+
+    return {
+        "mode": mode,
+        "n": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "heuristic_fallbacks": heuristic_fallbacks,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10, help="Reports analyzed per mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent analyses per mode")
+    parser.add_argument("--modes", default="two_step,combined", help="Comma-separated pipelines to compare")
+    args = parser.parse_args()
+
+    if not gemini.configured:
+        print("GEMINI_API_KEY (and google-generativeai) is required for this benchmark (or LLM_BACKEND=fake).")
+        return
+
+    print(f"backend={settings.LLM_BACKEND} model={settings.GEMINI_MODEL} iterations={args.iterations} concurrency={args.concurrency}")
+    results = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        results.append(await _run_mode(mode, args.iterations, args.concurrency))
+
+    header = f"{'mode':<10} {'n':>4} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9} {'rps':>7} {'fallback':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['mode']:<10} {r['n']:>4} {r['mean_ms']:>7.0f}ms {r['p50_ms']:>7.0f}ms "
+            f"{r['p95_ms']:>7.0f}ms {r['max_ms']:>7.0f}ms {r['throughput_rps']:>7.2f} {r['heuristic_fallbacks']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""Latency of GET /dashboard/students: batched queries vs one CTE / window-function statement.
+
+For each size, a teacher with that many assigned students is generated once
+(python -m app.db.generate_synthetic with --teachers 1 and prefix dash<size>)
+and get_students_summary is timed with DASHBOARD_SUMMARY_QUERY=batched and
+=single. Both results are compared, so a mismatch shows up here as well.
+
+Usage (from backend/, against a disposable, seeded database):
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks.dashboard_summary
+    python -m benchmarks.dashboard_summary --sizes 40 400 4000 --iterations 20 --limit 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import Response
+from sqlalchemy import select
+
+from app.api.endpoints.dashboard import get_students_summary
+from app.core import query_stats
+from app.core.config import settings
+from app.db import generate_synthetic
+from app.db.session import AsyncSessionLocal, engine
+from app.models import User
+
+MODES = ("batched", "single")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def _teacher(size: int, args: argparse.Namespace) -> User:
+    """The teacher of the dash<size> school, generated on first use."""
+    email = f"dash{size}-t00000@synthetic.example"
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+    if user is not None:
+        return user
+
+    print(f"Generating {size} students for one teacher...")
+    status = await generate_synthetic.main(argparse.Namespace(
+        students=size, teachers=1, labs=max(1, size // 40), years=args.years,
+        reports_per_year=args.reports_per_year, chunk_size=20000, prefix=f"dash{size}",
+        password=None, sql_file=None, progress_every=10 ** 9, seed=size,
+    ))
+    if status:
+        raise SystemExit(status)
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(User).where(User.email == email))).scalar_one()
+
+
+async def _call(user: User, mode: str, limit) -> tuple:
+    settings.DASHBOARD_SUMMARY_QUERY = mode
+    async with AsyncSessionLocal() as db:
+        with query_stats.query_budget(10 ** 6) as stats:
+            started = time.perf_counter()
+            summaries = await get_students_summary(
+                response=Response(), current_user=user, db=db, fiscal_year=None, limit=limit, cursor=None,
+            )
+            elapsed = time.perf_counter() - started
+    return elapsed, stats.count, [s.model_dump() for s in summaries]
+
+
+async def _bench(size: int, args: argparse.Namespace) -> list:
+    user = await _teacher(size, args)
+    results = {}
+    for mode in MODES:
+        for _ in range(args.warmup):
+            await _call(user, mode, args.limit)
+        latencies = []
+        for _ in range(args.iterations):
+            elapsed, queries, rows = await _call(user, mode, args.limit)
+            latencies.append(elapsed * 1000)
+        results[mode] = (latencies, queries, rows)
+
+    if results["batched"][2] != results["single"][2]:
+        print(f"  WARNING: batched and single results differ for {size} students")
+
+    lines = []
+    for mode in MODES:
+        latencies, queries, rows = results[mode]
+        lines.append(
+            f"{size:>6} {mode:<8} {len(rows):>5} {queries:>7} "
+            f"{statistics.mean(latencies):>9.1f} {_percentile(latencies, 50):>9.1f} {_percentile(latencies, 95):>9.1f}"
+        )
+    return lines
+
+
+async def main(args: argparse.Namespace) -> None:
+    query_stats.install(engine)
+    lines = []
+    for size in args.sizes:
+        lines += await _bench(size, args)
+    await engine.dispose()
+
+    print()
+    print(f"database: {settings.DATABASE_URL.split('://')[0]}, limit: {args.limit or 'all'}, iterations: {args.iterations}")
+    print(f"{'size':>6} {'mode':<8} {'rows':>5} {'queries':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for line in lines:
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teacher dashboard summary: batched vs single statement")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 400, 4000], help="students per teacher")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--limit", type=int, help="page size (default: whole list, as the dashboard loads it)")
+    parser.add_argument("--years", type=int, default=2, help="fiscal years of generated reports")
+    parser.add_argument("--reports-per-year", type=float, default=40)
+    asyncio.run(main(parser.parse_args()))
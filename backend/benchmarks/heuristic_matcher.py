@@ -0,0 +1,135 @@
+"""Micro-benchmark of the keyword heuristic used when Gemini is unavailable.
+
+Compares the previous implementation (one substring scan per keyword per
+ability / phase) with the compiled single-pass KeywordMatcher, on a corpus of
+synthetic Japanese reports. Results are also checked for equality.
+
+Usage (from backend/):
+    python -m benchmarks.heuristic_matcher --reports 20000 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.analysis import (
+    ABILITY_KEYWORDS,
+    ABILITY_NAMES,
+    PHASE_KEYWORDS,
+    STRONG_ABILITY_SCORE,
+    SUB_ABILITY_SCORE,
+    _heuristic_analysis,
+    batch_heuristic_analysis,
+)
+
+OPENINGS = ["今日は", "昨日は", "放課後に", "授業で", "週末に", "班のみんなと"]
+ACTIVITIES = [
+    "図書館で文献を調べた",
+    "商店街の方にインタビューを行った",
+    "アンケートの質問項目を作成した",
+    "集めたデータをグラフに整理した",
+    "チームで議論して仮説を見直した",
+    "中間発表のスライドを作った",
+    "先生から指摘をもらい改善点を振り返った",
+    "生徒会に協力を依頼した",
+    "最後まで粘ってポスターを仕上げた",
+    "統計資料を比較して分析した",
+    "実験を実施してテストの結果をまとめた",
+]
+REFLECTIONS = [
+    "思ったより時間がかかった。",
+    "新しい気づきがあった。",
+    "次は計画を立ててから進めたい。",
+    "みんなの話を聞くことの大切さを学んだ。",
+    "少しずつ目的がはっきりしてきた。",
+    "",
+]
+
+
+def make_corpus(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        sentences = [
+            rng.choice(OPENINGS) + rng.choice(ACTIVITIES) + "。"
+            for _ in range(rng.randint(1, 4))
+        ]
+        sentences.append(rng.choice(REFLECTIONS))
+        corpus.append("".join(sentences))
+    return corpus
+
+
+def legacy_heuristic(content: str) -> Tuple[Optional[str], List[dict], str]:
+    """_heuristic_analysis as it was before KeywordMatcher (one substring scan per keyword)."""
+    text = (content or "").lower()
+
+    def score_for(name: str) -> int:
+        kws = {n: list(keywords) for n, keywords in ABILITY_KEYWORDS.items()}
+        return sum(1 for kw in kws.get(name, []) if kw in text)
+
+    scored = [(name, score_for(name)) for name in ABILITY_NAMES]
+    scored.sort(key=lambda x: (-x[1], ABILITY_NAMES.index(x[0])))
+    picked = [s[0] for s in scored if s[1] > 0][:3]
+    for n in ABILITY_NAMES:
+        if len(picked) >= 3:
+            break
+        if n not in picked:
+            picked.append(n)
+
+    abilities = [
+        {"name": picked[0], "reason": "記述内容から最も強く表れているため", "role": "strong", "score": STRONG_ABILITY_SCORE},
+        {"name": picked[1], "reason": "行動や思考の過程から確認できるため", "role": "sub", "score": SUB_ABILITY_SCORE},
+        {"name": picked[2], "reason": "取り組みの補助的な要素として見られるため", "role": "sub", "score": SUB_ABILITY_SCORE},
+    ]
+    phase = None
+    for name, keywords in PHASE_KEYWORDS:
+        if any(k in text for k in keywords):
+            phase = name
+    comment = f"報告ありがとうございます。今回の取り組みでは特に「{abilities[0]['name']}」を発揮していますね。小さな一歩でも、積み重ねることで大きな成長につながります。次のステップも楽しみにしています！"
+    return phase, abilities, comment
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=20000, help="Synthetic reports in the corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.reports, args.seed)
+
+    mismatches = sum(1 for content in corpus if _heuristic_analysis(content) != legacy_heuristic(content))
+
+    results = [
+        ("legacy", _time(lambda: [legacy_heuristic(c) for c in corpus], args.repeat)),
+        ("compiled", _time(lambda: [_heuristic_analysis(c) for c in corpus], args.repeat)),
+        ("batch", _time(lambda: batch_heuristic_analysis(corpus), args.repeat)),
+    ]
+
+    print(f"reports={len(corpus)} distinct={len(set(corpus))} mismatches={mismatches}")
+    header = f"{'impl':<10} {'total':>9} {'per report':>11} {'reports/s':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, seconds in results:
+        print(
+            f"{name:<10} {seconds * 1000:>7.0f}ms {seconds / len(corpus) * 1e6:>9.1f}us "
+            f"{len(corpus) / seconds:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
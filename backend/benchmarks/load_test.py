@@ -0,0 +1,306 @@
+"""End-to-end HTTP load test of the hot student / teacher endpoints.
+
+Virtual users loop over realistic sessions against a seeded database:
+
+- student: POST /reports (submit), then GET /reports/calendar and /reports/summary
+- teacher: GET /dashboard/students, /dashboard/scatter-data and
+  /dashboard/students/{id} for a couple of assigned students
+
+Reports p50/p95/p99 latency, throughput and error counts per endpoint, plus DB
+queries per request from the Server-Timing header (app/core/query_stats.py).
+By default the app runs in-process (httpx's ASGI transport against
+settings.DATABASE_URL). With --base-url the requests go to a running server
+instead; its JWT_SECRET_KEY must match the local settings.
+
+Users are picked from the database: students with a theme in the current fiscal
+year and teachers with active assignments. POST /reports writes real rows, so
+point it at a disposable database (python -m app.db.generate_synthetic).
+In-process runs use LLM_BACKEND=fake unless --llm gemini is given.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --duration 30 --users 50 --student-share 0.8
+    python -m benchmarks.load_test --output results/base.json
+    python -m benchmarks.load_test --output results/new.json --compare results/base.json
+    python -m benchmarks.load_test --base-url http://localhost:8000 --users 20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.query_stats import SERVER_TIMING_HEADER, parse_server_timing
+from app.core.security import create_access_token
+from app.db.session import AsyncSessionLocal
+from app.models import ResearchTheme, Student, StudentTeacher, Teacher
+from benchmarks.heuristic_matcher import make_corpus
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.errors = 0
+
+    def summary(self, wall: float) -> dict:
+        n = len(self.latencies)
+        return {
+            "requests": n,
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "throughput_rps": round(n / wall, 2) if wall else 0.0,
+            "mean_ms": round(statistics.mean(self.latencies) * 1000, 2) if n else None,
+            "p50_ms": round(_percentile(self.latencies, 50) * 1000, 2) if n else None,
+            "p95_ms": round(_percentile(self.latencies, 95) * 1000, 2) if n else None,
+            "p99_ms": round(_percentile(self.latencies, 99) * 1000, 2) if n else None,
+            "max_ms": round(max(self.latencies) * 1000, 2) if n else None,
+            "queries_mean": round(statistics.mean(self.queries), 2) if self.queries else None,
+            "queries_max": max(self.queries) if self.queries else None,
+        }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.recording = False
+        self.reported_errors = set()
+        self.contents = make_corpus(2000, seed=args.seed)
+
+    async def request(self, name: str, method: str, url: str, token: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs
+            )
+        except Exception as e:
+            if self.recording:
+                self.stats[name].errors += 1
+                self.stats[name].statuses[0] += 1
+            if name not in self.reported_errors:
+                self.reported_errors.add(name)
+                print(f"{name}: {type(e).__name__}: {e}", file=sys.stderr)
+            return None
+        elapsed = time.perf_counter() - started
+        if self.recording:
+            stats = self.stats[name]
+            stats.latencies.append(elapsed)
+            stats.statuses[response.status_code] += 1
+            if response.status_code >= 400:
+                stats.errors += 1
+            timing = response.headers.get(SERVER_TIMING_HEADER)
+            if timing:
+                stats.queries.append(parse_server_timing(timing)[0])
+        return response
+
+    async def student_session(self, rng: random.Random, user: dict) -> None:
+        token = user["token"]
+        for _ in range(rng.randint(1, self.args.burst)):
+            params = {"defer_analysis": "true"} if self.args.defer_analysis else {}
+            await self.request(
+                "POST /reports", "POST", "/api/reports", token,
+                params=params,
+                json={"theme_id": user["theme_id"], "content": rng.choice(self.contents)},
+            )
+        await self.request("GET /reports/calendar", "GET", "/api/reports/calendar", token)
+        await self.request("GET /reports/summary", "GET", "/api/reports/summary", token)
+
+    async def teacher_session(self, rng: random.Random, user: dict) -> None:
+        token = user["token"]
+        await self.request("GET /dashboard/students", "GET", "/api/dashboard/students", token)
+        await self.request("GET /dashboard/scatter-data", "GET", "/api/dashboard/scatter-data", token)
+        for student_id in rng.sample(user["student_ids"], min(2, len(user["student_ids"]))):
+            await self.request(
+                "GET /dashboard/students/{id}", "GET", f"/api/dashboard/students/{student_id}", token
+            )
+
+    async def virtual_user(self, index: int, students: List[dict], teachers: List[dict], deadline: float) -> None:
+        rng = random.Random(self.args.seed * 100003 + index)
+        is_student = bool(students) and (not teachers or rng.random() < self.args.student_share)
+        pool = students if is_student else teachers
+        session = self.student_session if is_student else self.teacher_session
+        while time.perf_counter() < deadline:
+            await session(rng, rng.choice(pool))
+            if self.args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / self.args.think_ms))
+
+
+async def load_users(max_users: int) -> tuple:
+    """Students with a current-year theme and teachers with their assigned students."""
+    fiscal_year = settings.get_current_fiscal_year()
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Student.user_id, ResearchTheme.id)
+            .join(ResearchTheme, ResearchTheme.student_id == Student.id)
+            .where(ResearchTheme.fiscal_year == fiscal_year)
+            .limit(max_users)
+        )).all()
+        students = [
+            {"token": create_access_token({"sub": str(user_id)}), "theme_id": str(theme_id)}
+            for user_id, theme_id in rows
+        ]
+
+        assigned: Dict[str, List[str]] = defaultdict(list)
+        teacher_users: Dict[str, str] = {}
+        for teacher_user_id, teacher_id, student_id in (await db.execute(
+            select(Teacher.user_id, Teacher.id, StudentTeacher.student_id)
+            .join(StudentTeacher, StudentTeacher.teacher_id == Teacher.id)
+            .where(StudentTeacher.fiscal_year == fiscal_year, StudentTeacher.is_active == True)
+        )).all():
+            assigned[str(teacher_id)].append(str(student_id))
+            teacher_users[str(teacher_id)] = str(teacher_user_id)
+        teachers = [
+            {"token": create_access_token({"sub": teacher_users[teacher_id]}), "student_ids": student_ids}
+            for teacher_id, student_ids in list(assigned.items())[:max_users]
+        ]
+    return students, teachers
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _print_table(endpoints: dict, baseline: Optional[dict]) -> None:
+    header = (
+        f"{'endpoint':<32} {'n':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}"
+    )
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, s in endpoints.items():
+        line = (
+            f"{name:<32} {s['requests']:>6} {s['errors']:>5} {s['throughput_rps']:>8.1f} "
+            f"{s['p50_ms'] or 0:>7.1f}ms {s['p95_ms'] or 0:>7.1f}ms {s['p99_ms'] or 0:>7.1f}ms "
+            f"{s['queries_mean'] if s['queries_mean'] is not None else '-':>8}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get("p95_ms") and s["p95_ms"]:
+            line += f" {(s['p95_ms'] / base['p95_ms'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="run against a server instead of in-process")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of load before measuring")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--student-share", type=float, default=0.8, help="fraction of virtual users that are students")
+    parser.add_argument("--burst", type=int, default=3, help="max reports a student submits per session")
+    parser.add_argument("--defer-analysis", action="store_true", help="submit with ?defer_analysis=true")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between sessions")
+    parser.add_argument("--max-accounts", type=int, default=500, help="students / teachers loaded from the DB")
+    parser.add_argument("--llm", choices=["fake", "gemini"], default="fake", help="LLM backend for in-process runs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare p95 against")
+    args = parser.parse_args()
+
+    students, teachers = await load_users(args.max_accounts)
+    if not students and not teachers:
+        print("No students with a current-year theme or assigned teachers in the database; seed it first.")
+        return
+    print(f"accounts: students={len(students)} teachers={len(teachers)}")
+
+    in_process = not args.base_url
+    if in_process:
+        settings.LLM_BACKEND = args.llm
+        from app.main import app
+
+        # Unhandled errors become 500s, as behind a real server
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+    else:
+        limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits)
+
+    test = LoadTest(client, args)
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+
+    async def _start_recording():
+        await asyncio.sleep(args.warmup)
+        test.recording = True
+
+    try:
+        await asyncio.gather(
+            _start_recording(),
+            *(test.virtual_user(i, students, teachers, deadline) for i in range(args.users)),
+        )
+    finally:
+        # Sessions still running at the deadline are included
+        wall = time.perf_counter() - measure_from
+        await client.aclose()
+        if in_process:
+            await lifespan.__aexit__(None, None, None)
+
+    endpoints = {name: test.stats[name].summary(wall) for name in sorted(test.stats)}
+    results = {
+        "commit": _git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "target": args.base_url or f"in-process ({settings.DATABASE_URL.split('://')[0]})",
+        "llm_backend": args.llm if in_process else None,
+        "config": {
+            "users": args.users,
+            "duration": args.duration,
+            "student_share": args.student_share,
+            "burst": args.burst,
+            "defer_analysis": args.defer_analysis,
+            "think_ms": args.think_ms,
+            "students": len(students),
+            "teachers": len(teachers),
+        },
+        "wall_seconds": round(wall, 2),
+        "total_rps": round(sum(s["requests"] for s in endpoints.values()) / wall, 2) if wall else 0.0,
+        "endpoints": endpoints,
+    }
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")).get("endpoints", {})
+        print(f"baseline: {args.compare}")
+    print(f"commit={results['commit']} target={results['target']} users={args.users} wall={wall:.1f}s total_rps={results['total_rps']}")
+    _print_table(endpoints, baseline)
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Retrieval latency benchmark for the local RAG index.
+
+Builds an index from synthetic Japanese book-like text (or opens an existing
+one with --index) and times open + top-k search for report-like queries.
+
+Usage (from backend/):
+    python -m benchmarks.rag_retrieval --passages 5000 --queries 2000
+    python -m benchmarks.rag_retrieval --index data/rag_index.bin
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.retrieval import RagIndex, build_index
+from benchmarks.heuristic_matcher import make_corpus
+
+SUBJECTS = ["変化", "挑戦", "仲間", "対話", "失敗", "学び直し", "人生", "仕事", "キャリア", "習慣", "目標", "成長"]
+PREDICATES = [
+    "を恐れずに受け入れることが大切だ",
+    "は小さな一歩から始まる",
+    "を通じて新しい視点が生まれる",
+    "には時間がかかるが、続ければ必ず形になる",
+    "を周りの人と分かち合うと力が増す",
+    "について考えると、自分の価値観が見えてくる",
+    "は努力によって伸ばすことができる",
+]
+
+
+def make_book(passages: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(passages):
+        sentences = [
+            f"{rng.choice(SUBJECTS)}{rng.choice(PREDICATES)}。"
+            for _ in range(rng.randint(4, 9))
+        ]
+        paragraphs.append("".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", help="benchmark an existing index instead of a synthetic one")
+    parser.add_argument("--passages", type=int, default=5000, help="paragraphs in the synthetic book")
+    parser.add_argument("--chunk-chars", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.index
+        if path is None:
+            path = Path(tmp) / "rag_index.bin"
+            stats = build_index([("synthetic.txt", make_book(args.passages))], path, args.chunk_chars)
+            print(
+                f"built: passages={stats['passages']} terms={stats['terms']} "
+                f"postings={stats['postings']} size={stats['bytes'] / 1e6:.1f}MB in {stats['build_seconds']}s"
+            )
+
+        started = time.perf_counter()
+        index = RagIndex(path)
+        open_ms = (time.perf_counter() - started) * 1000
+
+        queries = make_corpus(args.queries, seed=1)
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, args.top_k)
+            latencies.append((time.perf_counter() - started) * 1000)
+        index.close()
+
+    print(f"open={open_ms:.2f}ms passages={index.n_docs} queries={len(latencies)} top_k={args.top_k}")
+    print(
+        f"search mean={statistics.mean(latencies):.2f}ms p50={_percentile(latencies, 50):.2f}ms "
+        f"p95={_percentile(latencies, 95):.2f}ms max={max(latencies):.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
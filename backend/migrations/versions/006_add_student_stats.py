@@ -0,0 +1,116 @@
+"""Add student_stats rollup (per student and fiscal year) and backfill it
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JST = timezone(timedelta(hours=9))
+
+
+def _to_datetime(value) -> datetime:
+    # SQLite returns DATETIME columns as strings through text()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _fiscal_year(reported_at: datetime) -> int:
+    jst = reported_at.replace(tzinfo=timezone.utc).astimezone(JST)
+    return jst.year if jst.month >= 4 else jst.year - 1
+
+
+def upgrade() -> None:
+    student_stats = op.create_table(
+        'student_stats',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('student_id', sa.String(36), nullable=False),
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ability_counts', sa.JSON(), nullable=False),
+        sa.Column('ability_points', sa.JSON(), nullable=False),
+        sa.Column('phase_counts', sa.JSON(), nullable=False),
+        sa.Column('latest_report_at', sa.DateTime(), nullable=True),
+        sa.Column('latest_phase_id', sa.String(36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_id', 'fiscal_year', name='uq_student_stats_student_year'),
+    )
+
+    # Backfill from existing reports (python -m app.db.rebuild_student_stats does the same later)
+    bind = op.get_bind()
+    stats = {}
+    for student_id, reported_at, phase_id in bind.execute(
+        text("SELECT student_id, reported_at, phase_id FROM reports")
+    ).fetchall():
+        reported_at = _to_datetime(reported_at)
+        key = (student_id, _fiscal_year(reported_at))
+        entry = stats.setdefault(key, {
+            "report_count": 0,
+            "ability_counts": defaultdict(int),
+            "ability_points": defaultdict(int),
+            "phase_counts": defaultdict(int),
+            "latest_report_at": None,
+            "latest_phase_id": None,
+        })
+        entry["report_count"] += 1
+        if phase_id:
+            entry["phase_counts"][phase_id] += 1
+        if entry["latest_report_at"] is None or reported_at > entry["latest_report_at"]:
+            entry["latest_report_at"] = reported_at
+            entry["latest_phase_id"] = phase_id
+
+    for student_id, reported_at, ability_id, points in bind.execute(
+        text(
+            """
+            SELECT r.student_id, r.reported_at, ra.ability_id, ra.points
+            FROM report_abilities ra
+            JOIN reports r ON r.id = ra.report_id
+            """
+        )
+    ).fetchall():
+        entry = stats.get((student_id, _fiscal_year(_to_datetime(reported_at))))
+        if entry is not None:
+            entry["ability_counts"][ability_id] += 1
+            entry["ability_points"][ability_id] += int(points or 0)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "fiscal_year": fiscal_year,
+            "report_count": entry["report_count"],
+            "ability_counts": dict(entry["ability_counts"]),
+            "ability_points": dict(entry["ability_points"]),
+            "phase_counts": dict(entry["phase_counts"]),
+            "latest_report_at": entry["latest_report_at"],
+            "latest_phase_id": entry["latest_phase_id"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for (student_id, fiscal_year), entry in stats.items()
+    ]
+    if rows:
+        op.bulk_insert(student_stats, rows)
+
+
+def downgrade() -> None:
+    op.drop_table('student_stats')
@@ -0,0 +1,37 @@
+"""Add change_log for delta sync (GET /sync)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows need no entries: clients without a cursor get a full sync
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False, autoincrement=True),
+        sa.Column('entity', sa.String(32), nullable=False),
+        sa.Column('entity_id', sa.String(36), nullable=False),
+        sa.Column('student_id', sa.String(36), nullable=True),
+        sa.Column('op', sa.String(8), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_change_log_student_id_id', 'change_log', ['student_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_change_log_student_id_id', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,38 @@
+"""Add teacher_advice cache (per student and fiscal year)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Starts empty: advice is generated on the next request per student
+    op.create_table(
+        'teacher_advice',
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('student_id', sa.String(36), nullable=False),
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(64), nullable=False),
+        sa.Column('advice', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('student_id', 'fiscal_year', name='uq_teacher_advice_student_year'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('teacher_advice')
@@ -0,0 +1,61 @@
+"""Add secondary indexes for the per-student / per-teacher hot paths
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+students.user_id, teachers.user_id and streak_records.student_id already
+have unique indexes (001). Check plans with python -m app.db.check_query_plans.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns). The leading column of each but the users one is a foreign key,
+# so MySQL drops the single-column index it created implicitly for that key.
+INDEXES = [
+    # Report lists / calendar / sync: one student's reports by date (id breaks ties in the keyset)
+    ('ix_reports_student_id_reported_at', 'reports', ['student_id', 'reported_at', 'id']),
+    # Abilities of a set of reports (stats rebuild, report responses); covers ability_id / points
+    ('ix_report_abilities_report_id', 'report_abilities', ['report_id', 'ability_id', 'points']),
+    ('ix_report_abilities_ability_id', 'report_abilities', ['ability_id']),
+    # Teacher dashboard: a teacher's active students of the year
+    ('ix_student_teachers_teacher_year_active', 'student_teachers', ['teacher_id', 'fiscal_year', 'is_active', 'student_id']),
+    # A student's teachers of the year
+    ('ix_student_teachers_student_id_fiscal_year', 'student_teachers', ['student_id', 'fiscal_year']),
+    # A student's theme of the year
+    ('ix_research_themes_student_id_fiscal_year', 'research_themes', ['student_id', 'fiscal_year']),
+    # Admin user list: keyset pages by (created_at, id)
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+]
+
+# Foreign keys that need an index of their own again once the composite ones are dropped (MySQL)
+FK_COLUMNS = [
+    ('reports', 'student_id'),
+    ('report_abilities', 'report_id'),
+    ('report_abilities', 'ability_id'),
+    ('student_teachers', 'teacher_id'),
+    ('student_teachers', 'student_id'),
+    ('research_themes', 'student_id'),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'mysql':
+        # MySQL refuses to drop the only index that enforces a foreign key
+        for table, column in FK_COLUMNS:
+            op.create_index(column, table, [column])
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
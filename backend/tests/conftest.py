@@ -0,0 +1,161 @@
+"""Shared fixtures: the app on a throwaway SQLite database.
+
+The database URL is set before the app is imported, so every engine (primary
+and read) points at the file in a temporary directory. Each test gets freshly
+created tables with the master data, one teacher, one student with a theme,
+and bearer-token headers for both. AI calls fall back to heuristics (no key).
+
+    def test_something(client, school):
+        r = client.get("/api/reports/summary", headers=school.student_headers)
+"""
+
+import asyncio
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import List
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tankyu-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_TMP_DIR}/test.db"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["REPORT_ANALYSIS_MODE"] = "sync"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.session import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import (  # noqa: E402
+    Ability, ResearchPhase, ResearchTheme, Student, StudentTeacher, Teacher, User, UserRole,
+)
+from app.services.analysis_cache import analysis_cache  # noqa: E402
+from app.services.master_data import master_data  # noqa: E402
+
+ABILITIES = [
+    "情報収集能力と先を見る力",
+    "課題設定能力と構想する力",
+    "巻き込む力",
+    "対話する力",
+    "実行する力",
+    "謙虚である力",
+    "完遂する力",
+]
+PHASES = ["課題の設定", "情報の収集", "整理・分析", "まとめ・表現"]
+
+
+def run(coro):
+    """Run a coroutine from a (sync) test; TestClient runs the app in its own loop."""
+    return asyncio.run(coro)
+
+
+def auth_headers(user_id) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+
+@dataclass
+class School:
+    teacher_user_id: str
+    teacher_id: str
+    fiscal_year: int
+    students: List[dict] = field(default_factory=list)  # {"id", "user_id", "theme_id", "headers"}
+
+    @property
+    def teacher_headers(self) -> dict:
+        return auth_headers(self.teacher_user_id)
+
+    @property
+    def student(self) -> dict:
+        return self.students[0]
+
+    @property
+    def student_headers(self) -> dict:
+        return self.student["headers"]
+
+    def add_students(self, count: int, assign: bool = True) -> List[dict]:
+        """Create students (with a theme of the year), assigned to the teacher unless assign=False."""
+        added = run(self._add_students(count, assign))
+        self.students.extend(added)
+        return added
+
+    async def _add_students(self, count: int, assign: bool) -> List[dict]:
+        added = []
+        async with AsyncSessionLocal() as db:
+            offset = len(self.students)
+            for i in range(offset, offset + count):
+                user = User(email=f"student{i}@example.com", name=f"生徒 {i:03d}", role=UserRole.STUDENT)
+                db.add(user)
+                await db.flush()
+                student = Student(user_id=user.id, grade=1 + i % 3, class_name=f"{1 + i % 4}組")
+                db.add(student)
+                await db.flush()
+                theme = ResearchTheme(student_id=student.id, title=f"テーマ {i}", fiscal_year=self.fiscal_year)
+                db.add(theme)
+                if assign:
+                    db.add(StudentTeacher(
+                        student_id=student.id, teacher_id=self.teacher_id,
+                        fiscal_year=self.fiscal_year, is_primary=True,
+                    ))
+                await db.flush()
+                added.append({
+                    "id": str(student.id),
+                    "user_id": str(user.id),
+                    "theme_id": str(theme.id),
+                    "headers": auth_headers(user.id),
+                })
+            await db.commit()
+        return added
+
+
+def report_payload(student: dict, text: str = "商店街の人にインタビューして、地域の課題を整理した。") -> dict:
+    """POST /api/reports body with a pre-analyzed result (no AI call)."""
+    return {
+        "content": text,
+        "theme_id": student["theme_id"],
+        "ai_comment": "よく頑張りましたね。",
+        "detected_abilities": [
+            {"name": ABILITIES[3], "score": 80, "role": "strong"},
+            {"name": ABILITIES[0], "score": 60, "role": "sub"},
+            {"name": ABILITIES[1], "score": 60, "role": "sub"},
+        ],
+    }
+
+
+async def _reset_database() -> School:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        for order, name in enumerate(ABILITIES, 1):
+            db.add(Ability(name=name, display_order=order))
+        for order, name in enumerate(PHASES, 1):
+            db.add(ResearchPhase(name=name, display_order=order))
+        user = User(email="teacher@example.com", name="先生 太郎", role=UserRole.TEACHER)
+        db.add(user)
+        await db.flush()
+        teacher = Teacher(user_id=user.id)
+        db.add(teacher)
+        await db.commit()
+        return School(
+            teacher_user_id=str(user.id),
+            teacher_id=str(teacher.id),
+            fiscal_year=settings.get_current_fiscal_year(),
+        )
+
+
+@pytest.fixture
+def school() -> School:
+    """Fresh tables, master data, a teacher and one assigned student."""
+    school = run(_reset_database())
+    master_data.invalidate()
+    analysis_cache.clear()
+    school.add_students(1)
+    return school
+
+
+@pytest.fixture
+def client(school):
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,43 @@
+"""DASHBOARD_SUMMARY_QUERY=single returns the same list as the batched queries."""
+
+import pytest
+
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER
+
+from tests.conftest import report_payload
+
+
+@pytest.fixture
+def seeded(client, school):
+    # Students with 0-3 reports, one unassigned (outside the teacher's scope)
+    students = school.add_students(4)
+    school.add_students(1, assign=False)
+    for i, student in enumerate(school.students[:5]):
+        for j in range(i % 4):
+            r = client.post("/api/reports", headers=student["headers"], json=report_payload(student, f"報告 {i}-{j}"))
+            assert r.status_code == 201, r.text
+    return students
+
+
+def _get(client, school, mode, monkeypatch, **params):
+    monkeypatch.setattr(settings, "DASHBOARD_SUMMARY_QUERY", mode)
+    r = client.get("/api/dashboard/students", headers=school.teacher_headers, params=params)
+    assert r.status_code == 200, r.text
+    return r.json(), r.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_single_matches_batched(client, school, seeded, monkeypatch):
+    batched, _ = _get(client, school, "batched", monkeypatch)
+    single, _ = _get(client, school, "single", monkeypatch)
+    assert len(batched) == 5
+    assert single == batched
+
+
+def test_single_matches_batched_pages(client, school, seeded, monkeypatch):
+    batched = _get(client, school, "batched", monkeypatch, limit=2)
+    single = _get(client, school, "single", monkeypatch, limit=2)
+    assert single == batched
+    cursor = batched[1]
+    assert _get(client, school, "single", monkeypatch, limit=2, cursor=cursor) == \
+        _get(client, school, "batched", monkeypatch, limit=2, cursor=cursor)
@@ -0,0 +1,130 @@
+"""Deferred AI analysis: each report is analyzed and written once, even when requeued."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.api.endpoints import reports as reports_endpoint
+from app.api.endpoints.reports import _run_deferred_analysis, requeue_stale_analyses
+from app.db.session import AsyncSessionLocal
+from app.models import Report
+from app.services.background import analysis_pool
+
+from tests.conftest import report_payload, run
+
+STALE_AT = datetime(2020, 4, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def pending_report(client, school):
+    """A report left PENDING long ago (e.g. by a worker that was killed)."""
+    r = client.post("/api/reports", headers=school.student_headers, json=report_payload(school.student))
+    assert r.status_code == 201, r.text
+    report_id = r.json()["id"]
+
+    async def _mark():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Report).where(Report.id == report_id).values(analysis_status="pending", updated_at=STALE_AT)
+            )
+            await db.commit()
+
+    run(_mark())
+    return report_id
+
+
+class FakeGemini:
+    """Stands in for analyze_report_content; counts calls and runs `on_call` inside each."""
+
+    def __init__(self):
+        self.calls = 0
+        self.on_call = lambda: asyncio.sleep(0.05)
+
+    async def __call__(self, content, theme_title=None, student_name=None):
+        self.calls += 1
+        await self.on_call()
+        return "情報の収集", [], "AIのコメント"
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    fake = FakeGemini()
+    monkeypatch.setattr(reports_endpoint, "analyze_report_content", fake)
+    return fake
+
+
+async def _report(report_id) -> Report:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Report, report_id)
+
+
+def _job(report_id, claimed_at=STALE_AT):
+    return _run_deferred_analysis(
+        report_id=report_id, claimed_at=claimed_at, content="報告", theme_title=None,
+        student_name=None, fallback_ability_ids=[], phase_locked=True,
+    )
+
+
+def test_deferred_report_completes(client, school):
+    r = client.post(
+        "/api/reports", headers=school.student_headers, params={"defer_analysis": True},
+        json={"content": "商店街の人にインタビューした。", "theme_id": school.student["theme_id"]},
+    )
+    assert r.status_code == 202, r.text
+    url = f"/api/reports/{r.json()['id']}/analysis"
+    for _ in range(100):
+        status = client.get(url, headers=school.student_headers).json()
+        if status["analysis_status"] == "completed":
+            break
+        time.sleep(0.05)
+    assert status["analysis_status"] == "completed"
+    assert status["ai_comment"]
+
+
+def test_duplicate_job_runs_once(pending_report, gemini):
+    async def _both():
+        await asyncio.gather(_job(pending_report), _job(pending_report))
+        return await _report(pending_report)
+
+    report = run(_both())
+    assert gemini.calls == 1
+    assert report.analysis_status == "completed"
+    assert report.ai_comment == "AIのコメント"
+
+
+def test_job_taken_over_does_not_store(pending_report, gemini):
+    async def _requeued_meanwhile():
+        # The sweep claims the report while this job waits for Gemini
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Report).where(Report.id == pending_report)
+                .values(analysis_status="pending", updated_at=datetime.utcnow() - timedelta(hours=1))
+            )
+            await db.commit()
+
+    gemini.on_call = _requeued_meanwhile
+    run(_job(pending_report))
+    report = run(_report(pending_report))
+    assert gemini.calls == 1
+    assert report.analysis_status == "pending"
+    assert report.ai_comment != "AIのコメント"
+
+
+def test_sweep_skips_jobs_held_by_the_pool(pending_report, gemini, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(analysis_pool, "holds", lambda key: True)
+        assert run(requeue_stale_analyses()) == 0
+    assert run(_report(pending_report)).updated_at == STALE_AT
+
+    async def _sweep():
+        requeued = await requeue_stale_analyses()
+        await analysis_pool.drain(timeout=5)
+        analysis_pool.start()
+        return requeued
+
+    assert run(_sweep()) == 1
+    assert gemini.calls == 1
+    assert run(_report(pending_report)).analysis_status == "completed"
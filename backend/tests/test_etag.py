@@ -0,0 +1,73 @@
+"""Conditional GET: 304 while nothing changed, a new ETag after a write."""
+
+from app.core.query_stats import assert_query_budget
+
+from tests.conftest import report_payload
+
+
+def _revalidate(client, url, headers, etag):
+    return client.get(url, headers={**headers, "If-None-Match": etag})
+
+
+def test_dashboard_students(client, school):
+    url = "/api/dashboard/students"
+    first = client.get(url, headers=school.teacher_headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    r = _revalidate(client, url, school.teacher_headers, etag)
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+    assert r.content == b""
+    # Only the version fingerprint is read, not the aggregates
+    full = assert_query_budget(first, 100)
+    assert assert_query_budget(r, full) < full
+
+    # A new report of a student in scope
+    client.post("/api/reports", headers=school.student_headers, json=report_payload(school.student))
+    r = _revalidate(client, url, school.teacher_headers, etag)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.json()[0]["total_reports"] == 1
+    etag = r.headers["ETag"]
+
+    # Editing the student (no change_log row) changes the ETag too
+    r = client.put(f"{url}/{school.student['id']}", headers=school.teacher_headers, json={"class_name": "5組"})
+    assert r.status_code == 200, r.text
+    r = _revalidate(client, url, school.teacher_headers, etag)
+    assert r.status_code == 200
+    assert r.json()[0]["class_name"] == "5組"
+
+    # Another query (page size) has its own ETag
+    r = client.get(url, headers={**school.teacher_headers, "If-None-Match": r.headers["ETag"]}, params={"limit": 1})
+    assert r.status_code == 200
+
+
+def test_report_summary(client, school):
+    url = "/api/reports/summary"
+    headers = school.student_headers
+    etag = client.get(url, headers=headers).headers["ETag"]
+    assert _revalidate(client, url, headers, etag).status_code == 304
+    assert _revalidate(client, url, headers, f'W/{etag}, "other"').status_code == 304
+
+    r = client.post("/api/reports", headers=headers, json=report_payload(school.student))
+    report_id = r.json()["id"]
+    r = _revalidate(client, url, headers, etag)
+    assert r.status_code == 200
+    assert r.json()["total_reports"] == 1
+    etag = r.headers["ETag"]
+
+    # Deletes bump the version as well
+    assert client.delete(f"/api/reports/{report_id}", headers=headers).status_code == 204
+    r = _revalidate(client, url, headers, etag)
+    assert r.status_code == 200
+    assert r.json()["total_reports"] == 0
+
+
+def test_other_students_report_keeps_etag(client, school):
+    other = school.add_students(1)[0]
+    url = "/api/reports/summary"
+    etag = client.get(url, headers=school.student_headers).headers["ETag"]
+    client.post("/api/reports", headers=other["headers"], json=report_payload(other))
+    assert _revalidate(client, url, school.student_headers, etag).status_code == 304
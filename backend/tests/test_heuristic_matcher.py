@@ -0,0 +1,29 @@
+"""The compiled KeywordMatcher gives the same results as the per-keyword scan it replaced."""
+
+from app.services.analysis import (
+    ABILITY_KEYWORDS,
+    PHASE_KEYWORDS,
+    _heuristic_analysis,
+    batch_heuristic_analysis,
+)
+from benchmarks.heuristic_matcher import legacy_heuristic, make_corpus
+
+
+def test_matches_legacy_on_corpus():
+    corpus = make_corpus(2000, seed=1)
+    assert [_heuristic_analysis(c) for c in corpus] == [legacy_heuristic(c) for c in corpus]
+
+
+def test_matches_legacy_on_each_keyword():
+    # Every keyword alone, upper-cased, and overlapping with its neighbours
+    keywords = [kw for kws in ABILITY_KEYWORDS.values() for kw in kws]
+    keywords += [kw for _, kws in PHASE_KEYWORDS for kw in kws]
+    texts = ["", "特になし"] + keywords + [kw.upper() for kw in keywords]
+    texts += [a + b for a, b in zip(keywords, keywords[1:])]
+    for text in texts:
+        assert _heuristic_analysis(text) == legacy_heuristic(text), text
+
+
+def test_batch_matches_single():
+    corpus = make_corpus(500, seed=2) + ["", "特になし"]
+    assert batch_heuristic_analysis(corpus) == [_heuristic_analysis(c) for c in corpus]
@@ -0,0 +1,52 @@
+"""Statement budgets of the hot endpoints (Server-Timing from QueryStatsMiddleware).
+
+Each test also checks the count does not grow with the data (no N+1).
+"""
+
+from app.core.query_stats import assert_query_budget
+
+from tests.conftest import report_payload
+
+
+def _post_reports(client, student, count):
+    for i in range(count):
+        r = client.post("/api/reports", headers=student["headers"], json=report_payload(student, f"今日の活動 {i}: 地域の人に話を聞いた。"))
+        assert r.status_code == 201, r.text
+
+
+def test_create_report(client, school):
+    r = client.post("/api/reports", headers=school.student_headers, json=report_payload(school.student))
+    assert r.status_code == 201, r.text
+    first = assert_query_budget(r, 25)
+
+    # The second report updates the streak / stats rows instead of creating them
+    _post_reports(client, school.student, 3)
+    r = client.post("/api/reports", headers=school.student_headers, json=report_payload(school.student))
+    assert assert_query_budget(r, first) <= first
+
+
+def test_student_detail(client, school):
+    _post_reports(client, school.student, 1)
+    url = f"/api/dashboard/students/{school.student['id']}"
+    r = client.get(url, headers=school.teacher_headers)
+    assert r.status_code == 200, r.text
+    few = assert_query_budget(r, 15)
+
+    _post_reports(client, school.student, 6)
+    r = client.get(url, headers=school.teacher_headers)
+    assert r.status_code == 200
+    assert r.json()["total_reports"] == 7
+    assert_query_budget(r, few)
+
+
+def test_dashboard_students(client, school):
+    _post_reports(client, school.student, 2)
+    r = client.get("/api/dashboard/students", headers=school.teacher_headers)
+    assert r.status_code == 200, r.text
+    few = assert_query_budget(r, 15)
+
+    for student in school.add_students(12):
+        _post_reports(client, student, 1)
+    r = client.get("/api/dashboard/students", headers=school.teacher_headers)
+    assert len(r.json()) == 13
+    assert_query_budget(r, few)
@@ -0,0 +1,32 @@
+"""The hot queries of app/db/check_query_plans.py search their indexes (SQLite EXPLAIN QUERY PLAN)."""
+
+import pytest
+
+from app.db.check_query_plans import CHECKS, run_checks
+from app.db.session import engine
+
+from tests.conftest import report_payload, run
+
+
+@pytest.fixture
+def seeded(client, school):
+    # Reports with abilities, streaks and rollups for a few assigned students
+    for student in school.students + school.add_students(3):
+        for i in range(3):
+            r = client.post("/api/reports", headers=student["headers"], json=report_payload(student, f"報告 {i}"))
+            assert r.status_code == 201, r.text
+
+
+async def _run_checks():
+    async with engine.connect() as conn:
+        return await run_checks(conn)
+
+
+def test_checks_use_indexes(seeded):
+    results = run(_run_checks())
+    assert [r.check.name for r in results] == [c.name for c in CHECKS]
+    failures = {
+        r.check.name: (r.problems, [line for _, _, line in r.plans.values()])
+        for r in results if r.problems
+    }
+    assert not failures